@@ -22,7 +22,9 @@ import logging
 import os
 import sys
 import tempfile
+import time
 import warnings
+import zipfile
 
 import numpy as np
 
@@ -38,7 +40,7 @@ logger = logging.getLogger("HPOlib.experiment")
 
 # Do not forget to increment this if you add a new field either to Experiment
 #  or Trial
-VERSION = 1
+VERSION = 4
 
 CANDIDATE_STATE = 0
 INCOMPLETE_STATE = 1
@@ -46,6 +48,110 @@ RUNNING_STATE = 2
 COMPLETE_STATE = 3
 BROKEN_STATE = -1
 
+# Points in time which are recorded for every fold of a trial, in the order
+# in which they occur. They are stored in trial['instance_timestamps'], an
+# array with one row per fold and one column per entry of this list.
+TIMESTAMP_NAMES = ["interceptor_start", "lock_acquired", "dispatch_start",
+                   "target_start", "target_end", "result_parsed", "saved"]
+
+
+# The summary of an experiment pickle <name>.pkl is stored in
+# <name>.summary.npz, see summarize_jobs
+SUMMARY_SUFFIX = ".summary.npz"
+# Increase this whenever the content of a summary changes
+SUMMARY_VERSION = 2
+
+
+def get_summary_filename(jobs_pkl):
+    if jobs_pkl.endswith(".pkl"):
+        jobs_pkl = jobs_pkl[:-4]
+    return jobs_pkl + SUMMARY_SUFFIX
+
+
+def get_params_hash(params):
+    """Canonical hash of a configuration, see
+    wrapping_util.get_params_hash."""
+    return wrapping_util.get_params_hash(params)
+
+
+def summarize_jobs(jobs):
+    """Extract the columns most analysis tools need from an experiment.
+
+    jobs is the content of an experiment pickle. Returns a dictionary with
+    the experiment_name, the number of folds, instance_order (an array with
+    one row per evaluation), starttime, endtime, cv_starttime, cv_endtime,
+    total_wallclock_time and the arrays result, test_result, status,
+    test_status, duration and params_hash with one entry per trial as well
+    as instance_results, instance_status and instance_durations with one
+    row per trial and one column per fold.
+    """
+    trials = jobs['trials']
+    folds = jobs['folds']
+
+    def trial_column(key, default, dtype):
+        return np.array([trial.get(key, default) for trial in trials],
+                        dtype=dtype)
+
+    def instance_column(key, default, dtype):
+        column = np.empty((len(trials), folds), dtype=dtype)
+        for idx, trial in enumerate(trials):
+            column[idx] = trial.get(key, default)
+        return column
+
+    summary = dict()
+    summary['experiment_name'] = jobs['experiment_name']
+    summary['folds'] = folds
+    summary['instance_order'] = np.array(jobs['instance_order'],
+                                         dtype=int).reshape((-1, 2))
+    for key in ('starttime', 'endtime', 'cv_starttime', 'cv_endtime'):
+        summary[key] = np.array(jobs[key], dtype=np.float64)
+    summary['total_wallclock_time'] = jobs['total_wallclock_time']
+    for key in ('result', 'test_result', 'duration'):
+        summary[key] = trial_column(key, np.NaN, np.float64)
+    for key in ('status', 'test_status'):
+        summary[key] = trial_column(key, CANDIDATE_STATE, int)
+    summary['params_hash'] = np.array(
+        [trial['params_hash'] if 'params_hash' in trial else
+         get_params_hash(trial.get('params', {})) for trial in trials],
+        dtype="S32")
+    summary['instance_results'] = instance_column('instance_results',
+                                                  np.NaN, np.float64)
+    summary['instance_status'] = instance_column('instance_status',
+                                                 CANDIDATE_STATE, int)
+    summary['instance_durations'] = instance_column('instance_durations',
+                                                    np.NaN, np.float64)
+    return summary
+
+
+def load_summary(jobs_pkl):
+    """Return the summary of an experiment pickle, see summarize_jobs.
+
+    The summary is read from the file which Experiment writes next to the
+    pickle. It is only used if it belongs to the current version of the
+    pickle, otherwise the pickle itself is read. The experiment is never
+    locked; Experiment replaces both files atomically.
+    """
+    summary_file = get_summary_filename(jobs_pkl)
+    try:
+        stat = os.stat(jobs_pkl)
+        with open(summary_file, "rb") as fh:
+            npz = np.load(fh)
+            summary = dict((key, npz[key]) for key in npz.files)
+        if summary.pop('pickle_mtime') == stat.st_mtime and \
+                summary.pop('pickle_size') == stat.st_size and \
+                summary.pop('summary_version', 1) == SUMMARY_VERSION:
+            # Scalars are stored as zero-dimensional arrays
+            summary['experiment_name'] = str(summary['experiment_name'])
+            summary['folds'] = int(summary['folds'])
+            summary['total_wallclock_time'] = \
+                float(summary['total_wallclock_time'])
+            return summary
+    except (IOError, OSError, KeyError, ValueError, zipfile.BadZipfile):
+        pass
+
+    with open(jobs_pkl) as fh:
+        jobs = cPickle.load(fh)
+    return summarize_jobs(jobs)
 
 
 def load_experiment_file():
@@ -71,6 +177,8 @@ class Experiment:
         #                 self.jobs_pkl + "...")
         self.locker.lock_wait(self.jobs_pkl)
         #logger.info("...acquired\n")
+        # Time when the lock was acquired, not saved in the pickle
+        self.lock_acquired = time.time()
 
         # Does this exist already?
         if not os.path.exists(self.jobs_pkl):
@@ -106,6 +214,10 @@ class Experiment:
             # Dummy field, this will be calculated by wrapping.py after
             # everything is finished
             self.optimizer_time = []
+            # Number of evaluations which were looked up in (or missed) the
+            # HPOLIB:result_cache, see HPOlib.result_cache
+            self.result_cache_hits = 0
+            self.result_cache_misses = 0
             # A field which denotes the version of the Experiment format,
             # in new versions, there might be new fields which have to be
             # pickled and loaded and so on...
@@ -145,6 +257,9 @@ class Experiment:
         # Stores the duration for every instance
         trial['instance_durations'] = np.ones((self.folds)) * np.NaN
         trial['test_instance_durations'] = np.ones((1,)) * np.NaN
+        # Stores the timestamps from TIMESTAMP_NAMES for every instance
+        trial['instance_timestamps'] = np.ones((self.folds,
+                                                len(TIMESTAMP_NAMES))) * np.NaN
         # Store additional data in form of strings for every fold, this canv
         # e.g. be a machine learning model which is saved to the disk
         trial['additional_data'] = defaultdict(str)
@@ -297,7 +412,7 @@ class Experiment:
                             "%d, accessed index: %d" % (len(self.trials), _id))
             raise e
 
-    def add_job(self, params):
+    def add_job(self, params, params_hash=None):
         """Create a trials dictionary for a hyperparameter configuration.
 
         Parameters
@@ -305,6 +420,11 @@ class Experiment:
         configuration : dict
             A dictionary of hyperparameters.
 
+        params_hash : str, optional
+            The canonical hash of the configuration, see
+            wrapping_util.get_params_hash. Computed from params if it is
+            None.
+
         Returns
         -------
         int
@@ -312,6 +432,9 @@ class Experiment:
         """
         trial = self._create_trial()
         trial['params'] = params
+        if params_hash is None:
+            params_hash = get_params_hash(params)
+        trial['params_hash'] = params_hash
         self.trials.append(trial)
         self._sanity_check()
         return len(self.trials) - 1
@@ -506,6 +629,27 @@ class Experiment:
         self.total_wallclock_time += duration
         self._sanity_check()
 
+    def set_one_fold_timestamps(self, _id, fold, timestamps):
+        """Store the timestamps of the phases of one fold evaluation.
+
+        Parameters
+        ----------
+        _id : int
+            The ID of the trial dictionary
+        fold : int
+            The fold the timestamps belong to
+        timestamps : dict
+            Maps names from TIMESTAMP_NAMES to a time as returned by
+            time.time(). Missing names are stored as NaN.
+        """
+        trial = self.get_trial_from_id(_id)
+        for name in timestamps:
+            if name not in TIMESTAMP_NAMES:
+                raise ValueError("Unknown timestamp %s, must be one of %s" %
+                                 (name, str(TIMESTAMP_NAMES)))
+        trial['instance_timestamps'][fold] = \
+            [timestamps.get(name, np.NaN) for name in TIMESTAMP_NAMES]
+
     def start_cv(self, time):
         """Set the timer for the start of a new cross-validation run.
 
@@ -584,6 +728,7 @@ class Experiment:
                 trial['instance_durations'][instance] = np.NaN
                 trial['instance_results'][instance] = np.NaN
                 trial['instance_status'][instance] = 0
+                trial['instance_timestamps'][instance] = np.NaN
                 self.instance_order.pop()
                 
                 trial['duration'] = np.NaN
@@ -692,24 +837,64 @@ class Experiment:
         self.optimizer_time          = jobs['optimizer_time']
         self.instance_order          = jobs['instance_order']
         self.trials                  = jobs['trials']
-
-    def _save_jobs(self):
+        # Experiment pickles written before VERSION 4 have no cache statistics
+        self.result_cache_hits       = jobs.get('result_cache_hits', 0)
+        self.result_cache_misses     = jobs.get('result_cache_misses', 0)
+
+        # Experiment pickles written before VERSION 2 have no timestamps.
+        # Trials written before VERSION 3 have no params hash, it depends on
+        # the search space and is added by
+        # optimization_interceptor.get_trial_index
+        for trial in self.trials:
+            if 'instance_timestamps' not in trial:
+                trial['instance_timestamps'] = np.ones(
+                    (self.folds, len(TIMESTAMP_NAMES))) * np.NaN
+
+    def _save_jobs(self, save_summary=True):
+        # The summary (see load_summary) is rewritten from all trials, callers
+        # on the hot path skip it if no result changed, e.g. after
+        # set_one_fold_running. Readers then fall back to the pickle until the
+        # next save with a summary.
         # Write everything to a temporary file first.
         self._sanity_check()
         fh = tempfile.NamedTemporaryFile(mode='w', delete=False)
-        cPickle.dump({'experiment_name': self.experiment_name,
-                       'title'          : self.title,
-                       'folds'          : self.folds,
-                       'total_wallclock_time' : self.total_wallclock_time,
-                       'max_wallclock_time'   : self.max_wallclock_time,
-                       'starttime'            : self.starttime,
-                       'endtime'              : self.endtime,
-                       'cv_starttime'         : self.cv_starttime,
-                       'cv_endtime'           : self.cv_endtime,
-                       'optimizer'            : self.optimizer,
-                       'optimizer_time'       : self.optimizer_time,
-                       'instance_order'       : self.instance_order,
-                       'trials'               : self.trials}, fh)
+        jobs = {'experiment_name': self.experiment_name,
+                'title'          : self.title,
+                'folds'          : self.folds,
+                'total_wallclock_time' : self.total_wallclock_time,
+                'max_wallclock_time'   : self.max_wallclock_time,
+                'starttime'            : self.starttime,
+                'endtime'              : self.endtime,
+                'cv_starttime'         : self.cv_starttime,
+                'cv_endtime'           : self.cv_endtime,
+                'optimizer'            : self.optimizer,
+                'optimizer_time'       : self.optimizer_time,
+                'instance_order'       : self.instance_order,
+                'trials'               : self.trials,
+                'result_cache_hits'    : self.result_cache_hits,
+                'result_cache_misses'  : self.result_cache_misses}
+        cPickle.dump(jobs, fh)
         fh.close()
         cmd = 'mv "%s" "%s"' % (fh.name, self.jobs_pkl)
         os.system(cmd)  # TODO: Replace with subprocess modules
+        if save_summary:
+            self._save_summary(jobs)
+
+    def _save_summary(self, jobs):
+        # The summary belongs to exactly this version of the pickle, readers
+        # fall back to the pickle if it was replaced in the meantime.
+        summary_file = get_summary_filename(self.jobs_pkl)
+        try:
+            summary = summarize_jobs(jobs)
+            stat = os.stat(self.jobs_pkl)
+            summary['pickle_mtime'] = stat.st_mtime
+            summary['pickle_size'] = stat.st_size
+            summary['summary_version'] = SUMMARY_VERSION
+            fh = tempfile.NamedTemporaryFile(
+                dir=os.path.dirname(summary_file), delete=False)
+            np.savez(fh, **summary)
+            fh.close()
+            os.rename(fh.name, summary_file)
+        except (IOError, OSError) as e:
+            logger.warning("Could not write experiment summary %s: %s",
+                           summary_file, str(e))
@@ -19,6 +19,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from argparse import ArgumentParser
+import multiprocessing
 import os
 import subprocess
 import sys
@@ -44,10 +45,11 @@ def _plot_trace(pkl_list, name_list, save="", cut=sys.maxint, log=False):
         import plotTrace
         plotTrace.main(pkl_list, name_list, save=save, log=log, cut=cut)
         os.chdir(cur_dir)
-        sys.stdout.write("passed\n")
+        return True
     except Exception, e:
         sys.stderr.write(format_traceback(sys.exc_info()))
         sys.stderr.write("failed: %s %s" % (sys.exc_info()[0], e))
+        return False
 
 
 def _trace_with_std_per_eval(pkl_list, name_list, maxvalue, save="",
@@ -64,10 +66,11 @@ def _trace_with_std_per_eval(pkl_list, name_list, maxvalue, save="",
                                maxvalue=maxvalue, save=save, log=log,
                                print_lenght_trial_list=True)
         os.chdir(cur_dir)
-        sys.stdout.write("passed\n")
+        return True
     except Exception, e:
         sys.stderr.write(format_traceback(sys.exc_info()))
         sys.stderr.write("failed: %s %s" % (sys.exc_info()[0], e))
+        return False
 
 
 def _trace_with_std_per_time(pkl_list, name_list, maxvalue, save="",
@@ -83,10 +86,11 @@ def _trace_with_std_per_time(pkl_list, name_list, maxvalue, save="",
                                aggregation=aggregation, optimum=0,
                                maxvalue=maxvalue, save=save, logy=log)
         os.chdir(cur_dir)
-        sys.stdout.write("passed\n")
+        return True
     except Exception, e:
         sys.stderr.write(format_traceback(sys.exc_info()))
         sys.stderr.write("failed: %s %s" % (sys.exc_info()[0], e))
+        return False
 
 
 def _optimizer_overhead(pkl_list, name_list, save="",
@@ -105,10 +109,11 @@ def _optimizer_overhead(pkl_list, name_list, save="",
                                    aggregation="mean", properties=None,
                                    print_lenght_trial_list=True)
         os.chdir(cur_dir)
-        sys.stdout.write("passed\n")
+        return True
     except Exception, e:
         sys.stderr.write(format_traceback(sys.exc_info()))
         sys.stderr.write("failed: %s %s" % (sys.exc_info()[0], e))
+        return False
 
 
 def _box_whisker(pkl_list, name_list, save="", cut=sys.maxint, log=False):
@@ -121,10 +126,11 @@ def _box_whisker(pkl_list, name_list, save="", cut=sys.maxint, log=False):
         import plotBoxWhisker
         plotBoxWhisker.main(pkl_list, name_list, save=save, cut=cut)
         os.chdir(cur_dir)
-        sys.stdout.write("passed\n")
+        return True
     except Exception, e:
         sys.stderr.write(format_traceback(sys.exc_info()))
         sys.stderr.write("failed: %s %s" % (sys.exc_info()[0], e))
+        return False
 
 
 def _generate_tex_table(pkl_list, name_list, save="", cut=sys.maxint,
@@ -137,10 +143,11 @@ def _generate_tex_table(pkl_list, name_list, save="", cut=sys.maxint,
         import generateTexTable
         generateTexTable.main(pkl_list, name_list, save, cut)
         os.chdir(cur_dir)
-        sys.stdout.write("passed\n")
+        return True
     except Exception, e:
         sys.stderr.write(format_traceback(sys.exc_info()))
         sys.stderr.write("failed: %s %s" % (sys.exc_info()[0], e))
+        return False
 
 
 def _statistics(pkl_list, name_list, save="", cut=sys.maxint, log=False):
@@ -159,10 +166,98 @@ def _statistics(pkl_list, name_list, save="", cut=sys.maxint, log=False):
                 fh.write(stringIO.getvalue())
         else:
             print stringIO.getvalue()
-        sys.stdout.write("passed\n")
+        return True
     except Exception, e:
         sys.stderr.write(format_traceback(sys.exc_info()))
         sys.stderr.write("failed: %s %s" % (sys.exc_info()[0], e))
+        return False
+
+
+PLOTTERS = {"plotTrace.py": _plot_trace,
+            "plotBoxWhisker.py": _box_whisker,
+            "generateTexTable.py": _generate_tex_table,
+            "plotOptimizerOverhead.py": _optimizer_overhead,
+            "statistics.py": _statistics,
+            "MeanTrace_perEval.py": _trace_with_std_per_eval,
+            "MeanTrace_perTime.py": _trace_with_std_per_time}
+
+
+def _render(task):
+    name, save, kwargs = task
+    plot_util.use_agg_backend()
+    start = time.time()
+    success = PLOTTERS[name](save=save, **kwargs)
+    return name, save, success, time.time() - start
+
+
+def get_tasks(pkl_list, name_list, save_dir, time_str, file_ending="png",
+              log=False, cut=sys.maxint, maxvalue=sys.maxint):
+    """Return a list of (plotter, save, keyword arguments) tuples.
+
+    The plotter is a key of PLOTTERS.
+    """
+    kwargs = {"pkl_list": pkl_list, "name_list": name_list, "log": log,
+              "cut": cut}
+
+    def _save(template, ending=file_ending):
+        if save_dir is "":
+            return save_dir
+        return os.path.join(save_dir, "%s_%s.%s" % (template, time_str,
+                                                    ending))
+
+    tasks = list()
+    if len(name_list) == 1 and name_list[0][1] == 1:
+        # We have one exp and one pkl
+        tasks.append(("plotTrace.py", _save("plotTrace"), kwargs))
+
+    if len(name_list) > 1:
+        # Some plots only make sense, if there are many experiments
+        tasks.append(("plotBoxWhisker.py", _save("BoxWhisker"), kwargs))
+        tasks.append(("generateTexTable.py", _save("table", "tex"), kwargs))
+
+    # We can always plot this
+    tasks.append(("plotOptimizerOverhead.py", _save("OptimizerOverhead"),
+                  kwargs))
+    tasks.append(("statistics.py", _save("statistics", "txt"), kwargs))
+
+    # Error Trace with Std
+    kwargs = dict(kwargs, maxvalue=maxvalue)
+    tasks.append(("MeanTrace_perEval.py", _save("MeanTrace_perEval"),
+                  kwargs))
+    tasks.append(("MeanTrace_perTime.py", _save("MeanTrace_perTime"),
+                  kwargs))
+    return tasks
+
+
+def render(tasks, pkl_list, name_list, n_jobs=None):
+    """Load all experiments once and render tasks (see get_tasks).
+
+    The experiment pickles and their summaries are loaded into the caches of
+    plot_util before n_jobs worker processes (default: the number of CPUs)
+    are forked, every plot reuses them instead of unpickling the
+    experiments again. Every worker renders only one plot to start with a
+    fresh figure. Yields a (plotter, save, success, duration) tuple per
+    task in the order of tasks. All plots are rendered with the Agg backend,
+    no process needs a display.
+    """
+    plot_util.use_agg_backend()
+    plot_util.load_pickles(name_list, pkl_list)
+    plot_util.load_summaries(name_list, pkl_list, n_jobs=n_jobs)
+
+    if n_jobs is None:
+        n_jobs = multiprocessing.cpu_count()
+    n_jobs = min(n_jobs, len(tasks))
+    if n_jobs > 1:
+        pool = multiprocessing.Pool(n_jobs, maxtasksperchild=1)
+        try:
+            for result in pool.imap(_render, tasks):
+                yield result
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for task in tasks:
+            yield _render(task)
 
 
 def main():
@@ -183,6 +278,9 @@ def main():
                         help="Replace all y values higher than this")
     parser.add_argument("-c", "--cut", dest="cut", default=sys.maxint,
                         type=int, help="Cut experiment pickles after a specified number of trials.")
+    parser.add_argument("-j", "--jobs", dest="jobs", default=None, type=int,
+                        help="Number of plots which are rendered in parallel "
+                             "(default: the number of CPUs)")
 
     args, unknown = parser.parse_known_args()
 
@@ -209,76 +307,18 @@ def main():
             else:
                 raise NotImplementedError("%s is not a valid file" % pkl_list[i][j])
 
-    if len(name_list) == 1 and name_list[0][1] == 1:
-        # We have one exp and one pkl
-        if save_dir is not "":
-            tmp_save = os.path.join(save_dir, "plotTrace_%s.%s" % (time_str, args.file))
-        else:
-            tmp_save = save_dir
-        sys.stdout.write("plotTrace.py ... %s ..." % tmp_save)
-        _plot_trace(pkl_list=pkl_list, name_list=name_list, save=tmp_save,
-                    log=log, cut=args.cut)
-
-    if len(name_list) > 1:
-        # Some plots only make sense, if there are many experiments
-        # BoxWhisker
-        if save_dir is not "":
-            tmp_save = os.path.join(save_dir, "BoxWhisker_%s.%s" % (time_str, args.file))
-        else:
-            tmp_save = save_dir
-        sys.stdout.write("plotBoxWhisker.py ... %s ..." % tmp_save)
-        _box_whisker(pkl_list=pkl_list, name_list=name_list, save=tmp_save,
-                     log=log, cut=args.cut)
-
-        # LaTeX table
-        if save_dir is not "":
-            tmp_save = os.path.join(save_dir, "table_%s.tex" % time_str)
-        else:
-            tmp_save = save_dir
-        sys.stdout.write("generateTexTable.py ... %s ..." % tmp_save)
-        ret = _generate_tex_table(pkl_list=pkl_list, name_list=name_list,
-                                  save=tmp_save, log=log, cut=args.cut)
-        if ret is not None:
-            print ret
+    tasks = get_tasks(pkl_list, name_list, save_dir, time_str,
+                      file_ending=args.file, log=log, cut=args.cut,
+                      maxvalue=args.maxvalue)
+    start = time.time()
+    for name, save, success, duration in render(tasks, pkl_list, name_list,
+                                                n_jobs=args.jobs):
+        sys.stdout.write("%s ... %s ... %s (%.2f sec)\n" %
+                         (name, save, "passed" if success else "failed",
+                          duration))
+    sys.stdout.write("Rendered %d plots in %.2f sec\n" %
+                     (len(tasks), time.time() - start))
 
 
-    # We can always plot this
-    # OptimizerOverhead
-    if save_dir is not "":
-        tmp_save = os.path.join(save_dir, "OptimizerOverhead_%s.%s" % (time_str, args.file))
-    else:
-        tmp_save = save_dir
-    sys.stdout.write("plotOptimizerOverhead.py ... %s ..." % tmp_save)
-    _optimizer_overhead(pkl_list=pkl_list, name_list=name_list, save=tmp_save,
-                        log=log, cut=args.cut)
-
-    # statistics
-    if save_dir is not "":
-        tmp_save = os.path.join(save_dir, "statistics_%s.txt" % time_str)
-    else:
-        tmp_save = save_dir
-    sys.stdout.write("statistics.py ... %s ..." % tmp_save)
-    _statistics(pkl_list=pkl_list, name_list=name_list, save=tmp_save,
-                log=log, cut=args.cut)
-
-    # Error Trace with Std
-    if save_dir is not "":
-        tmp_save = os.path.join(save_dir, "MeanTrace_perEval_%s.%s" % (time_str, args.file))
-    else:
-        tmp_save = save_dir
-    sys.stdout.write("MeanTrace_perEval.py ... %s ..." % tmp_save)
-    _trace_with_std_per_eval(pkl_list=pkl_list, name_list=name_list,
-                             save=tmp_save, log=log, cut=args.cut,
-                             maxvalue=args.maxvalue)
-
-    if save_dir is not "":
-        tmp_save = os.path.join(save_dir, "MeanTrace_perTime_%s.%s" % (time_str, args.file))
-    else:
-        tmp_save = save_dir
-    sys.stdout.write("MeanTrace_perTime.py ... %s ..." % tmp_save)
-    _trace_with_std_per_time(pkl_list=pkl_list, name_list=name_list,
-                             save=tmp_save, log=log, cut=args.cut,
-                             maxvalue=args.maxvalue)
-
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -74,7 +74,7 @@ template_string = \
 def main(pkl_list, name_list, save="", cut=sys.maxint,
          template_string=template_string, experiment_name="Name",
          num_evals="\\#eval"):
-    pickles = plot_util.load_pickles(name_list, pkl_list)
+    pickles = plot_util.load_summaries(name_list, pkl_list)
     best_dict, idx_dict, keys = plot_util.get_best_dict(name_list, pickles, cut)
     return generate_tex_template(best_dict, name_list,
                           template_string=template_string, save=save,
@@ -0,0 +1,172 @@
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import cPickle
+import csv
+import heapq
+import os
+import sys
+
+import numpy as np
+
+from HPOlib.Experiment import load_summary
+
+__authors__ = ["Katharina Eggensperger", "Matthias Feurer"]
+__contact__ = "automl.org"
+
+
+# Configurations are considered identical if they have the same result or the
+# same parameters
+DEDUPLICATION = ["result", "params"]
+
+
+def get_top_k_of_experiment(summary, k, dedup="result", invers=False):
+    """Return the k best trials of one experiment.
+
+    summary is an experiment summary (see HPOlib.Experiment.load_summary).
+    Of all trials with the same result (or the same parameters) only the
+    best and, among equally good ones, the first is kept. Returns a sorted
+    list of (value, trial index, key) tuples, value is the result (negated
+    if invers is True) and key the result or the params hash.
+    """
+    results = summary["result"]
+    keys = results if dedup == "result" else summary["params_hash"]
+    sign = -1 if invers else 1
+
+    best = dict()
+    for idx in np.flatnonzero(np.isfinite(results)):
+        value = sign * results[idx]
+        key = keys[idx]
+        if key not in best or value < best[key][0]:
+            best[key] = (value, idx)
+    return heapq.nsmallest(k, [(value, idx, key) for key, (value, idx) in
+                               best.items()])
+
+
+def get_top_k(pkl_list, k, dedup="result", invers=False):
+    """Return the k best trials of many experiments.
+
+    Reads only the experiment summaries, the k best trials of every
+    experiment are merged. Returns a tuple (top_k, num_different), top_k is a
+    sorted list of (result, index in pkl_list, trial index) tuples,
+    num_different the number of different results (or configurations) in all
+    experiments.
+    """
+    if dedup not in DEDUPLICATION:
+        raise ValueError("dedup must be one of %s" % str(DEDUPLICATION))
+    sign = -1 if invers else 1
+
+    per_experiment = list()
+    different = set()
+    for pkl_idx, pkl in enumerate(pkl_list):
+        summary = load_summary(pkl)
+        finite = np.isfinite(summary["result"])
+        if dedup == "result":
+            different.update(summary["result"][finite])
+        else:
+            different.update(summary["params_hash"][finite])
+        per_experiment.append([(value, pkl_idx, idx, key) for value, idx, key
+                               in get_top_k_of_experiment(summary, k, dedup,
+                                                          invers)])
+
+    top_k = list()
+    seen = set()
+    for value, pkl_idx, idx, key in heapq.merge(*per_experiment):
+        if key in seen:
+            continue
+        seen.add(key)
+        top_k.append((sign * value, pkl_idx, idx))
+        if len(top_k) >= k:
+            break
+    return top_k, len(different)
+
+
+def load_trials(pkl_list, top_k):
+    """Load the trial dictionaries of top_k, see get_top_k.
+
+    Only experiments which contain one of the trials are unpickled.
+    """
+    needed = dict()
+    for result, pkl_idx, idx in top_k:
+        needed.setdefault(pkl_idx, list()).append(idx)
+
+    trials = dict()
+    for pkl_idx in needed:
+        with open(pkl_list[pkl_idx]) as fh:
+            experiment = cPickle.load(fh)
+        for idx in needed[pkl_idx]:
+            trials[(pkl_idx, idx)] = experiment['trials'][idx]
+    return [trials[(pkl_idx, idx)] for result, pkl_idx, idx in top_k]
+
+
+def write_csv(fh, trials, param_set, additional=False):
+    writer = csv.writer(fh)
+    header = ["Result", "Time"] + param_set
+    if additional:
+        header.append("additional_info")
+    writer.writerow(header)
+    for trial in trials:
+        row = ["%.5f" % trial['result'], "%.5f" % trial['duration']]
+        row.extend([trial['params'][p] if p in trial['params'] else "-"
+                    for p in param_set])
+        if additional:
+            row.append(str(trial['additional_data']))
+        writer.writerow(row)
+
+
+def main(pkl_list, k=10, invers=False, additional=False, csv_output=False,
+         dedup="result"):
+    if not csv_output:
+        print pkl_list
+
+    existing = list()
+    for pkl in pkl_list:
+        if not os.path.exists(pkl):
+            print "%s does not exist" % pkl
+        else:
+            existing.append(pkl)
+
+    top_k, num_different = get_top_k(existing, k, dedup=dedup, invers=invers)
+    if k > num_different:
+        print "Reduce number of configurations"
+    if not csv_output:
+        print "Found %d different %s" % \
+            (num_different, "results" if dedup == "result" else
+             "configurations")
+    trials = load_trials(existing, top_k)
+
+    # Get a list with all params
+    param_set = set()
+    for trial in trials:
+        param_set.update(trial['params'].keys())
+    param_set = sorted(list(param_set))
+
+    if csv_output:
+        write_csv(sys.stdout, trials, param_set, additional=additional)
+        return
+
+    for trial in trials:
+        print "Result = %10f, Time = %10f, " % (trial['result'],
+                                               trial['duration']), \
+            ", ".join(["%s = %3s" % (p, trial['params'][p])
+                       for p in param_set]),
+        if additional:
+            print ", additional_info = %s" % str(trial['additional_data'])
+        else:
+            print
+
@@ -19,7 +19,6 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from argparse import ArgumentParser
 
-import cPickle
 import sys
 
 from matplotlib.gridspec import GridSpec
@@ -107,14 +106,12 @@ def plot_box_whisker(best_trials, name_list, title="", save="", y_min=0,
 
 def main(pkl_list, name_list, title="", save="", y_min=0, y_max=0, cut=sys.maxint):
 
+    summaries = plot_util.load_summaries(name_list, pkl_list)
     best_trials = list()
     for i in range(len(name_list)):
         best_trials.append(list())
-        for pkl in pkl_list[i]:
-            fh = open(pkl, "r")
-            trials = cPickle.load(fh)
-            fh.close()
-            best_trials[i].append(plot_util.get_best(trials, cut=cut))
+        for summary in summaries[name_list[i][0]]:
+            best_trials[i].append(plot_util.get_best(summary, cut=cut))
 
     plot_box_whisker(best_trials=best_trials, name_list=name_list,
                      title=title, save=save, y_min=y_min, y_max=y_max)
@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Data profiles and ECDF plots over many benchmarks.
+
+Every run of an optimizer is one experiment pickle. The benchmark of a run
+is the directory which contains its experiment directory, i.e. the
+benchmark of <benchmark>/<optimizer>_<seed>_<time>/<optimizer>.pkl is
+<benchmark>. For every benchmark and precision p there is one target
+
+    best + p * (reference - best)
+
+where best is the best value any run found on this benchmark and reference
+the median of the first values of all runs. The plot shows the fraction of
+(benchmark, run, target) triples which were hit after a number of function
+evaluations or seconds. With a single precision this is a data profile.
+"""
+
+from argparse import ArgumentParser
+from collections import defaultdict
+import os
+import sys
+
+from matplotlib.pyplot import figure, savefig, show
+
+import numpy as np
+
+import HPOlib.Plotting.plot_util as plot_util
+
+__authors__ = ["Katharina Eggensperger", "Matthias Feurer"]
+__contact__ = "automl.org"
+
+
+DEFAULT_PRECISIONS = [1, 1e-1, 1e-2, 1e-3, 0]
+
+
+def get_benchmark_name(pkl):
+    return os.path.basename(os.path.dirname(os.path.dirname(
+        os.path.abspath(pkl))))
+
+
+def load_runs(pkl_list, name_list, maxvalue=sys.maxint):
+    """Extract trajectory and runtime of every experiment pickle.
+
+    Uses the summaries of plot_util.load_summaries, runs which were already
+    summarized are not unpickled again. Returns a list of dictionaries with
+    the keys optimizer, benchmark, trajectory (see
+    plot_util.extract_trajectory) and times (see
+    plot_util.extract_runtime_timestamps, None if not available).
+    """
+    summaries = plot_util.load_summaries(name_list, pkl_list)
+    runs = list()
+    for i in range(len(name_list)):
+        optimizer = name_list[i][0]
+        for pkl, summary in zip(pkl_list[i], summaries[optimizer]):
+            runs.append({"optimizer": optimizer,
+                         "benchmark": get_benchmark_name(pkl),
+                         "trajectory": plot_util.extract_trajectory(
+                             summary, maxvalue=maxvalue),
+                         "times": summary["runtime_timestamps"]})
+    return runs
+
+
+def get_targets(runs, precisions=DEFAULT_PRECISIONS):
+    """Return a dictionary with an array of targets for every benchmark."""
+    final_values = defaultdict(list)
+    first_values = defaultdict(list)
+    for run in runs:
+        if len(run["trajectory"]) < 2:
+            continue
+        final_values[run["benchmark"]].append(run["trajectory"][-1])
+        first_values[run["benchmark"]].append(run["trajectory"][1])
+
+    precisions = np.array(precisions, dtype=np.float64)
+    targets = dict()
+    for benchmark in final_values:
+        best = np.min(final_values[benchmark])
+        reference = np.median(first_values[benchmark])
+        targets[benchmark] = best + precisions * (reference - best)
+    return targets
+
+
+def get_hitting_times(trajectory, targets):
+    """Return after how many function evaluations each target was hit.
+
+    trajectory is non-increasing, entry i is the best value after i
+    evaluations. Targets which were never hit get np.inf.
+    """
+    trajectory = np.asarray(trajectory, dtype=np.float64)
+    # Negated, the trajectory is sorted and can be searched for all
+    # targets at once
+    hits = np.searchsorted(-trajectory, -np.asarray(targets), side="left")
+    hits = hits.astype(np.float64)
+    hits[hits >= len(trajectory)] = np.inf
+    return hits
+
+
+def get_hitting_matrices(runs, targets, time=False):
+    """Hitting times and budgets of all runs, grouped by optimizer.
+
+    Returns a dictionary which maps the optimizer to a list of (benchmark,
+    hitting times, budget) tuples. The hitting times and the budget are in
+    function evaluations or, if time is True, in seconds.
+    """
+    hitting = defaultdict(list)
+    for run in runs:
+        if run["benchmark"] not in targets:
+            continue
+        hits = get_hitting_times(run["trajectory"],
+                                 targets[run["benchmark"]])
+        budget = len(run["trajectory"]) - 1
+        if time:
+            times = run["times"]
+            if times is None:
+                raise ValueError("Cannot extract runtimes for a run of %s on "
+                                 "%s" % (run["optimizer"], run["benchmark"]))
+            finite = np.isfinite(hits)
+            hits[finite] = np.asarray(times)[hits[finite].astype(int)]
+            budget = np.nanmax(times)
+        hitting[run["optimizer"]].append((run["benchmark"], hits, budget))
+    return hitting
+
+
+def get_ecdf(hitting_times, x):
+    """Fraction of all hitting_times which are smaller or equal to every x."""
+    hitting_times = np.sort(np.ravel(hitting_times))
+    if len(hitting_times) == 0:
+        return np.zeros(len(x))
+    return np.searchsorted(hitting_times, x, side="right") / \
+        float(len(hitting_times))
+
+
+def get_expected_running_time(hitting):
+    """Expected running time (ERT) for every benchmark and target.
+
+    hitting is a list of (benchmark, hitting times, budget) tuples of one
+    optimizer. The ERT is the sum of the evaluations (or seconds) of all runs
+    until they hit the target or stopped divided by the number of runs which
+    hit the target. Returns a dictionary which maps the benchmark to a tuple
+    of two arrays, the ERT (np.inf if no run hit the target) and the number
+    of successful runs.
+    """
+    per_benchmark = defaultdict(list)
+    for benchmark, hits, budget in hitting:
+        per_benchmark[benchmark].append((hits, budget))
+
+    ert = dict()
+    for benchmark in per_benchmark:
+        hits = np.array([h for h, budget in per_benchmark[benchmark]])
+        budgets = np.array([budget for h, budget in per_benchmark[benchmark]])
+        successes = np.sum(np.isfinite(hits), axis=0)
+        spent = np.sum(np.minimum(hits, budgets[:, np.newaxis]), axis=0)
+        ert[benchmark] = (np.where(successes > 0,
+                                   spent / np.maximum(successes, 1), np.inf),
+                          successes)
+    return ert
+
+
+def plot_ecdf(hitting, keys, title="", save="", logx=True,
+              xlabel="#Function evaluations", properties=None):
+    properties = plot_util.fill_with_defaults(properties if properties is
+                                              not None else dict())
+    finite = [hits[np.isfinite(hits)] for key in keys
+              for benchmark, hits, budget in hitting[key]]
+    finite = np.concatenate(finite) if len(finite) > 0 else np.array([])
+    budgets = [budget for key in keys for b, h, budget in hitting[key]]
+    x_max = max(np.max(budgets) if len(budgets) > 0 else 1, 1)
+    x_min = max(np.min(finite[finite > 0]) if np.any(finite > 0) else 1,
+                1e-3 if logx else 0)
+    if logx:
+        x = np.logspace(np.log10(x_min), np.log10(x_max), 1000)
+    else:
+        x = np.linspace(0, x_max, 1000)
+    # Add the exact hitting times, the steps should not be smoothed out
+    x = np.unique(np.concatenate((x, finite[finite <= x_max])))
+
+    fig = figure(1, dpi=int(properties["dpi"]))
+    ax = fig.add_subplot(111)
+    for key in keys:
+        hits = [h for b, h, budget in hitting[key]]
+        ecdf = get_ecdf(hits, x)
+        ax.step(x, ecdf, where="post", label="%s (%d)" % (key, len(hits)),
+                color=properties["colors"].next(),
+                linestyle=properties["linestyles"].next(),
+                linewidth=properties["linewidth"])
+    if logx:
+        ax.set_xscale("log")
+    ax.set_ylim([0, 1.02])
+    ax.set_xlim([x[0], x[-1]])
+    ax.set_xlabel(xlabel, fontsize=int(properties["labelfontsize"]))
+    ax.set_ylabel("Fraction of targets hit",
+                  fontsize=int(properties["labelfontsize"]))
+    ax.grid(True, color=properties["gridcolor"],
+            alpha=float(properties["gridalpha"]))
+    ax.legend(loc="best", fontsize="small")
+    fig.suptitle(title, fontsize=int(properties["titlefontsize"]))
+
+    if save != "":
+        savefig(save, dpi=int(properties["dpi"]), facecolor='w',
+                edgecolor='w', orientation='portrait', papertype=None,
+                format=None, transparent=False, bbox_inches="tight",
+                pad_inches=0.1)
+    else:
+        show()
+
+
+def main(pkl_list, name_list, precisions=DEFAULT_PRECISIONS, time=False,
+         title="", save="", logx=True, maxvalue=sys.maxint, properties=None):
+    runs = load_runs(pkl_list, name_list, maxvalue=maxvalue)
+    targets = get_targets(runs, precisions)
+    hitting = get_hitting_matrices(runs, targets, time=time)
+    keys = [name[0] for name in name_list]
+
+    unit = "sec" if time else "evals"
+    sys.stdout.write("%20s | %20s | %10s | %6s | %12s\n" %
+                     ("Optimizer", "Benchmark", "Precision", "#succ",
+                      "ERT [%s]" % unit))
+    for key in keys:
+        ert = get_expected_running_time(hitting[key])
+        for benchmark in sorted(ert):
+            for precision, value, successes in zip(precisions,
+                                                   *ert[benchmark]):
+                sys.stdout.write("%20s | %20s | %10g | %6d | %12.2f\n" %
+                                 (key, benchmark, precision, successes,
+                                  value))
+
+    xlabel = "Duration [sec]" if time else "#Function evaluations"
+    plot_ecdf(hitting, keys, title=title, save=save, logx=logx,
+              xlabel=xlabel, properties=properties)
+
+    if save != "":
+        sys.stdout.write("Saving plot to " + save + "\n")
+    else:
+        sys.stdout.write("..Done\n")
+
+
+if __name__ == "__main__":
+    prog = "python plotDataProfile.py WhatIsThis <manyPickles> " \
+           "[WhatIsThis <manyPickles>]"
+    description = "Plot the fraction of targets hit over many benchmarks, " \
+                  "the benchmark of a pickle is the name of the directory " \
+                  "which contains its experiment directory"
+
+    parser = ArgumentParser(description=description, prog=prog)
+
+    parser.add_argument("-p", "--precisions", dest="precisions", type=float,
+                        nargs="+", default=DEFAULT_PRECISIONS,
+                        help="Targets relative to the best and the median "
+                             "first value per benchmark, one precision "
+                             "gives a data profile")
+    parser.add_argument("--time", action="store_true", dest="time",
+                        default=False,
+                        help="Plot over wallclock time instead of function "
+                             "evaluations")
+    parser.add_argument("--linx", action="store_false", dest="logx",
+                        default=True, help="Plot x on a linear scale")
+    parser.add_argument("--maxvalue", dest="maxvalue", default=sys.maxint,
+                        type=float,
+                        help="Replace all y values higher than this")
+    parser.add_argument("-s", "--save", dest="save",
+                        default="",
+                        help="Where to save plot instead of showing it?")
+    parser.add_argument("-t", "--title", dest="title",
+                        default="", help="Optional supertitle for plot")
+
+    # Properties
+    # We need this to show defaults for -h
+    defaults = plot_util.get_defaults()
+    for key in defaults:
+        parser.add_argument("--%s" % key, dest=key, default=None,
+                            help="%s, default: %s" % (key, str(defaults[key])))
+
+    args, unknown = parser.parse_known_args()
+
+    sys.stdout.write("\nFound " + str(len(unknown)) + " arguments\n")
+
+    pkl_list_main, name_list_main = plot_util.get_pkl_and_name_list(unknown)
+
+    prop = {}
+    args_dict = vars(args)
+    for key in defaults:
+        prop[key] = args_dict[key]
+
+    if args.save != "":
+        plot_util.use_agg_backend()
+    main(pkl_list_main, name_list_main, precisions=args.precisions,
+         time=args.time, title=args.title, save=args.save, logx=args.logx,
+         maxvalue=args.maxvalue, properties=prop)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from argparse import ArgumentParser
+
+import cPickle
+import sys
+import warnings
+
+from matplotlib.pyplot import figure, savefig, show, tight_layout, \
+    subplots_adjust
+
+import numpy as np
+
+import HPOlib.Plotting.plot_util as plot_util
+
+__authors__ = ["Katharina Eggensperger", "Matthias Feurer"]
+__contact__ = "automl.org"
+
+
+# One label per column returned by plot_util.extract_phase_durations
+PHASE_LABELS = ["Startup and lock", "Bookkeeping", "Dispatch",
+                "Target algorithm", "Result parsing", "Lock and save"]
+
+
+def get_phase_durations(pkl_list, name_list, cut=sys.maxint):
+    """Return the mean duration of every phase for every evaluation.
+
+    Returns a list with one array per experiment. An array has one row per
+    evaluation and one column per phase and contains the mean over all
+    pickles of this experiment. Traces are cut to the shortest pickle.
+    """
+    durations_list = list()
+    for i in range(len(name_list)):
+        tmp_durations = list()
+        for pkl in pkl_list[i]:
+            fh = open(pkl, "r")
+            trials = cPickle.load(fh)
+            fh.close()
+            tmp_durations.append(plot_util.extract_phase_durations(trials,
+                                                                   cut=cut))
+        min_len = min([len(durations) for durations in tmp_durations])
+        tmp_durations = np.array([durations[:min_len]
+                                  for durations in tmp_durations])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            durations_list.append(np.nanmean(tmp_durations, axis=0))
+    return durations_list
+
+
+def plot_phases(durations_list, name_list, title="", save="", log=False,
+                properties=None):
+    properties = plot_util.fill_with_defaults(properties if properties is
+                                              not None else dict())
+    colors = [properties["colors"].next() for i in range(len(PHASE_LABELS))]
+
+    fig = figure(1, dpi=int(properties["dpi"]))
+    fig.suptitle(title, fontsize=int(properties["titlefontsize"]))
+
+    for i in range(len(name_list)):
+        ax = fig.add_subplot(len(name_list), 1, i + 1)
+        durations = np.nan_to_num(durations_list[i])
+        x = range(1, len(durations) + 1)
+        ax.stackplot(x, durations.transpose(), colors=colors,
+                     linewidth=0)
+        ax.set_title(name_list[i][0],
+                     fontsize=int(properties["labelfontsize"]))
+        ax.set_ylabel("Time [sec]", fontsize=int(properties["labelfontsize"]))
+        ax.grid(True, color=properties["gridcolor"],
+                alpha=float(properties["gridalpha"]))
+        if log:
+            ax.set_yscale("log")
+        if len(durations) > 0:
+            ax.set_xlim([1, len(durations)])
+    ax.set_xlabel("#Function evaluations",
+                  fontsize=int(properties["labelfontsize"]))
+
+    # stackplot returns PolyCollections, which cannot be put into a legend
+    proxies = [ax.bar([0], [0], color=color, linewidth=0) for color in colors]
+    fig.legend([proxy[0] for proxy in proxies], PHASE_LABELS, loc="lower center",
+               ncol=3, fontsize="small")
+
+    tight_layout()
+    subplots_adjust(top=0.9, bottom=0.18)
+    if save != "":
+        savefig(save, dpi=int(properties["dpi"]), facecolor='w',
+                edgecolor='w', orientation='portrait', papertype=None,
+                format=None, transparent=False, bbox_inches="tight",
+                pad_inches=0.1)
+    else:
+        show()
+
+
+def main(pkl_list, name_list, title="", save="", log=False, cut=sys.maxint,
+         properties=None):
+    durations_list = get_phase_durations(pkl_list, name_list, cut=cut)
+
+    sys.stdout.write("%20s | %s\n" % ("Mean time [sec]",
+                                      " | ".join(["%16s" % label for label in
+                                                  PHASE_LABELS])))
+    for i in range(len(name_list)):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            means = np.nanmean(durations_list[i], axis=0)
+        sys.stdout.write("%20s | %s\n" % (name_list[i][0],
+                                          " | ".join(["%16.5f" % mean for mean
+                                                      in means])))
+
+    plot_phases(durations_list, name_list, title=title, save=save, log=log,
+                properties=properties)
+
+    if save != "":
+        sys.stdout.write("Saving plot to " + save + "\n")
+    else:
+        sys.stdout.write("..Done\n")
+
+
+if __name__ == "__main__":
+    prog = "python plotEvaluationPhases.py WhatIsThis <oneOrMorePickles> " \
+           "[WhatIsThis <oneOrMorePickles>]"
+    description = "Plot where the wallclock time of every function " \
+                  "evaluation is spent"
+
+    parser = ArgumentParser(description=description, prog=prog)
+
+    # General Options
+    parser.add_argument("-c", "--cut", type=int, default=sys.maxint,
+                        help="Cut the experiment pickle length.")
+    parser.add_argument("-t", "--title", dest="title",
+                        default="", help="Optional supertitle for plot")
+    parser.add_argument("-s", "--save", dest="save",
+                        default="",
+                        help="Where to save plot instead of showing it?")
+    parser.add_argument("-l", "--log", action="store_true", dest="log",
+                        default=False, help="Plot on log scale")
+
+    # Properties
+    # We need this to show defaults for -h
+    defaults = plot_util.get_defaults()
+    for key in defaults:
+        parser.add_argument("--%s" % key, dest=key, default=None,
+                            help="%s, default: %s" % (key, str(defaults[key])))
+
+    args, unknown = parser.parse_known_args()
+
+    sys.stdout.write("\nFound " + str(len(unknown)) + " arguments\n")
+
+    pkl_list_main, name_list_main = plot_util.get_pkl_and_name_list(unknown)
+
+    prop = {}
+    args_dict = vars(args)
+    for key in defaults:
+        prop[key] = args_dict[key]
+
+    main(pkl_list_main, name_list_main, title=args.title, save=args.save,
+         log=args.log, cut=args.cut, properties=prop)
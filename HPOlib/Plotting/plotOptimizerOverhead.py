@@ -19,7 +19,6 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from argparse import ArgumentParser
 
-import cPickle
 import sys
 
 import numpy as numpy
@@ -39,12 +38,10 @@ def main(pkl_list, name_list, autofill, title="", log=False, save="",
 
     x_ticks = list()
     overhead_list = list()
+    pickles = plot_util.load_pickles(name_list, pkl_list)
     for exp in range(len(name_list)):
         tmp_overhead_list = list()
-        for pkl in pkl_list[exp]:
-            fh = open(pkl, "r")
-            trials = cPickle.load(fh)
-            fh.close()
+        for trials in pickles[name_list[exp][0]]:
 
             # Get all variables from the trials object
             cv_starttime = trials["cv_starttime"][:cut]
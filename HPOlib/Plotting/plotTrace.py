@@ -20,7 +20,6 @@
 
 from argparse import ArgumentParser
 import sys
-import cPickle
 
 from matplotlib.pyplot import tight_layout, figure, subplots_adjust, subplot, savefig, show, yscale
 import matplotlib.gridspec
@@ -140,9 +139,8 @@ def main(pkl_list, name_list, optimum=0, title="", log=False, save="", y_max=0,
     for i in range(len(pkl_list)):
         if len(pkl_list[i]) != 1:
             raise ValueError("%s is more than <onePickle>!" % str(pkl_list))
-        fh = open(pkl_list[i][0])
-        trl = cPickle.load(fh)
-        fh.close()
+        trl = plot_util.load_pickles([name_list[i]],
+                                     [pkl_list[i]])[name_list[i][0]][0]
         trial_list.append(plot_util.extract_results(trl))
 
     sys.stdout.write("Plotting trace\n")
@@ -19,7 +19,6 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from argparse import ArgumentParser
-import cPickle
 import itertools
 import sys
 
@@ -46,19 +45,13 @@ def main(pkl_list, name_list, autofill, optimum=0, save="", title="",
     test_list = list()
 
     x_ticks = list()
+    summaries = plot_util.load_summaries(name_list, pkl_list)
     for i in range(len(pkl_list)):
         trial_list.append(list())
         test_list.append(list())
 
-        for pkl in pkl_list[i]:
-            if pkl in plot_util.cache:
-                trials = plot_util.cache[pkl]
-            else:
-                fh = open(pkl, "r")
-                trials = cPickle.load(fh)
-                fh.close()
-                plot_util.cache[pkl] = trials
-
+        experiments = list()
+        for trials in summaries[name_list[i][0]]:
             if plot_test_performance:
                 trace, test = plot_util.extract_trajectory(trials, cut=cut,
                                                            maxvalue=maxvalue,
@@ -74,11 +67,15 @@ def main(pkl_list, name_list, autofill, optimum=0, save="", title="",
                 else:
                     test_list[-1][0].append(test[0])
                     test_list[-1][1].append(test[1])
+                trial_list[-1].append(np.array(trace))
             else:
-                trace = plot_util.extract_trajectory(trials, cut=cut,
-                                                     maxvalue=maxvalue,
-                                                     test=False)
-            trial_list[-1].append(np.array(trace))
+                experiments.append(trials)
+
+        if not plot_test_performance:
+            traces, lengths = plot_util.extract_trajectories(
+                experiments, cut=cut, maxvalue=maxvalue)
+            for trace, length in zip(traces, lengths):
+                trial_list[-1].append(trace[:length])
 
     if not plot_test_performance:
         test_list = None
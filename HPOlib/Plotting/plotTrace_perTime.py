@@ -19,7 +19,6 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from argparse import ArgumentParser
-import cPickle
 import sys
 
 
@@ -37,20 +36,21 @@ def main(pkl_list, name_list, autofill, optimum=0, save="", title="",
          y_min=None, y_max=None, x_min=None, x_max=None,
          scale_std=1, properties=None,
          aggregation="mean", print_length_trial_list=True,
-         ylabel="Minfunction value", xlabel="Duration [sec]"):
+         ylabel="Minfunction value", xlabel="Duration [sec]",
+         resolution=None):
 
     trial_list = list()
     times_list = list()
 
+    summaries = plot_util.load_summaries(name_list, pkl_list)
     for i in range(len(pkl_list)):
         tmp_trial_list = list()
         tmp_times_list = list()
-        for pkl in pkl_list[i]:
-            fh = open(pkl, "r")
-            trials = cPickle.load(fh)
-            fh.close()
+        for pkl, trials in zip(pkl_list[i], summaries[name_list[i][0]]):
             trace = plot_util.extract_trajectory(trials, maxvalue=maxvalue)
-            times = plot_util.extract_runtime_timestamps(trials=trials)
+            times = trials["runtime_timestamps"]
+            if times is None:
+                raise ValueError("Cannot extract runtimes from %s" % pkl)
             if np.isnan(times[-1]):
                 print "Last time is nan, removing trial"
                 times = times[:-1]
@@ -59,8 +59,13 @@ def main(pkl_list, name_list, autofill, optimum=0, save="", title="",
             tmp_trial_list.append(trace)
         # We feed this function with two lists of lists and get
         # one list of lists and one list
-        tmp_trial_list, tmp_times_list = plot_util.\
-            fill_trajectories(tmp_trial_list, tmp_times_list)
+        if resolution is None:
+            tmp_trial_list, tmp_times_list = plot_util.\
+                fill_trajectories(tmp_trial_list, tmp_times_list)
+        else:
+            grid = plot_util.get_log_spaced_grid(tmp_times_list, resolution)
+            tmp_trial_list, tmp_times_list = plot_util.\
+                resample_trajectories(tmp_trial_list, tmp_times_list, grid)
         trial_list.append(tmp_trial_list)
         times_list.append(tmp_times_list)
 
@@ -143,6 +148,11 @@ if __name__ == "__main__":
     parser.add_argument("--aggregation", dest="aggregation", default="mean",
                         choices=("mean", "median"),
                         help="Print Median/Quantile or Mean/Std")
+    parser.add_argument("--resolution", dest="resolution", default=None,
+                        type=int, help="Plot the traces at this many "
+                                       "log-spaced points in time instead of "
+                                       "at every change, useful for very "
+                                       "long runs")
 
     # Properties
     # We need this to show defaults for -h
@@ -171,4 +181,5 @@ if __name__ == "__main__":
          scale_std=args.scale,
          aggregation=args.aggregation,
          xlabel=args.xlabel, ylabel=args.ylabel, properties=prop,
-         print_length_trial_list=args.printlength)
+         print_length_trial_list=args.printlength,
+         resolution=args.resolution)
@@ -17,13 +17,17 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import cPickle
+import hashlib
+import heapq
 import itertools
 import logging
+import multiprocessing
 import os
 import numpy as np
 import sys
+import tempfile
 
-import HPOlib.wrapping_util
+from HPOlib.Experiment import TIMESTAMP_NAMES, load_summary
 
 __authors__ = ["Katharina Eggensperger", "Matthias Feurer"]
 __contact__ = "automl.org"
@@ -36,6 +40,37 @@ logger = logging.getLogger("HPOlib.plot_util")
 
 # A super-simple cache for unpickled objects...
 cache = dict()
+# ...and one for the summaries of experiment pickles
+summary_cache = dict()
+
+# If the environment variable HPOLIB_SUMMARY_CACHE_DIR is set, summaries of
+# experiment pickles are stored in this directory to be reused by all
+# following calls of the plotting scripts, see get_summary_cache_dir
+SUMMARY_CACHE_DIR_VARIABLE = "HPOLIB_SUMMARY_CACHE_DIR"
+# Passed to load_summaries to use get_summary_cache_dir
+DEFAULT = "default"
+# At most this many summaries are kept on disk, see prune_summary_cache
+MAX_SUMMARY_CACHE_ENTRIES = 10000
+# load_summaries only starts processes if it has to read at least this many
+# bytes of pickles and is not told the number of processes
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+# Increase this whenever the content of a summary changes
+SUMMARY_VERSION = 2
+
+
+def use_agg_backend():
+    """Render with the Agg backend, which needs no display.
+
+    Only the command line entry points of scripts which save their plot to a
+    file and doAllPlots call this, it changes the backend of the whole
+    process. It also works if pyplot was already imported with another
+    backend.
+    """
+    import matplotlib
+    if "matplotlib.pyplot" in sys.modules:
+        sys.modules["matplotlib.pyplot"].switch_backend("Agg")
+    else:
+        matplotlib.use("Agg")
 
 
 def get_empty_iterator():
@@ -85,6 +120,193 @@ def load_pickles(name_list, pkl_list):
     return pickles
 
 
+def summarize_experiment(trials):
+    """Extract everything most plotting scripts need from an experiment.
+
+    The summary is much smaller than the experiment pickle and can be used
+    instead of it for extract_trajectory, extract_trajectories, get_best,
+    get_best_value_and_index and get_best_dict. It is a dictionary with the
+    keys result, status and test_result (arrays with one entry per trial),
+    runtime_timestamps (see extract_runtime_timestamps, None if they cannot
+    be extracted), best and best_index.
+
+    trials can also be the summary written by HPOlib.Experiment, see
+    HPOlib.Experiment.load_summary.
+    """
+    summary = dict()
+    for key in ("result", "status"):
+        summary[key] = _get_trial_values(trials, key)
+    if 'trials' not in trials:
+        summary["test_result"] = trials["test_result"]
+        # Same as extract_runtime_timestamps without conf_overhead
+        summary["runtime_timestamps"] = np.concatenate((
+            [0], np.cumsum(np.sum(trials["instance_durations"], axis=1))))
+    else:
+        # Old experiment pickles have no test results
+        summary["test_result"] = np.fromiter(
+            (trial.get("test_result", np.NaN) for trial in trials['trials']),
+            dtype=np.float64, count=len(trials['trials']))
+        try:
+            summary["runtime_timestamps"] = np.array(
+                extract_runtime_timestamps(trials), dtype=np.float64)
+        except (KeyError, IndexError, TypeError, ValueError):
+            summary["runtime_timestamps"] = None
+    if len(summary["result"]) > 0:
+        summary["best"], summary["best_index"] = \
+            get_best_value_and_index(trials)
+    else:
+        summary["best"], summary["best_index"] = np.NaN, -1
+    return summary
+
+
+def get_summary_cache_dir():
+    """Return the directory of the summary cache or None if it is off.
+
+    The cache on disk is only used if HPOLIB_SUMMARY_CACHE_DIR is set."""
+    cache_dir = os.environ.get(SUMMARY_CACHE_DIR_VARIABLE)
+    return cache_dir if cache_dir else None
+
+
+def get_summary_cache_filename(pkl, cache_dir):
+    """Return the file name under which the summary of pkl is cached.
+
+    The name consists of a hash of the path of the pickle and a hash of its
+    size and modification time, a changed pickle therefore gets a new entry
+    and its old entries can be found."""
+    pkl = os.path.abspath(pkl)
+    stat = os.stat(pkl)
+    key = "%d|%f|%d" % (stat.st_size, stat.st_mtime, SUMMARY_VERSION)
+    return os.path.join(cache_dir, "%s_%s.pkl" % (
+        hashlib.md5(pkl).hexdigest()[:16], hashlib.md5(key).hexdigest()[:16]))
+
+
+def _summarize_pickle(pkl):
+    return summarize_experiment(load_summary(pkl))
+
+
+def _save_summary(pkl, summary, filename):
+    # An entry contains the path of the pickle and the summary, see
+    # prune_summary_cache
+    cache_dir = os.path.dirname(filename)
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        # Write to a temporary file first, a concurrent reader must never see
+        # a partially written summary
+        fh = tempfile.NamedTemporaryFile(dir=cache_dir, delete=False)
+        cPickle.dump(os.path.abspath(pkl), fh, cPickle.HIGHEST_PROTOCOL)
+        cPickle.dump(summary, fh, cPickle.HIGHEST_PROTOCOL)
+        fh.close()
+        os.rename(fh.name, filename)
+    except (IOError, OSError) as e:
+        logger.warning("Could not cache summary in %s: %s", filename, str(e))
+
+
+def _load_cached_summary(filename):
+    with open(filename, "rb") as fh:
+        cPickle.load(fh)
+        return cPickle.load(fh)
+
+
+def prune_summary_cache(cache_dir, max_entries=MAX_SUMMARY_CACHE_ENTRIES):
+    """Remove summaries of pickles which no longer exist or were changed and,
+    oldest first, all but max_entries summaries (None for no limit).
+
+    Returns the number of removed entries."""
+    entries = list()
+    stale = list()
+    for name in os.listdir(cache_dir):
+        filename = os.path.join(cache_dir, name)
+        if not name.endswith(".pkl") or not os.path.isfile(filename):
+            continue
+        try:
+            with open(filename, "rb") as fh:
+                pkl = cPickle.load(fh)
+            # Entries of old versions contain only the summary
+            if not isinstance(pkl, basestring) or \
+                    get_summary_cache_filename(pkl, cache_dir) != filename:
+                stale.append(filename)
+                continue
+            entries.append((os.path.getmtime(filename), filename))
+        except (IOError, OSError, EOFError, cPickle.UnpicklingError):
+            # The pickle is gone
+            stale.append(filename)
+    if max_entries is not None and len(entries) > max_entries:
+        entries.sort()
+        stale.extend([filename for mtime, filename in
+                      entries[:len(entries) - max_entries]])
+
+    removed = 0
+    for filename in stale:
+        try:
+            os.remove(filename)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def load_summaries(name_list, pkl_list, cache_dir=DEFAULT, n_jobs=None):
+    """Load the summaries of all pickles, see summarize_experiment.
+
+    Works like load_pickles, but returns summaries. Summaries are cached in
+    memory and in cache_dir, which defaults to get_summary_cache_dir (set it
+    to None to disable the cache on disk). Whenever new summaries are
+    written, the cache is pruned with prune_summary_cache. Pickles without a
+    cached summary are unpickled by n_jobs processes in parallel. By default
+    one process per CPU is used if the pickles have at least
+    PARALLEL_MIN_BYTES, otherwise they are read in this process.
+    """
+    if cache_dir == DEFAULT:
+        cache_dir = get_summary_cache_dir()
+    filenames = dict()
+    missing = list()
+    for pkl in itertools.chain(*pkl_list):
+        if pkl in summary_cache or pkl in filenames:
+            continue
+        if cache_dir is not None:
+            filenames[pkl] = get_summary_cache_filename(pkl, cache_dir)
+            try:
+                summary_cache[pkl] = _load_cached_summary(filenames[pkl])
+                # The modification time is the time of the last use
+                os.utime(filenames[pkl], None)
+                continue
+            except (IOError, OSError, EOFError, cPickle.UnpicklingError):
+                pass
+        else:
+            filenames[pkl] = None
+        missing.append(pkl)
+
+    if n_jobs is None:
+        size = sum([os.path.getsize(pkl) for pkl in missing])
+        n_jobs = multiprocessing.cpu_count() \
+            if size >= PARALLEL_MIN_BYTES else 1
+    n_jobs = min(n_jobs, len(missing))
+    if n_jobs > 1:
+        pool = multiprocessing.Pool(n_jobs)
+        try:
+            summaries = pool.map(_summarize_pickle, missing)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        summaries = [_summarize_pickle(pkl) for pkl in missing]
+
+    for pkl, summary in itertools.izip(missing, summaries):
+        summary_cache[pkl] = summary
+        if filenames[pkl] is not None:
+            _save_summary(pkl, summary, filenames[pkl])
+    if cache_dir is not None and len(missing) > 0 and \
+            os.path.isdir(cache_dir):
+        prune_summary_cache(cache_dir)
+
+    summaries = dict()
+    for i in range(len(name_list)):
+        summaries[name_list[i][0]] = [summary_cache[pkl]
+                                      for pkl in pkl_list[i]]
+    return summaries
+
+
 def get_pkl_and_name_list(argument_list):
     name_list = list()
     pkl_list = list()
@@ -142,6 +364,79 @@ def get_best_dict(name_list, pickles, cut=sys.maxint):
     return best_dict, idx_dict, keys
 
 
+def get_log_spaced_grid(times_list, num_points):
+    """Return num_points logarithmically spaced points between the first
+    positive and the last time in times_list.
+
+    Useful for resample_trajectories if runs are too long to plot every
+    single step.
+    """
+    times = np.hstack([np.asarray(times, dtype=np.float64)
+                       for times in times_list])
+    times = times[np.isfinite(times)]
+    positive = times[times > 0]
+    if len(positive) == 0:
+        return np.unique(times)
+    grid = np.logspace(np.log10(np.min(positive)), np.log10(np.max(times)),
+                       num_points)
+    # Make sure the last point is exactly the last time, it is lost due to
+    # rounding otherwise
+    grid[-1] = np.max(times)
+    return grid
+
+
+def _prepare_trajectories(trace_list, times_list):
+    if len(trace_list) != len(times_list):
+        raise ValueError("Got %d trajectories but %d lists of times" %
+                         (len(trace_list), len(times_list)))
+    traces = list()
+    times = list()
+    for trace, time_ in itertools.izip(trace_list, times_list):
+        trace = np.asarray(trace, dtype=np.float64)
+        time_ = np.asarray(time_, dtype=np.float64)
+        assert len(trace) == len(time_), "%d != %d" % (len(trace), len(time_))
+        not_nan = ~np.isnan(time_)
+        traces.append(trace[not_nan])
+        times.append(time_[not_nan])
+    # We need to define the max value =
+    # what is measured before the first evaluation
+    max_value = np.max([np.max(trace) for trace in trace_list])
+    return traces, times, max_value
+
+
+def _step_values(trace, time_, grid, max_value):
+    # Index of the last measurement at or before every point of the grid
+    indices = np.searchsorted(time_, grid, side="right") - 1
+    return np.where(indices >= 0, trace[np.maximum(indices, 0)], max_value)
+
+
+def resample_trajectories(trace_list, times_list, grid=None):
+    """Resample step functions on a common time axis.
+
+    trace_list: list of n sequences with y values
+    times_list: list of n sorted sequences with the x values at which the y
+        values were measured; entries with a NaN x value are ignored
+    grid: the x values to resample to, defaults to the union of all x values
+
+    Trajectory i has value trace_list[i][j] from times_list[i][j] until its
+    next x value. Before its first x value it has the maximum of all y
+    values, what is measured before the first evaluation.
+
+    Returns a tuple (trajectories, grid): an array of shape (n, len(grid))
+    and the grid.
+    """
+    traces, times, max_value = _prepare_trajectories(trace_list, times_list)
+    if grid is None:
+        grid = np.unique(np.hstack(times))
+    else:
+        grid = np.asarray(grid, dtype=np.float64)
+
+    trajectories = np.empty((len(traces), len(grid)))
+    for i, (trace, time_) in enumerate(itertools.izip(traces, times)):
+        trajectories[i] = _step_values(trace, time_, grid, max_value)
+    return trajectories, grid
+
+
 def fill_trajectories(trace_list, times_list):
     """ Each trajectory must have the exact same number of entries
     and timestamps
@@ -150,7 +445,8 @@ def fill_trajectories(trace_list, times_list):
     times_list: list of n lists with x values
 
     returns a list of n lists where for each x value and each y-list an
-    entry exists. time list will always start at 0
+    entry exists. x values at which no trajectory changes are removed, except
+    for the first and the last one.
 
     Example:
 
@@ -158,86 +454,56 @@ def fill_trajectories(trace_list, times_list):
     times_list = [[1,2], [1,3,5]]
 
     returns:
-    trajectories = [[5, 5, 3, 3, 3], [5, 5, 5, 2, 1]]
-    times = [0,1,2,3,5]
+    trajectories = [[5, 3, 3, 3], [5, 5, 2, 1]]
+    times = [1, 2, 3, 5]
     """
-    # We need to define the max value =
-    # what is measured before the first evaluation
-    max_value = np.max([np.max(ls) for ls in trace_list])
-
-    for idx in range(len(trace_list)):
-        assert len(trace_list[idx]) == len(times_list[idx]), \
-            "%d != %d" % (len(trace_list[idx]), len(times_list[idx]))
-
-    number_exp = len(trace_list)
-    new_trajectories = list()
-    new_times = list()
-    for i in range(number_exp):
-        new_trajectories.append(list())
-        new_times.append(list())
-    # noinspection PyUnusedLocal
-    counter = [1 for i in range(number_exp)]
-    finish = False
-
-    # We need to insert the max values in the beginning
-    # and the min values in the end
-    for i in range(number_exp):
-        trace_list[i].insert(0, max_value)
-        trace_list[i].append(np.min(trace_list[i]))
-        times_list[i].insert(0, 0)
-        times_list[i].append(sys.maxint)
-
-    # Add all possible time values
-    while not finish:
-        min_idx = np.argmin([times_list[idx][counter[idx]]
-                             for idx in range(number_exp)])
-        counter[min_idx] += 1
-        for idx in range(number_exp):
-            new_times[idx].append(times_list[min_idx][counter[min_idx] - 1])
-            new_trajectories[idx].append(trace_list[idx][counter[idx] - 1])
-        # Check if we're finished
-        for i in range(number_exp):
-            finish = True
-            if counter[i] < len(trace_list[i]) - 1:
-                finish = False
-                break
-
-    times = new_times
-    trajectories = new_trajectories
-    tmp_times = list()
-
-    # Sanitize lists and delete double entries
-    for i in range(number_exp):
-        tmp_times = list()
-        tmp_traj = list()
-        for t in range(len(times[i]) - 1):
-            if times[i][t + 1] != times[i][t] and not np.isnan(times[i][t]):
-                tmp_times.append(times[i][t])
-                tmp_traj.append(trajectories[i][t])
-        tmp_times.append(times[i][-1])
-        tmp_traj.append(trajectories[i][-1])
-        times[i] = tmp_times
-        trajectories[i] = tmp_traj
-
-    # We need only one list for all times
-    times = tmp_times
-
-    # Now clean data as sometimes the best val doesn't change over time
-    last_perf = [i*10 for i in range(number_exp)]  # dummy entry
-    time_ = list()
-    performance = list([list() for i in range(number_exp)])
-    for idx, t in enumerate(times):
-        # print t, idx, last_perf, perf_list[0][idx], perf_list[1][idx]
-        diff = sum([np.abs(last_perf[i] - trajectories[i][idx]) for i in range(number_exp)])
-        if diff != 0 or idx == 0 or idx == len(times) - 1:
-            # always use first and last entry
-            time_.append(t)
-            [performance[i].append(trajectories[i][idx]) for i in range(number_exp)]
-        last_perf = [p[idx] for p in trajectories]
-
-    trajectories = performance
-    times = time_
-    return trajectories, times
+    traces, times, max_value = _prepare_trajectories(trace_list, times_list)
+    all_times = np.unique(np.hstack(times))
+    if len(all_times) == 0:
+        return [list() for trace in traces], list()
+
+    # Only keep the x values at which at least one trajectory changes, this
+    # avoids resampling every trajectory at every x value
+    grid = [all_times[[0, -1]]]
+    for trace, time_ in itertools.izip(traces, times):
+        unique_times = np.unique(time_)
+        after = _step_values(trace, time_, unique_times, max_value)
+        before = np.r_[max_value, after[:-1]]
+        grid.append(unique_times[after != before])
+    grid = np.unique(np.hstack(grid))
+
+    trajectories, grid = resample_trajectories(trace_list, times_list, grid)
+    return trajectories.tolist(), grid.tolist()
+
+
+def _get_trial_values(experiment, key, cut=sys.maxint):
+    """Return the value key of the first cut trials as an array.
+
+    experiment is either an experiment pickle or a summary created by
+    summarize_experiment.
+    """
+    if 'trials' not in experiment:
+        return experiment[key][:cut]
+    trials = experiment['trials'][:cut]
+    return np.fromiter((trial[key] for trial in trials), dtype=np.float64,
+                       count=len(trials))
+
+
+def _accumulate_trajectories(results, status, currentbest, maxvalue):
+    """Compute the current best for every row of results.
+
+    results and status are arrays of shape (n_experiments, n_trials),
+    currentbest is the initial best value of every experiment. Invalid trials
+    (status other than 3 or non-finite results) are ignored. A result only
+    replaces the current best if it is better than the initial value, results
+    larger than maxvalue are replaced by maxvalue.
+    """
+    valid = (status == 3) & np.isfinite(results)
+    results = np.where(valid, results, np.inf)
+    candidates = np.where(results < currentbest[:, np.newaxis],
+                          np.minimum(results, maxvalue), np.inf)
+    return np.minimum.accumulate(
+        np.hstack((currentbest[:, np.newaxis], candidates)), axis=1), valid
 
 
 def extract_trajectory(experiment, cut=sys.maxint, maxvalue=sys.maxint,
@@ -253,32 +519,66 @@ def extract_trajectory(experiment, cut=sys.maxint, maxvalue=sys.maxint,
     if cut <= 0:
         raise ValueError("Argument cut cannot be zero or negative.")
 
-    trace = list([maxvalue, ])
-    test_results = None
-    if test:
-        test_results = list([maxvalue, ])
-
-    currentbest = experiment['trials'][0]["result"]
+    currentbest = _get_trial_values(experiment, "result", 1)[0]
     if not np.isfinite(currentbest):
         currentbest = maxvalue
 
-    for result in [trial for trial in experiment['trials'][:cut]]:
-        if result["status"] != 3 or not np.isfinite(result["result"]):
-            # Ignore this trial, it is not valid/finished
-            # add previous result
-            trace.append(currentbest)
-            continue
+    results = _get_trial_values(experiment, "result", cut)
+    status = _get_trial_values(experiment, "status", cut)
+    accumulated, valid = _accumulate_trajectories(
+        results[np.newaxis, :], status[np.newaxis, :],
+        np.array([currentbest], dtype=np.float64), maxvalue)
+    trace = [maxvalue] + accumulated[0, 1:].tolist()
 
-        if result["result"] < currentbest:
-            currentbest = min(maxvalue, result["result"])
-        trace.append(currentbest)
-        if test and np.isfinite(result["test_result"]):
-            test_results.append([len(trace) - 1, min(maxvalue, result["test_result"])])
     if test:
-        return trace, test_results
+        test_values = _get_trial_values(experiment, "test_result", cut)
+        test_results = [[int(idx) + 1, min(maxvalue, test_values[idx])]
+                        for idx in np.nonzero(valid[0] &
+                                              np.isfinite(test_values))[0]]
+        return trace, [maxvalue, ] + test_results
     else:
         return trace
 
+
+def extract_trajectories(experiments, cut=sys.maxint, maxvalue=sys.maxint):
+    """Extract the trajectories of many experiments at once.
+
+    Same as extract_trajectory for every experiment, but the current best is
+    computed for all experiments in one vectorized operation.
+
+    Returns a tuple (trajectories, lengths). trajectories is an array with
+    one row per experiment, rows of experiments with less trials are padded
+    with NaN. lengths is the length of every trajectory.
+    """
+    if not isinstance(cut, int):
+        raise ValueError("Argument cut must be an Integer value but is %s" %
+            type(cut))
+    if cut <= 0:
+        raise ValueError("Argument cut cannot be zero or negative.")
+
+    values = [(_get_trial_values(experiment, "result", cut),
+               _get_trial_values(experiment, "status", cut))
+              for experiment in experiments]
+    lengths = np.array([len(results) for results, status in values],
+                       dtype=np.int64)
+    num_trials = np.max(lengths) if len(lengths) > 0 else 0
+    results = np.ones((len(experiments), num_trials)) * np.NaN
+    status = np.zeros((len(experiments), num_trials))
+    currentbest = np.ones(len(experiments)) * maxvalue
+    for idx, experiment in enumerate(experiments):
+        results[idx, :lengths[idx]] = values[idx][0]
+        status[idx, :lengths[idx]] = values[idx][1]
+        first_result = _get_trial_values(experiment, "result", 1)[0]
+        if np.isfinite(first_result):
+            currentbest[idx] = first_result
+
+    trajectories, valid = _accumulate_trajectories(results, status,
+                                                   currentbest, maxvalue)
+    trajectories[:, 0] = maxvalue
+    padding = np.arange(num_trials + 1)[np.newaxis, :] > lengths[:, np.newaxis]
+    trajectories[padding] = np.NaN
+    return trajectories, lengths + 1
+
 #def extract_trajectory(trials, cut=sys.maxint):
 #    trace = list()
 #    currentbest = trials['trials'][0]
@@ -351,6 +651,33 @@ def extract_runtime_timestamps(trials, cut=sys.maxint, conf_overhead=False):
     return time_list
 
 
+def extract_phase_durations(trials, cut=sys.maxint):
+    """Extract how long each phase of every evaluation took.
+
+    trials = experiment as in a HPOlib.pkl
+    cut = consider only that many evaluations (entries of instance_order)
+
+    Returns an array with one row per evaluation in the order of
+    instance_order and one column per pair of consecutive timestamps in
+    HPOlib.Experiment.TIMESTAMP_NAMES, i.e. column i is the time between
+    timestamp i and i+1. Evaluations without timestamps (e.g. from experiment
+    pickles written by an older HPOlib) are NaN.
+    """
+    if not isinstance(cut, int):
+        raise ValueError("Argument cut must be an Integer value but is %s" %
+            type(cut))
+    if cut <= 0:
+        raise ValueError("Argument cut cannot be zero or negative.")
+
+    instance_order = trials['instance_order'][:cut]
+    timestamps = np.ones((len(instance_order), len(TIMESTAMP_NAMES))) * np.NaN
+    for idx, (trial_idx, fold) in enumerate(instance_order):
+        trial = trials['trials'][trial_idx]
+        if 'instance_timestamps' in trial:
+            timestamps[idx] = trial['instance_timestamps'][fold]
+    return np.diff(timestamps, axis=1)
+
+
 def get_best(experiment, cut=sys.maxint):
     """Return the best value found in experiment.
 
@@ -399,21 +726,56 @@ def get_best_value_and_index(trials, cut=sys.maxint):
 
 
 def get_Trace_cv(trials, maxvalue=sys.maxint):
-    trace = list()
+    """Extract the best mean cross-validation result after every fold.
+
+    The entry at position i is the best mean over the finished folds of a
+    configuration after the i-th entry of instance_order.
+    """
     trials_list = trials['trials']
-    instance_order = trials['instance_order']
-    instance_mean = np.ones([len(trials_list), 1]) * np.inf
-    instance_val = np.ones([len(trials_list), len(trials_list[0]['instance_results'])]) * np.nan
-    for tr_idx, in_idx in instance_order:
-        instance_val[tr_idx, in_idx] = trials_list[tr_idx]['instance_results'][in_idx]
-
-        val = HPOlib.wrapping_util.nan_mean(instance_val[tr_idx, :])
-        if np.isnan(val):
-            val = np.inf
-        instance_mean[tr_idx] = val
-        trace.append(np.min(instance_mean, axis=0)[0])
-    if np.isnan(trace[-1]):
-        del trace[-1]
+    instance_order = np.array(trials['instance_order'],
+                              dtype=np.int64).reshape((-1, 2))
+    if len(instance_order) == 0:
+        return list()
+    trial_indices = instance_order[:, 0]
+    values = np.array([trials_list[tr_idx]['instance_results'][in_idx]
+                       for tr_idx, in_idx in instance_order],
+                      dtype=np.float64)
+    finite = np.isfinite(values)
+
+    # Running sum and number of the finite fold results of every
+    # configuration; sort by configuration, accumulate and subtract the
+    # sum of the configurations before
+    order = np.argsort(trial_indices, kind="mergesort")
+    sorted_indices = trial_indices[order]
+    sums = np.cumsum(np.where(finite, values, 0)[order])
+    counts = np.cumsum(finite[order])
+    first = np.r_[True, sorted_indices[1:] != sorted_indices[:-1]]
+    group_start = np.maximum.accumulate(np.where(first,
+                                                 np.arange(len(order)), 0))
+    previous = group_start - 1
+    sums -= np.where(previous >= 0, sums[previous], 0)
+    counts -= np.where(previous >= 0, counts[previous], 0)
+    means = np.ones(len(order)) * np.inf
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means[order] = np.where(counts > 0, sums / counts, np.inf)
+
+    if np.all(first):
+        # Every configuration was evaluated on one fold only, the mean of a
+        # configuration never changes
+        trace = np.minimum.accumulate(means).tolist()
+    else:
+        # The mean of a configuration can get worse with the next fold, keep
+        # the current mean of all configurations in a heap and drop outdated
+        # entries lazily
+        trace = list()
+        current_means = dict()
+        heap = list()
+        for tr_idx, mean in itertools.izip(trial_indices, means):
+            current_means[tr_idx] = mean
+            heapq.heappush(heap, (mean, tr_idx))
+            while heap[0][0] != current_means[heap[0][1]]:
+                heapq.heappop(heap)
+            trace.append(heap[0][0])
 
     trace = [min(maxvalue, entry) for entry in trace]
     return trace
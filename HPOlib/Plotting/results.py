@@ -1,152 +1,226 @@
 import argparse
-from collections import defaultdict
 import ConfigParser
-import cPickle
+import itertools
+import logging
+import multiprocessing
 import os
+import sqlite3
 import StringIO
 import sys
 
 import numpy as np
 
 from HPOlib.Experiment import CANDIDATE_STATE, COMPLETE_STATE, \
-    INCOMPLETE_STATE, RUNNING_STATE, BROKEN_STATE
+    INCOMPLETE_STATE, RUNNING_STATE, BROKEN_STATE, load_summary
 import HPOlib.Plotting.plot_util as plot_util
-from HPOlib.Locker import Locker
-
-
-def get_num_runs_for_state(state, trials):
-    terminates = 0
-    for trial in trials["trials"]:
-        for instance_status in trial["instance_status"]:
-            if instance_status == state:
-                terminates += 1
-
-    return terminates
-
-def get_num_nans(trials):
-    nans = 0
-    for trial in trials['trials']:
-        for instance_result in trial['instance_results']:
-            if np.isnan(instance_result):
-                nans += 1
-
-    return  nans
-
-def get_instance_durations(trials):
-    instance_durations = []
-    for trial in trials["trials"]:
-        for instance_duration in trial["instance_durations"]:
-            if np.isfinite(instance_duration):
-                instance_durations.append(instance_duration)
-
-    return instance_durations
-
-def get_total_time(trials):
-    total_time = 0
-    for starttime, endtime in zip(trials['starttime'], trials['endtime']):
-        total_time += endtime - starttime
-    if total_time < 1:
-        print "Time might be inaccurate"
-        total_time = trials['cv_endtime'][-1] - trials['starttime'][0]
-    return total_time
-
-def collect_results(directory):
-    locker = Locker()
-    errors = []
-    sio = StringIO.StringIO()
-    sio.write("Statistics for %s\n" % directory)
-    sio.write("%30s | %6s | %7s/%7s/%7s/%7s/%7s/%7s/%7s/%7s | %10s | %10s\n" %
-             ("Optimizer", "Seed", "#conf", "#runs", "#compl", "#incom",
-              "#crashs", "#run", "#notrun", "#NaNs", "best", "AvgRunTime"))
 
 
+logger = logging.getLogger("HPOlib.Plotting.results")
+
+DEFAULT_INDEX_FILENAME = ".results.sqlite"
+# Increase this whenever the columns of the index change
+INDEX_VERSION = 1
+INDEX_COLUMNS = ["pickle TEXT PRIMARY KEY", "mtime REAL", "size INTEGER",
+                 "optimizer TEXT", "seed INTEGER", "configurations INTEGER",
+                 "instance_runs INTEGER", "complete INTEGER",
+                 "incomplete INTEGER", "crashs INTEGER", "running INTEGER",
+                 "candidates INTEGER", "nans INTEGER", "best REAL",
+                 "mean_instance_duration REAL", "error TEXT"]
+
+
+def _summarize_run(args):
+    """Summarize one experiment pickle into one row of the result index.
+
+    Returns a tuple (row, error). Exactly one of them is None.
+    """
+    subdir, exp_pkl = args
+    # The summary can be read without locking the experiment
+    try:
+        summary = load_summary(exp_pkl)
+    except Exception as e:
+        return None, exp_pkl + ' ' + str(type(e))
+
+    try:
+        cfg = ConfigParser.ConfigParser()
+        cfg.read(os.path.join(subdir, "config.cfg"))
+
+        optimizer = summary["experiment_name"]
+        optimizer = optimizer.split("/")[-1]
+
+        configurations = len(summary["result"])
+        instance_runs = len(summary["instance_order"])
+
+        # HPOlib < 0.1 don't have a seed in the config, try to
+        # infer it
+        try:
+            seed = cfg.getint("HPOLIB", "seed")
+        except:
+            experiment_name = os.path.basename(exp_pkl)[:-4]
+            seed = subdir.replace(experiment_name, "")
+            seed = seed[1:].split("_")[0]
+            seed = int(seed)
+
+        instance_status = summary["instance_status"]
+        crashs = np.sum(instance_status == BROKEN_STATE)
+        candidates = np.sum(instance_status == CANDIDATE_STATE)
+        running = np.sum(instance_status == RUNNING_STATE)
+        incomplete = np.sum(instance_status == INCOMPLETE_STATE)
+        complete = np.sum(instance_status == COMPLETE_STATE)
+        nans = np.sum(np.isnan(summary["instance_results"]))
+
+        best_performance = plot_util.get_best(summary)
+        if best_performance == sys.maxint:
+            # There is not at least one evaluated config
+            best_performance = np.nan
+    except Exception as e:
+        return None, str(e) + ' ' + exp_pkl
+
+    instance_durations = summary["instance_durations"]
+    instance_durations = instance_durations[np.isfinite(instance_durations)]
+    if len(instance_durations) > 0:
+        mean_instance_durations = np.mean(instance_durations)
+    else:
+        mean_instance_durations = np.nan
+
+    return (optimizer, int(seed), configurations, instance_runs, int(complete),
+            int(incomplete), int(crashs), int(running), int(candidates),
+            int(nans), float(best_performance),
+            float(mean_instance_durations)), None
+
+
+def find_experiment_pickles(directory):
+    """Return a list of (subdirectory, experiment pickle) tuples."""
+    experiment_pickles = []
     subdirs = os.listdir(directory)
     subdirs.sort()
-    results = defaultdict(list)
     # Look for all sub-experiments
     for subdir in subdirs:
         subdir = os.path.join(directory, subdir)
         if os.path.isdir(subdir):
             # Get the experiment pickle...
-            for possible_experiment_pickle in os.listdir(subdir):
+            for possible_experiment_pickle in sorted(os.listdir(subdir)):
                 # Some simple checks for an experiment pickle
                 if possible_experiment_pickle[-4:] == ".pkl" and \
                         possible_experiment_pickle[:-4] in subdir:
-                    exp_pkl = os.path.join(subdir, possible_experiment_pickle)
-                    locker.lock(exp_pkl)
-                    with open(exp_pkl) as fh:
-                        try:
-                            pkl = cPickle.load(fh)
-                        except Exception as e:
-                            errors.append(exp_pkl + ' ' +  str(type(e)))
-                            continue
-                    locker.unlock(exp_pkl)
-
-                    cfg = ConfigParser.ConfigParser()
-                    cfg.read(os.path.join(subdir, "config.cfg"))
-
-                    optimizer = pkl["experiment_name"]
-                    optimizer = optimizer.split("/")[-1]
-
-                    configurations = len(pkl["trials"])
-                    instance_runs = len(pkl["instance_order"])
-
-                    # HPOlib < 0.1 don't have a seed in the config, try to
-                    # infer it
-                    try:
-                        seed = cfg.getint("HPOLIB", "seed")
-                    except:
-                        seed = subdir.replace(possible_experiment_pickle[:-4],
-                                              "")
-                        seed = seed[1:].split("_")[0]
-                        seed = int(seed)
-
-                    crashs = get_num_runs_for_state(BROKEN_STATE, pkl)
-                    candidates = get_num_runs_for_state(CANDIDATE_STATE, pkl)
-                    running = get_num_runs_for_state(RUNNING_STATE, pkl)
-                    incomplete = get_num_runs_for_state(INCOMPLETE_STATE, pkl)
-                    complete = get_num_runs_for_state(COMPLETE_STATE, pkl)
-                    nans = get_num_nans(pkl)
-
-                    try:
-                        best_performance = plot_util.get_best(pkl)
-                        if best_performance == sys.maxint:
-                            # There is not at least one evaluated config
-                            best_performance = np.nan
-                    except Exception as e:
-                        errors.append(str(e) + ' ' + exp_pkl)
-                        continue
-
-                    instance_durations = get_instance_durations(pkl)
-                    mean_instance_durations = np.mean(instance_durations)
-
-                    #total_runtime = get_total_time(pkl)
-                    results[optimizer].append([optimizer, int(seed),
-                        configurations, instance_runs, complete, incomplete,
-                        crashs, running, candidates, nans, best_performance,
-                        mean_instance_durations])
-
-    def comparator(left, right):
-        if left[0] < right[0]:
-            return -1
-        elif left[0] > right[0]:
-            return 1
-        else:
-            if left[1] < right[1]:
-                return -1
-            elif left[1] > right[1]:
-                return 1
-            else:
-                return 0
-
-    for optimizer in sorted(results):
-        results[optimizer].sort(cmp=comparator)
+                    experiment_pickles.append((subdir, os.path.join(
+                        subdir, possible_experiment_pickle)))
+    return experiment_pickles
+
+
+def open_index(index_file):
+    """Open (and create) the SQLite result index.
+
+    An index written by another version of this script is discarded.
+    """
+    connection = sqlite3.connect(index_file)
+    connection.text_factory = str
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version != INDEX_VERSION:
+        connection.execute("DROP TABLE IF EXISTS runs")
+        connection.execute("PRAGMA user_version = %d" % INDEX_VERSION)
+    connection.execute("CREATE TABLE IF NOT EXISTS runs (%s)" %
+                       ", ".join(INDEX_COLUMNS))
+    connection.commit()
+    return connection
+
+
+def update_index(connection, directory, n_jobs=None):
+    """Bring the result index up to date with the pickles in directory.
+
+    Only pickles which are new or whose modification time or size changed
+    are unpickled, by n_jobs processes in parallel (default: the number of
+    CPUs). Rows of pickles which were removed are deleted. Returns the
+    number of summarized pickles.
+    """
+    indexed = dict()
+    for pickle, mtime, size in connection.execute(
+            "SELECT pickle, mtime, size FROM runs"):
+        indexed[pickle] = (mtime, size)
+
+    experiment_pickles = find_experiment_pickles(directory)
+    changed = []
+    stats = []
+    for subdir, exp_pkl in experiment_pickles:
+        # Stat before reading, a pickle which is written while we read it
+        # will be summarized again the next time
+        stat = os.stat(exp_pkl)
+        if indexed.get(exp_pkl) != (stat.st_mtime, stat.st_size):
+            changed.append((subdir, exp_pkl))
+            stats.append(stat)
+
+    if n_jobs is None:
+        n_jobs = multiprocessing.cpu_count()
+    n_jobs = min(n_jobs, len(changed))
+    if n_jobs > 1:
+        pool = multiprocessing.Pool(n_jobs)
+        try:
+            summaries = pool.map(_summarize_run, changed)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        summaries = [_summarize_run(run) for run in changed]
+
+    rows = []
+    for (subdir, exp_pkl), stat, (row, error) in \
+            zip(changed, stats, summaries):
+        if row is None:
+            row = (None, ) * (len(INDEX_COLUMNS) - 4)
+        rows.append((exp_pkl, stat.st_mtime, stat.st_size) + row + (error, ))
+    connection.executemany("INSERT OR REPLACE INTO runs VALUES (%s)" %
+                           ", ".join(["?"] * len(INDEX_COLUMNS)), rows)
+
+    existing = set([exp_pkl for subdir, exp_pkl in experiment_pickles])
+    connection.executemany("DELETE FROM runs WHERE pickle = ?",
+                           [(exp_pkl, ) for exp_pkl in indexed
+                            if exp_pkl not in existing])
+    connection.commit()
+    return len(changed)
+
+
+def collect_results(directory, index_file=None, n_jobs=None):
+    """Print statistics for all experiments in directory.
+
+    The statistics of every experiment pickle are kept in a SQLite index
+    (default: directory/.results.sqlite), only pickles which changed since
+    the last call are read again.
+    """
+    if index_file is None:
+        index_file = os.path.join(directory, DEFAULT_INDEX_FILENAME)
+    try:
+        connection = open_index(index_file)
+    except sqlite3.Error as e:
+        logger.warning("Could not open result index %s, using a temporary "
+                       "one: %s", index_file, str(e))
+        connection = open_index(":memory:")
+
+    try:
+        update_index(connection, directory, n_jobs=n_jobs)
+        results = connection.execute(
+            "SELECT optimizer, seed, configurations, instance_runs, complete, "
+            "incomplete, crashs, running, candidates, nans, best, "
+            "mean_instance_duration FROM runs WHERE error IS NULL "
+            "ORDER BY optimizer, seed").fetchall()
+        errors = [row[0] for row in connection.execute(
+            "SELECT error FROM runs WHERE error IS NOT NULL ORDER BY pickle")]
+    finally:
+        connection.close()
+
+    sio = StringIO.StringIO()
+    sio.write("Statistics for %s\n" % directory)
+    sio.write("%30s | %6s | %7s/%7s/%7s/%7s/%7s/%7s/%7s/%7s | %10s | %10s\n" %
+             ("Optimizer", "Seed", "#conf", "#runs", "#compl", "#incom",
+              "#crashs", "#run", "#notrun", "#NaNs", "best", "AvgRunTime"))
 
+    for optimizer, optimizer_results in itertools.groupby(
+            results, key=lambda result: result[0]):
         results_for_mean = []
         runtimes_for_mean = []
         total_times_for_mean = []
 
-        for result in results[optimizer]:
+        for result in optimizer_results:
+            # SQLite stores NaN as NULL
+            result = [np.nan if value is None else value for value in result]
             results_for_mean.append(float(result[10]))
             runtimes_for_mean.append(float(result[11]))
             sio.write("%30s | %6d | %7s/%7s/%7s/%7s/%7s/%7s/%7s/%7s | %10f | %10f\n"
@@ -175,6 +249,15 @@ if __name__ == "__main__":
                         help="Directory for which statistics should be "
                              "printed. Default is the current working "
                              "directory.")
+    parser.add_argument('--index', type=str, default=None,
+                        help="SQLite file in which the statistics of every "
+                             "experiment are stored. Only experiments which "
+                             "changed are read again. Default is %s in the "
+                             "directory." % DEFAULT_INDEX_FILENAME)
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="Number of processes which read experiment "
+                             "pickles. Default is the number of CPUs.")
     args = parser.parse_args()
-    sio = collect_results(args.directory)
+    sio = collect_results(args.directory, index_file=args.index,
+                          n_jobs=args.jobs)
     print sio.getvalue()
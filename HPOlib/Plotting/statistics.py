@@ -21,6 +21,7 @@
 from argparse import ArgumentParser
 from collections import defaultdict
 import cPickle
+import multiprocessing
 import StringIO
 import sys
 
@@ -34,6 +35,18 @@ __authors__ = ["Katharina Eggensperger", "Matthias Feurer"]
 __contact__ = "automl.org"
 
 
+# Critical values of the two-tailed Nemenyi test for 2 to 10 optimizers, from
+# Demsar: Statistical Comparisons of Classifiers over Multiple Data Sets,
+# JMLR 7, 2006
+NEMENYI_CRITICAL_VALUES = {
+    0.05: [1.960, 2.343, 2.569, 2.728, 2.850, 2.949, 3.031, 3.102, 3.164],
+    0.1: [1.645, 2.052, 2.291, 2.459, 2.589, 2.693, 2.780, 2.855, 2.920]}
+
+# Bootstrap samples are drawn in chunks of this size, every chunk with its
+# own seed. The result therefore does not depend on the number of processes.
+BOOTSTRAP_CHUNK_SIZE = 100
+
+
 def _get_best_trial(filename, cut=None):
     try:
         fh = open(filename, "r")
@@ -139,7 +152,7 @@ def _mann_whitney_u(x, y=None):
 
 
 def get_statistics_as_text(pkl_list, name_list, cut=sys.maxint, round_=0):
-    pickles = plot_util.load_pickles(name_list, pkl_list)
+    pickles = plot_util.load_summaries(name_list, pkl_list)
     best_dict, idx_dict, keys = plot_util.get_best_dict(name_list, pickles,
                                                         cut=cut)
 
@@ -177,7 +190,7 @@ def get_statistics_as_text(pkl_list, name_list, cut=sys.maxint, round_=0):
 
 
 def get_p_values(pkl_list, name_list, cut=sys.maxint, round_=0):
-    pickles = plot_util.load_pickles(name_list, pkl_list)
+    pickles = plot_util.load_summaries(name_list, pkl_list)
     best_dict, idx_dict, keys = plot_util.get_best_dict(name_list, pickles,
                                                        cut=cut)
     p_values = calculate_statistics(best_dict, keys, round_=round_)
@@ -185,7 +198,7 @@ def get_p_values(pkl_list, name_list, cut=sys.maxint, round_=0):
 
 
 def get_pairwise_wins(pkl_list, name_list, cut=sys.maxint, round_=0):
-    pickles = plot_util.load_pickles(name_list, pkl_list)
+    pickles = plot_util.load_summaries(name_list, pkl_list)
     best_dict, idx_dict, keys = plot_util.get_best_dict(name_list, pickles,
                                                        cut=cut)
     p_values = calculate_statistics(best_dict, keys, round_=round_)
@@ -224,6 +237,276 @@ def calculate_statistics(best_dict, keys, round_=0):
     return p_values
 
 
+def get_trajectory_matrices(pkl_list, name_list, cut=sys.maxint,
+                            maxvalue=sys.maxint):
+    """Return the trajectories of all experiments as one matrix per optimizer.
+
+    Returns a tuple (trajectories, keys). trajectories is a dictionary which
+    maps the optimizer name to an array with one row per experiment and one
+    column per function evaluation, column i is the best value found after
+    i+1 evaluations. All matrices are cut to the shortest experiment.
+    """
+    pickles = plot_util.load_summaries(name_list, pkl_list)
+    keys = [name[0] for name in name_list]
+    matrices = dict()
+    num_evaluations = sys.maxint
+    for key in keys:
+        matrix, lengths = plot_util.extract_trajectories(
+            pickles[key], cut=cut, maxvalue=maxvalue)
+        # The first column is the start value before the first evaluation
+        matrices[key] = matrix[:, 1:]
+        num_evaluations = min(num_evaluations, numpy.min(lengths) - 1)
+
+    for key in keys:
+        matrices[key] = matrices[key][:, :num_evaluations]
+    return matrices, keys
+
+
+def _bootstrap_means(args):
+    trajectories, n_bootstrap, seed = args
+    rng = numpy.random.RandomState(seed)
+    num_runs = trajectories.shape[0]
+    # Instead of copying the resampled rows, every bootstrap sample is a row
+    # of weights, the means of all samples are one matrix product
+    weights = rng.multinomial(num_runs, [1. / num_runs] * num_runs,
+                              size=n_bootstrap)
+    return weights.dot(trajectories) / float(num_runs)
+
+
+def bootstrap_confidence_intervals(trajectories, n_bootstrap=1000,
+                                   alpha=0.05, seed=1, n_jobs=1):
+    """Percentile bootstrap confidence intervals of the mean trajectory.
+
+    trajectories is an array with one row per experiment and one column per
+    function evaluation. The bootstrap samples are drawn by n_jobs processes.
+    Returns three arrays with one entry per column: the mean, the lower and
+    the upper bound of the (1 - alpha) confidence interval.
+    """
+    trajectories = numpy.asarray(trajectories, dtype=numpy.float64)
+    chunks = [(trajectories, min(BOOTSTRAP_CHUNK_SIZE, n_bootstrap - start),
+               seed + idx) for idx, start in
+              enumerate(range(0, n_bootstrap, BOOTSTRAP_CHUNK_SIZE))]
+    n_jobs = min(n_jobs, len(chunks))
+    if n_jobs > 1:
+        pool = multiprocessing.Pool(n_jobs)
+        try:
+            means = pool.map(_bootstrap_means, chunks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        means = [_bootstrap_means(chunk) for chunk in chunks]
+    means = numpy.vstack(means)
+    lower, upper = numpy.percentile(means, [50. * alpha, 100 - 50. * alpha],
+                                    axis=0)
+    return numpy.mean(trajectories, axis=0), lower, upper
+
+
+def mann_whitney_u(x, y):
+    """Two-sided Mann-Whitney U test for every column of x and y.
+
+    x and y are arrays with one row per experiment and one column per
+    function evaluation. Like scipy.stats.mannwhitneyu the p-value uses the
+    normal approximation with tie and continuity correction. Returns two
+    arrays with one entry per column, u (the number of pairs in which the
+    value of x is smaller than the value of y, ties count one half) and the
+    p-value.
+    """
+    x = numpy.asarray(x, dtype=numpy.float64)
+    y = numpy.asarray(y, dtype=numpy.float64)
+    n1 = x.shape[0]
+    n2 = y.shape[0]
+    n = n1 + n2
+
+    pairs_x = x[:, numpy.newaxis, :]
+    pairs_y = y[numpy.newaxis, :, :]
+    u = numpy.sum(pairs_x < pairs_y, axis=(0, 1)) + \
+        0.5 * numpy.sum(pairs_x == pairs_y, axis=(0, 1))
+
+    # A group of t equal values contributes t^3 - t to the tie correction
+    both = numpy.vstack((x, y))
+    num_equal = numpy.sum(both[:, numpy.newaxis, :] ==
+                          both[numpy.newaxis, :, :], axis=1)
+    ties = numpy.sum(num_equal ** 2 - 1, axis=0)
+    variance = n1 * n2 / 12. * ((n + 1) - ties / float(n * (n - 1)))
+
+    p = numpy.ones(u.shape)
+    valid = variance > 0
+    z = (numpy.abs(u[valid] - n1 * n2 / 2.) - 0.5) / \
+        numpy.sqrt(variance[valid])
+    p[valid] = 2 * stats.norm.sf(numpy.abs(z))
+    return u, p
+
+
+def average_ranks(trajectories_list):
+    """Average rank of every optimizer after every function evaluation.
+
+    trajectories_list contains one trajectory matrix per optimizer (see
+    get_trajectory_matrices). Experiments with the same row index are
+    compared with each other, all matrices must therefore have the same
+    shape. The best optimizer gets rank 1, ties get the average rank.
+    Returns an array with one row per optimizer and one column per function
+    evaluation.
+    """
+    shapes = set([numpy.shape(trajectories) for trajectories in
+                  trajectories_list])
+    if len(shapes) != 1:
+        raise ValueError("All optimizers need the same number of "
+                         "experiments and evaluations, found %s" %
+                         str(sorted(shapes)))
+    stacked = numpy.array(trajectories_list, dtype=numpy.float64)
+    smaller = numpy.sum(stacked[numpy.newaxis, :] < stacked[:, numpy.newaxis],
+                        axis=1)
+    equal = numpy.sum(stacked[numpy.newaxis, :] == stacked[:, numpy.newaxis],
+                      axis=1)
+    ranks = smaller + (equal + 1) / 2.
+    return numpy.mean(ranks, axis=1)
+
+
+def critical_difference(num_optimizers, num_experiments, alpha=0.05):
+    """Critical difference of average ranks of the Nemenyi test."""
+    if alpha not in NEMENYI_CRITICAL_VALUES:
+        raise ValueError("alpha must be one of %s" %
+                         str(sorted(NEMENYI_CRITICAL_VALUES)))
+    critical_values = NEMENYI_CRITICAL_VALUES[alpha]
+    if not 2 <= num_optimizers <= len(critical_values) + 1:
+        raise ValueError("The critical difference is only available for 2 to "
+                         "%d optimizers" % (len(critical_values) + 1))
+    return critical_values[num_optimizers - 2] * \
+        numpy.sqrt(num_optimizers * (num_optimizers + 1) /
+                   (6. * num_experiments))
+
+
+def plot_critical_difference(ranks, keys, cd, save="", title=""):
+    """Plot a critical difference diagram.
+
+    ranks contains the average rank of every optimizer in keys. Optimizers
+    whose average ranks differ by less than cd are connected by a bar.
+    """
+    from matplotlib.pyplot import figure, savefig, show
+
+    num_optimizers = len(keys)
+    order = numpy.argsort(ranks)
+    fig = figure(figsize=(8, 1.5 + 0.15 * num_optimizers))
+    ax = fig.add_subplot(111)
+    ax.set_xlim(0.5, num_optimizers + 0.5)
+    ax.set_ylim(-0.6 - 0.3 * ((num_optimizers + 1) / 2), 1.5)
+    ax.axis("off")
+    ax.set_title(title)
+
+    ax.plot([1, num_optimizers], [0, 0], color="k", linewidth=1)
+    for rank in range(1, num_optimizers + 1):
+        ax.plot([rank, rank], [0, 0.1], color="k", linewidth=1)
+        ax.text(rank, 0.2, str(rank), ha="center", va="bottom")
+    ax.plot([1, 1 + cd], [1, 1], color="k", linewidth=2)
+    ax.text(1 + cd / 2., 1.1, "CD", ha="center", va="bottom")
+
+    # The better half is labeled on the left, the worse half on the right
+    for position, idx in enumerate(order):
+        left = position < (num_optimizers + 1) / 2
+        y = -0.5 - 0.3 * (position if left else num_optimizers - 1 - position)
+        x = 0.5 if left else num_optimizers + 0.5
+        ax.plot([ranks[idx], ranks[idx], x], [0, y, y], color="k",
+                linewidth=1)
+        ax.text(x, y, "%s (%.2f)" % (keys[idx], ranks[idx]),
+                ha="right" if left else "left", va="center")
+
+    # Groups of optimizers which are not significantly different
+    groups = []
+    for start in range(num_optimizers):
+        end = start
+        while end + 1 < num_optimizers and \
+                ranks[order[end + 1]] - ranks[order[start]] < cd:
+            end += 1
+        if end > start and (len(groups) == 0 or end > groups[-1][1]):
+            groups.append((start, end))
+    for idx, (start, end) in enumerate(groups):
+        y = -0.15 - 0.1 * idx
+        ax.plot([ranks[order[start]] - 0.05, ranks[order[end]] + 0.05],
+                [y, y], color="k", linewidth=4)
+
+    if save != "":
+        savefig(save, facecolor='w', edgecolor='w', bbox_inches="tight",
+                pad_inches=0.1)
+    else:
+        show()
+
+
+def get_checkpoints(num_evaluations, num_checkpoints=5):
+    """Return log-spaced (zero-based) evaluation indices ending at the last."""
+    if num_evaluations < 1:
+        return []
+    checkpoints = numpy.logspace(0, numpy.log10(num_evaluations),
+                                 num_checkpoints)
+    return sorted(set(numpy.round(checkpoints).astype(int) - 1))
+
+
+def get_anytime_statistics_as_text(pkl_list, name_list, cut=sys.maxint,
+                                   maxvalue=sys.maxint, n_bootstrap=1000,
+                                   alpha=0.05, n_jobs=1, cd_plot=""):
+    """Compare the optimizers on the whole trajectories.
+
+    Prints bootstrap confidence intervals of the mean best value, pairwise
+    Mann-Whitney U tests and average ranks after several numbers of function
+    evaluations. If cd_plot is given, a critical difference diagram of the
+    average ranks after the last evaluation is saved there.
+    """
+    trajectories, keys = get_trajectory_matrices(pkl_list, name_list, cut=cut,
+                                                 maxvalue=maxvalue)
+    num_evaluations = trajectories[keys[0]].shape[1]
+    checkpoints = get_checkpoints(num_evaluations)
+
+    output = StringIO.StringIO()
+    output.write("Anytime statistics over %d evaluations----------------------"
+                 "-----------\n" % num_evaluations)
+    output.write("Mean best value with %.0f%% bootstrap confidence interval\n"
+                 % (100 * (1 - alpha)))
+    for key in keys:
+        mean, lower, upper = bootstrap_confidence_intervals(
+            trajectories[key], n_bootstrap=n_bootstrap, alpha=alpha,
+            n_jobs=n_jobs)
+        output.write("%10s: %s\n" % (key, ", ".join(
+            ["#%d %.5f [%.5f, %.5f]" % (i + 1, mean[i], lower[i], upper[i])
+             for i in checkpoints])))
+
+    if len(keys) > 1:
+        output.write("Mann-Whitney U test p-values\n")
+        for idx, key0 in enumerate(keys):
+            for key1 in keys[idx + 1:]:
+                u, p = mann_whitney_u(trajectories[key0], trajectories[key1])
+                output.write("%10s vs %10s: %s\n" % (key0, key1, ", ".join(
+                    ["#%d %10.5e" % (i + 1, p[i]) for i in checkpoints])))
+
+        try:
+            ranks = average_ranks([trajectories[key] for key in keys])
+        except ValueError as e:
+            output.write("Cannot compute average ranks: %s\n" % str(e))
+            ranks = None
+        if ranks is not None:
+            output.write("Average ranks\n")
+            for idx, key in enumerate(keys):
+                output.write("%10s: %s\n" % (key, ", ".join(
+                    ["#%d %.3f" % (i + 1, ranks[idx][i])
+                     for i in checkpoints])))
+            try:
+                cd = critical_difference(len(keys),
+                                         trajectories[keys[0]].shape[0],
+                                         alpha=alpha)
+                output.write("Critical difference (alpha=%g): %.3f\n"
+                             % (alpha, cd))
+                if cd_plot != "":
+                    plot_critical_difference(ranks[:, -1], keys, cd,
+                                             save=cd_plot)
+            except ValueError as e:
+                output.write("Cannot compute the critical difference: %s\n"
+                             % str(e))
+
+    output.write("------------------------------------------------------------"
+                 "------------\n")
+    output.seek(0)
+    return output
+
+
 if __name__ == "__main__":
     prog = "python statistics.py WhatIsThis <manyPickles> WhatIsThis <manyPickles> [WhatIsThis <manyPickles>]"
     description = "Return some statistical information"
@@ -235,10 +518,41 @@ if __name__ == "__main__":
     parser.add_argument("--round", dest="round_", default=0, type=int,
                         help="Round the best result before performing the"
                              "statistical test.")
+    parser.add_argument("--anytime", dest="anytime", default=False,
+                        action="store_true",
+                        help="Also compare the whole trajectories with "
+                             "bootstrap confidence intervals, Mann-Whitney U "
+                             "tests and average ranks.")
+    parser.add_argument("-m", "--maxvalue", dest="maxvalue", default=sys.maxint,
+                        type=float, help="Replace all values higher than "
+                                         "this for --anytime.")
+    parser.add_argument("--bootstrap", dest="n_bootstrap", default=1000,
+                        type=int, help="Number of bootstrap samples.")
+    parser.add_argument("--alpha", dest="alpha", default=0.05, type=float,
+                        help="Significance level of the confidence "
+                             "intervals and the critical difference; the "
+                             "critical difference is only available for "
+                             "%s." % ", ".join(
+                                 [str(alpha) for alpha in
+                                  sorted(NEMENYI_CRITICAL_VALUES)]))
+    parser.add_argument("-j", "--jobs", dest="n_jobs", default=1, type=int,
+                        help="Number of processes drawing bootstrap "
+                             "samples.")
+    parser.add_argument("--cd_plot", dest="cd_plot", default="",
+                        help="Save a critical difference diagram of the "
+                             "final average ranks here.")
     args, unknown = parser.parse_known_args()
 
+    if args.cd_plot != "":
+        plot_util.use_agg_backend()
     pkl_list_main, name_list_main = plot_util.get_pkl_and_name_list(unknown)
     output = get_statistics_as_text(pkl_list=pkl_list_main,
                                     name_list=name_list_main,
                                     cut=args.cut, round_=args.round_)
     print output.getvalue()
+    if args.anytime:
+        output = get_anytime_statistics_as_text(
+            pkl_list=pkl_list_main, name_list=name_list_main, cut=args.cut,
+            maxvalue=args.maxvalue, n_bootstrap=args.n_bootstrap,
+            alpha=args.alpha, n_jobs=args.n_jobs, cd_plot=args.cd_plot)
+        print output.getvalue()
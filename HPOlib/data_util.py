@@ -18,11 +18,16 @@
 
 import cPickle
 from gzip import GzipFile as gfile
+import hashlib
 import logging
 import os
+import tempfile
+import time
 
 import numpy as np
 
+import HPOlib.Locker as Locker
+
 __authors__ = ["Katharina Eggensperger", "Matthias Feurer"]
 __contact__ = "automl.org"
 
@@ -30,19 +35,64 @@ __contact__ = "automl.org"
 logger = logging.getLogger("HPOlib.data_util")
 
 
-def load_file(filename, file_format, use_percentage):
+# /dev/shm is a tmpfs on most linux systems, memory mapped files stored
+# there are shared between all processes on one host
+if os.path.isdir("/dev/shm"):
+    DEFAULT_SHARED_CACHE_DIR = "/dev/shm"
+else:
+    DEFAULT_SHARED_CACHE_DIR = tempfile.gettempdir()
+# Files of the shared cache start with this prefix
+SHARED_CACHE_PREFIX = "HPOlib_data_"
+# Entries which were not used for this many seconds are removed whenever a
+# new entry is created, see prune_shared_cache
+DEFAULT_SHARED_CACHE_MAX_AGE = 24 * 60 * 60
+
+
+def _cut_data(data, use_percentage):
+    if use_percentage >= 100.:
+        return data
+    max_data = int(len(data) / 100. * use_percentage)
+    return data[:max_data]
+
+
+def load_file(filename, file_format, use_percentage, cache_dir=None,
+              max_cache_size=None):
+    """Load a data file and return the first use_percentage percent of it.
+
+    Arguments:
+    filename -- Path to the data file
+    file_format -- One of gfile, pickle or numpy
+    use_percentage -- Percentage of the datapoints to return
+    cache_dir -- If not None, the data is stored as a read-only memory mapped
+        array in this directory. All evaluations on a host which load the same
+        file with the same use_percentage then share one copy of the data.
+        See load_shared_file.
+    max_cache_size -- Maximal size of the shared cache in bytes, None for no
+        limit. See prune_shared_cache.
+
+    The shared cache is off by default, a benchmark turns it on by passing
+    cache_dir, usually data_util.DEFAULT_SHARED_CACHE_DIR. Entries of older
+    versions of a data file and entries which were not used for
+    DEFAULT_SHARED_CACHE_MAX_AGE seconds are removed whenever a new entry is
+    created. To remove all entries after an experiment, set
+
+        function_teardown = python -c "import HPOlib.data_util as d;
+            d.prune_shared_cache(max_size=0)"
+
+    in the HPOLIB section of the benchmark's config.cfg (on one line).
+    """
     if not os.path.exists(filename):
         raise IOError("File %s not found", filename)
 
+    if cache_dir is not None:
+        return load_shared_file(filename, file_format, use_percentage,
+                                cache_dir, max_cache_size=max_cache_size)
+
     if file_format == "gfile":
         logger.info("Loading file: %s", filename)
         fh = gfile(filename, "rb")
         data = cPickle.load(fh)
-        if use_percentage >= 100.:
-            pass
-        else:
-            max_data = int(len(data) / 100. * use_percentage)
-            data = data[:max_data]
+        data = _cut_data(data, use_percentage)
         fh.close()
         logger.info("Done loading file: %s has %d datapoints", filename,
                     len(data))
@@ -51,10 +101,7 @@ def load_file(filename, file_format, use_percentage):
         logger.info("Loading file: %s", filename)
         fh = open(filename, "r")
         data = cPickle.load(fh)
-        if use_percentage >= 100.:
-            pass
-        else:
-            data = data[:len(data) / 100. * use_percentage]
+        data = _cut_data(data, use_percentage)
         fh.close()
         logger.info("Done loading file: %s has %d datapoints", filename,
                     len(data))
@@ -63,10 +110,7 @@ def load_file(filename, file_format, use_percentage):
         logger.info("Loading file: %s", filename)
         fh = open(filename, "r")
         data = np.load(fh)
-        if use_percentage >= 100.:
-            pass
-        else:
-            data = data[:len(data) / 100. * use_percentage]
+        data = _cut_data(data, use_percentage)
         fh.close()
         logger.info("Done loading file: %s has %d datapoints", filename,
                                                                 len(data))
@@ -77,6 +121,154 @@ def load_file(filename, file_format, use_percentage):
     return data
 
 
+def _short_hash(value):
+    return hashlib.md5(value).hexdigest()[:16]
+
+
+def get_shared_cache_filename(filename, use_percentage,
+                              cache_dir=DEFAULT_SHARED_CACHE_DIR):
+    """Return the path of the shared cache entry for a data file.
+
+    The name consists of a hash of the absolute path, a hash of the size and
+    the modification time of the data file and a hash of use_percentage. A
+    changed data file therefore never hits an old cache entry and the entries
+    of its older versions can be found, see prune_shared_cache.
+    """
+    filename = os.path.abspath(filename)
+    stat = os.stat(filename)
+    version = "%d|%f" % (stat.st_size, stat.st_mtime)
+    return os.path.join(cache_dir, "%s%s_%s_%s.npy" % (
+        SHARED_CACHE_PREFIX, _short_hash(filename), _short_hash(version),
+        _short_hash("%f" % float(use_percentage))))
+
+
+def prune_shared_cache(cache_dir=DEFAULT_SHARED_CACHE_DIR,
+                       max_age=DEFAULT_SHARED_CACHE_MAX_AGE, max_size=None,
+                       keep=None):
+    """Remove entries from the shared cache.
+
+    Entries of other versions of the data file of keep (the path of an
+    entry, which is never removed), entries which were not used for more
+    than max_age seconds and, least recently used first, entries which
+    exceed a total size of max_size bytes are removed. None disables the
+    respective limit, max_size=0 removes all entries but keep. Processes
+    which are attached to a removed entry keep their data.
+
+    Returns:
+    removed -- A list of the removed files
+    """
+    entries = list()
+    for name in os.listdir(cache_dir):
+        if not name.startswith(SHARED_CACHE_PREFIX) or \
+                not name.endswith(".npy"):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # Removed by another process
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path, name.split("_")))
+
+    stale = set()
+    if keep is not None:
+        keep = os.path.join(cache_dir, os.path.basename(keep))
+        keep_key = os.path.basename(keep).split("_")
+        stale.update([path for mtime, size, path, key in entries
+                      if key[2] == keep_key[2] and key[3] != keep_key[3]])
+    if max_age is not None:
+        oldest_allowed = time.time() - max_age
+        stale.update([path for mtime, size, path, key in entries
+                      if mtime < oldest_allowed])
+    if max_size is not None:
+        total_size = sum([size for mtime, size, path, key in entries
+                          if path not in stale])
+        for mtime, size, path, key in sorted(entries):
+            if total_size <= max_size:
+                break
+            if path not in stale and path != keep:
+                stale.add(path)
+                total_size -= size
+    stale.discard(keep)
+
+    removed = list()
+    for path in sorted(stale):
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError:
+            pass
+    if len(removed) > 0:
+        logger.info("Removed %d entries from the shared cache %s",
+                    len(removed), cache_dir)
+    return removed
+
+
+def load_shared_file(filename, file_format, use_percentage,
+                     cache_dir=DEFAULT_SHARED_CACHE_DIR, max_cache_size=None):
+    """Load a data file through a host-local, read-only shared cache.
+
+    The first process which loads a file converts it to a numpy array and
+    stores it in cache_dir. Every subsequent call attaches to this file with
+    np.load(mmap_mode='r'), the operating system then keeps only one copy of
+    the data in memory, regardless of how many evaluations run concurrently.
+    After a new entry was created the cache is pruned with
+    prune_shared_cache(cache_dir, max_size=max_cache_size).
+
+    Data which cannot be stored as a plain numpy array (e.g. a list of
+    strings) is loaded normally and not cached.
+
+    Returns:
+    data -- A read-only numpy.memmap or, if the data cannot be cached, the
+        same object load_file returns
+    """
+    cache_file = get_shared_cache_filename(filename, use_percentage,
+                                           cache_dir)
+    if os.path.exists(cache_file):
+        logger.info("Attaching to shared data %s for %s", cache_file,
+                    filename)
+        try:
+            data = np.load(cache_file, mmap_mode="r")
+            # The modification time is the time of the last use
+            os.utime(cache_file, None)
+            return data
+        except (IOError, OSError):
+            # Removed by prune_shared_cache in the meantime
+            pass
+
+    locker = Locker.Locker()
+    locker.lock_wait(cache_file)
+    try:
+        # Another process might have created the file while we were waiting
+        if not os.path.exists(cache_file):
+            raw_data = load_file(filename, file_format, use_percentage)
+            try:
+                data = np.asarray(raw_data)
+            except Exception:
+                data = None
+            if data is None or data.dtype == np.object:
+                logger.warning("Data in %s cannot be shared between "
+                               "processes, falling back to a private copy",
+                               filename)
+                return raw_data
+
+            # Write to a temporary file first so no other process can attach
+            # to a half written array
+            fh = tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".npy",
+                                             delete=False)
+            np.save(fh, data)
+            fh.close()
+            os.rename(fh.name, cache_file)
+            logger.info("Created shared data %s for %s", cache_file, filename)
+            del data
+            prune_shared_cache(cache_dir, max_size=max_cache_size,
+                               keep=cache_file)
+    finally:
+        locker.unlock(cache_file)
+
+    return np.load(cache_file, mmap_mode="r")
+
+
 def custom_split(data, n_train, n_valid):
     """
     Split the training data in such a way that the training data is divided into
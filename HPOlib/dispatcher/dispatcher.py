@@ -1,25 +1,32 @@
 import importlib
 import logging
-import numpy as np
 import re
-import time
 
 import HPOlib.wrapping_util as wrapping_util
-import HPOlib.Experiment as Experiment
 
 
 hpolib_logger = logging.getLogger("HPOlib")
 logger = logging.getLogger("HPOlib.dispatcher.dispatcher")
 
 
-def main(arguments, parameters, fold):
+def main(arguments, parameters, fold, timestamps=None, profile_base=None,
+         cfg=None):
     """
     If we are not called from cv means we are called from CLI. This means
     the optimizer itself handles crossvalidation (smac). To keep a nice .pkl we
     have to do some bookkeeping here
+
+    If timestamps is a dict, the dispatcher stores the start and end time of
+    the target algorithm under 'target_start' and 'target_end'.
+
+    If profile_base is not None, dispatchers which can profile the target
+    algorithm write the profile to a file starting with profile_base.
+
+    cfg is the experiment configuration, it is loaded if it is None.
     """
 
-    cfg = wrapping_util.load_experiment_config_file()
+    if cfg is None:
+        cfg = wrapping_util.load_experiment_config_file()
 
     dispatch_function_name = cfg.get("HPOLIB", "dispatcher")
     dispatch_function_name = re.sub("(\.py)$", "", dispatch_function_name)
@@ -28,7 +35,9 @@ def main(arguments, parameters, fold):
                                                     dispatch_function_name)
 
         additional_data, result, status, wallclock_time = \
-            dispatch_function.dispatch(cfg, fold, parameters)
+            dispatch_function.dispatch(cfg, fold, parameters,
+                                       timestamps=timestamps,
+                                       profile_base=profile_base)
     except ImportError:
         additional_data = ""
         result = float("NaN")
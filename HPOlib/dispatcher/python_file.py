@@ -3,13 +3,15 @@ import logging
 import sys
 import time
 
+import HPOlib.profiling as profiling
 import HPOlib.wrapping_util as wrapping_util
 
 
 logger = logging.getLogger("HPOlib.dispatcher.python_file")
 
 
-def dispatch(cfg, fold, params, test=False):
+def dispatch(cfg, fold, params, test=False, timestamps=None,
+             profile_base=None):
     starttime = time.time()
     wallclock_time = None
     result = float("NaN")
@@ -36,6 +38,9 @@ def dispatch(cfg, fold, params, test=False):
                      fn_name, str(e))
         return "", result, "UNSAT", time.time() - starttime
 
+    if timestamps is None:
+        timestamps = dict()
+
     try:
         # TODO: remove this hackines
         fixed_params = dict()
@@ -44,10 +49,18 @@ def dispatch(cfg, fold, params, test=False):
                 fixed_params[param[1:]] = params[param]
             else:
                 fixed_params[param] = params[param]
-        if test:
-            retval = fn(fixed_params, fold=0, folds=1)
-        else:
-            retval = fn(fixed_params, fold=fold, folds=folds)
+        if profile_base is not None:
+            profiler = profiling.start_profiler()
+        timestamps["target_start"] = time.time()
+        try:
+            if test:
+                retval = fn(fixed_params, fold=0, folds=1)
+            else:
+                retval = fn(fixed_params, fold=fold, folds=folds)
+        finally:
+            timestamps["target_end"] = time.time()
+            if profile_base is not None:
+                profiling.save_profiler(profiler, profile_base, "target")
         status = "SAT"
 
         if isinstance(retval, float):
@@ -287,7 +287,10 @@ def store_target_algorithm_calls(path, wallclock_time, result, additional_data,
     return
 
 
-def dispatch(cfg, fold, params, test=False):
+def dispatch(cfg, fold, params, test=False, timestamps=None,
+             profile_base=None):
+    # profile_base is ignored, the target algorithm is a separate process
+    # which cannot be profiled by cProfile
     param_string = " ".join(["-" + key + " " + str(params[key]) for key in params])
     time_string = wrapping_util.get_time_string()
     run_instance_output = os.path.join(os.getcwd(),
@@ -302,6 +305,10 @@ def dispatch(cfg, fold, params, test=False):
     fh.close()
     endtime = time.time()
 
+    if timestamps is not None:
+        timestamps["target_start"] = starttime
+        timestamps["target_end"] = endtime
+
     with open(run_instance_output, "r") as fh:
         run_instance_content = fh.readlines()
     with open(runsolver_output_file, "r") as fh:
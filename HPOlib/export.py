@@ -0,0 +1,365 @@
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Export experiment pickles into formats readable by other programs.
+
+Besides the JSON dump of a single pickle, many pickles can be exported into
+one dataset with one row per trial. The dataset is partitioned by optimizer,
+every pickle is written to <output>/optimizer=<name>/part-<i>.<extension>
+(.npz files are written per chunk to part-<i>-<chunk>.npz). Rows are written
+in chunks, the output is never built in memory as a whole and every pickle is
+read once. All partitions share the same columns: one result column for every
+fold of the experiment with the most folds and, with a searchspace, one
+column per hyperparameter, otherwise one column with the parameters as JSON.
+"""
+
+import argparse
+import cPickle
+import csv
+import itertools
+import json
+import logging
+import os
+
+import numpy as np
+
+import HPOlib.Experiment as Experiment
+from HPOlib.format_converter import configuration_space
+from HPOlib.format_converter import pcs_parser
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+__authors__ = ["Katharina Eggensperger", "Matthias Feurer"]
+__contact__ = "automl.org"
+
+
+logger = logging.getLogger("HPOlib.export")
+
+FORMATS = ["json", "csv", "ndjson", "columnar"]
+# Name of the column with all parameters as JSON if there is no searchspace
+PARAMS_COLUMN = "params"
+DEFAULT_CHUNK_SIZE = 1000
+
+# Values of a trial which are exported and their default for experiment
+# pickles of older HPOlib versions. A row consists of the run (the name of
+# the experiment directory), the trial id, these values, the result of every
+# fold and one column per parameter.
+TRIAL_COLUMNS = [("status", int, 0),
+                 ("result", float, np.NaN), ("std", float, np.NaN),
+                 ("duration", float, np.NaN), ("test_status", int, 0),
+                 ("test_result", float, np.NaN),
+                 ("test_duration", float, np.NaN)]
+
+
+class JSONWriter(object):
+    def convert_ndarray(self, obj):
+        return list(obj)
+
+    def convert(self, obj):
+        if isinstance(obj, np.ndarray):
+            return self.convert_ndarray(obj)
+        else:
+            raise Exception
+
+    def write(self, fh, pkl):
+        fh.write(json.dumps(pkl, default=self.convert))
+
+
+def get_param_columns(searchspace):
+    """Return a list of (column name, type) tuples for the parameters.
+
+    There is one column for every hyperparameter of the searchspace (see
+    pcs_parser.read), numerical hyperparameters are floats, all others
+    strings.
+    """
+    columns = list()
+    for name, hyperparameter in searchspace.items():
+        if isinstance(hyperparameter,
+                      configuration_space.NumericalHyperparameter):
+            columns.append((name, float))
+        else:
+            columns.append((name, str))
+    return columns
+
+
+def get_dataset_folds(pkl_files):
+    """Return the maximal number of folds of all pickles of a dataset.
+
+    Uses the experiment summaries, see Experiment.load_summary.
+    """
+    return max([Experiment.load_summary(pkl_file)['folds']
+                for pkl_file in pkl_files])
+
+
+def get_columns(folds, param_columns=None):
+    """Return the list of (column name, type) tuples of a dataset.
+
+    param_columns are the columns of get_param_columns, if they are None
+    all parameters are stored as JSON in the column PARAMS_COLUMN.
+    """
+    columns = [("run", str), ("id", int)]
+    columns.extend([(key, type_) for key, type_, default in TRIAL_COLUMNS])
+    columns.extend([("fold_%d_result" % fold, float)
+                    for fold in range(folds)])
+    if param_columns is None:
+        columns.append((PARAMS_COLUMN, str))
+    else:
+        columns.extend([("param_%s" % name, type_) for name, type_ in
+                        param_columns])
+    return columns
+
+
+def _strip_name(name):
+    # Old experiment pickles store parameter names with a leading minus
+    return name[1:] if name.startswith("-") else name
+
+
+def _convert(value, type_):
+    if value is None:
+        return np.NaN if type_ is float else ""
+    try:
+        return type_(value)
+    except ValueError:
+        return np.NaN if type_ is float else ""
+
+
+def iter_rows(experiment, run, folds, param_columns=None):
+    """Yield one list of values per trial, see get_columns.
+
+    Experiments with less than folds folds get NaN as the missing results.
+    """
+    for trial_id, trial in enumerate(experiment['trials']):
+        row = [run, trial_id]
+        row.extend([type_(trial.get(key, default)) for key, type_, default in
+                    TRIAL_COLUMNS])
+        results = [float(value) for value in trial['instance_results']]
+        row.extend(results + [np.NaN] * (folds - len(results)))
+        params = dict((_strip_name(name), value) for name, value in
+                      trial['params'].items())
+        if param_columns is None:
+            row.append(json.dumps(params, sort_keys=True, default=str))
+        else:
+            row.extend([_convert(params.get(name), type_)
+                        for name, type_ in param_columns])
+        yield row
+
+
+def _is_missing(value):
+    return isinstance(value, float) and np.isnan(value)
+
+
+class CSVDatasetWriter(object):
+    extension = "csv"
+
+    def __init__(self, filename, columns):
+        self.filenames = [filename]
+        self.fh = open(filename, "wb")
+        self.writer = csv.writer(self.fh)
+        self.writer.writerow([name for name, type_ in columns])
+
+    def write_rows(self, rows):
+        self.writer.writerows([["" if _is_missing(value) else value
+                                for value in row] for row in rows])
+
+    def close(self):
+        self.fh.close()
+
+
+class NDJSONDatasetWriter(object):
+    extension = "ndjson"
+
+    def __init__(self, filename, columns):
+        self.filenames = [filename]
+        self.fh = open(filename, "w")
+        self.names = [name for name, type_ in columns]
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.fh.write(json.dumps(dict(zip(self.names, [
+                None if _is_missing(value) else value for value in row]))))
+            self.fh.write("\n")
+
+    def close(self):
+        self.fh.close()
+
+
+class NPZDatasetWriter(object):
+    """Columnar fallback if pyarrow is not installed.
+
+    An .npz file cannot be appended to, so every chunk of rows is written
+    to its own file <filename>-<chunk>.npz. Every column is one array,
+    strings are stored as fixed-width byte strings so that the files can be
+    read without pickle. If there are no rows, one file with empty columns
+    is written.
+    """
+    extension = "npz"
+
+    def __init__(self, filename, columns):
+        self.prefix = os.path.splitext(filename)[0]
+        self.columns = columns
+        self.filenames = list()
+
+    def _dtype(self, type_):
+        return np.float64 if type_ is float else \
+            (np.int64 if type_ is int else str)
+
+    def _save(self, arrays):
+        filename = "%s-%05d.%s" % (self.prefix, len(self.filenames),
+                                   self.extension)
+        with open(filename, "wb") as fh:
+            np.savez(fh, **arrays)
+        self.filenames.append(filename)
+
+    def write_rows(self, rows):
+        self._save(dict((name, np.array(values, dtype=self._dtype(type_)))
+                        for (name, type_), values in
+                        zip(self.columns, zip(*rows))))
+
+    def close(self):
+        if len(self.filenames) == 0:
+            self._save(dict((name, np.array([], dtype=self._dtype(type_)))
+                            for name, type_ in self.columns))
+
+
+class ParquetDatasetWriter(object):
+    """Writes every chunk of rows as one row group of a Parquet file."""
+    extension = "parquet"
+
+    def __init__(self, filename, columns):
+        types = {float: pyarrow.float64(), int: pyarrow.int64(),
+                 str: pyarrow.string()}
+        self.schema = pyarrow.schema([pyarrow.field(name, types[type_])
+                                      for name, type_ in columns])
+        self.writer = pyarrow.parquet.ParquetWriter(filename, self.schema)
+        self.filenames = [filename]
+
+    def write_rows(self, rows):
+        arrays = [pyarrow.array(values, type=field.type) for values, field in
+                  zip(zip(*rows), self.schema)]
+        self.writer.write_table(pyarrow.Table.from_arrays(
+            arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def get_dataset_writer(fmt):
+    if fmt == "csv":
+        return CSVDatasetWriter
+    elif fmt == "ndjson":
+        return NDJSONDatasetWriter
+    elif fmt == "columnar":
+        if pyarrow is not None:
+            return ParquetDatasetWriter
+        logger.info("pyarrow is not installed, writing .npz files instead "
+                    "of Parquet")
+        return NPZDatasetWriter
+    raise ValueError("Unknown dataset format %s, must be one of %s" %
+                     (fmt, str(FORMATS[1:])))
+
+
+def export_dataset(pkl_files, output_directory, fmt,
+                   searchspace=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Export many experiment pickles into one partitioned dataset.
+
+    Returns the list of written files.
+    """
+    writer_class = get_dataset_writer(fmt)
+    folds = get_dataset_folds(pkl_files)
+    param_columns = get_param_columns(searchspace) \
+        if searchspace is not None else None
+    columns = get_columns(folds, param_columns)
+    filenames = list()
+    for idx, pkl_file in enumerate(pkl_files):
+        with open(pkl_file) as fh:
+            experiment = cPickle.load(fh)
+        optimizer = experiment['experiment_name'].split("/")[-1]
+        run = os.path.basename(os.path.dirname(os.path.abspath(pkl_file)))
+
+        partition = os.path.join(output_directory, "optimizer=%s" % optimizer)
+        if not os.path.isdir(partition):
+            os.makedirs(partition)
+        filename = os.path.join(partition, "part-%05d.%s" %
+                                (idx, writer_class.extension))
+
+        writer = writer_class(filename, columns)
+        try:
+            rows = iter_rows(experiment, run, folds, param_columns)
+            while True:
+                chunk = list(itertools.islice(rows, chunk_size))
+                if len(chunk) == 0:
+                    break
+                writer.write_rows(chunk)
+        finally:
+            writer.close()
+        filenames.extend(writer.filenames)
+    return filenames
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert HPOlib experiment pickles into a format "
+                    "readable by other programming languages.")
+    parser.add_argument("input", type=str, nargs="+",
+                        help="Input files; HPOlib experiment pickles")
+    parser.add_argument("output", type=str,
+                        help="Output: a filename in an existing directory "
+                             "for json, a directory for all other types")
+    parser.add_argument("-t", "--type", type=str, choices=FORMATS,
+                        default="json",
+                        help="Output file type. json dumps a single pickle, "
+                             "all other types write one dataset with one "
+                             "row per trial. columnar writes Parquet if "
+                             "pyarrow is installed and .npz otherwise.")
+    parser.add_argument("-s", "--searchspace", type=str, default=None,
+                        help="A searchspace in the pcs format; creates one "
+                             "typed column per hyperparameter instead of "
+                             "one column with all parameters as JSON")
+    parser.add_argument("--chunk_size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Number of rows which are written at once")
+
+    args = parser.parse_args()
+    if args.type == 'json':
+        if len(args.input) != 1:
+            parser.error("json exports exactly one pickle")
+        writer = JSONWriter()
+        with open(args.input[0]) as fh:
+            experiment_pkl = cPickle.load(fh)
+
+        output_filename = args.output + '.' + args.type
+        with open(output_filename, "w") as fh:
+            writer.write(fh, experiment_pkl)
+        return
+
+    searchspace = None
+    if args.searchspace is not None:
+        with open(args.searchspace) as fh:
+            searchspace = pcs_parser.read(fh)
+    filenames = export_dataset(args.input, args.output, args.type,
+                               searchspace=searchspace,
+                               chunk_size=args.chunk_size)
+    print "Wrote %d files to %s" % (len(filenames), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,11 +21,106 @@
 __authors__ = ["Katharina Eggensperger", "Matthias Feurer"]
 __contact__ = "automl.org"
 
-from collections import deque, OrderedDict
+from collections import OrderedDict
+import hashlib
+import heapq
+import itertools
 import re
 
-import networkx as nx
 import numpy as np
+import scipy.special
+
+
+class Condition(object):
+    """A parsed condition like "a == 1" or "a in {1,2}".
+
+    name is the name of the parent hyperparameter, operator either == or in,
+    value the unparsed value and values the list of allowed values (as
+    strings). Use Condition.parse, it parses every string only once.
+    """
+    _cache = dict()
+
+    def __init__(self, name, operator, values):
+        if operator not in ("==", "in"):
+            raise NotImplementedError("Unknown operator %s in condition on "
+                                      "%s" % (operator, name))
+        self.name = name
+        self.operator = operator
+        self.values = list(values)
+        if operator == "==":
+            self.value = self.values[0]
+        else:
+            self.value = "{" + ",".join(self.values) + "}"
+
+    def __repr__(self):
+        return "%s %s %s" % (self.name, self.operator, self.value)
+
+    def __eq__(self, other):
+        return isinstance(other, self.__class__) and \
+            str(self) == str(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    @classmethod
+    def parse(cls, condition):
+        parsed = cls._cache.get(condition)
+        if parsed is None:
+            try:
+                name, operator, value = condition.split()
+            except ValueError:
+                raise ValueError("Cannot parse condition %s" % condition)
+            if operator == "in":
+                values = value[1:-1].split(",")
+            else:
+                values = [value]
+            parsed = cls(name, operator, values)
+            cls._cache[condition] = parsed
+        return parsed
+
+
+class ForbiddenClause(object):
+    """A forbidden combination of values like {a=1, b=x}.
+
+    assignments is a list of (name, value) tuples, values are compared as
+    strings. A configuration is forbidden if it assigns all of these values.
+    """
+    def __init__(self, assignments):
+        if isinstance(assignments, dict):
+            assignments = assignments.items()
+        self.assignments = [(name, str(value)) for name, value in
+                            assignments]
+        if len(self.assignments) == 0:
+            raise ValueError("A forbidden clause needs at least one "
+                             "assignment")
+
+    def __repr__(self):
+        return "{%s}" % ", ".join(["%s=%s" % (name, value) for name, value
+                                   in self.assignments])
+
+    def __eq__(self, other):
+        return isinstance(other, self.__class__) and \
+            sorted(self.assignments) == sorted(other.assignments)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def is_forbidden(self, configuration):
+        """Return True if configuration (a dictionary of names and values)
+        assigns all values of this clause."""
+        for name, value in self.assignments:
+            if name not in configuration or \
+                    str(configuration[name]) != value:
+                return False
+        return True
+
+
+class SearchSpace(OrderedDict):
+    """An ordered dictionary of hyperparameters (name -> hyperparameter)
+    together with the forbidden clauses of the search space."""
+    def __init__(self, *args, **kwargs):
+        self.forbidden_clauses = list()
+        super(SearchSpace, self).__init__(*args, **kwargs)
 
 
 class Hyperparameter(object):
@@ -74,30 +169,18 @@ class Hyperparameter(object):
         # Check if this is a single condition of form "a == 2" and there
         # exists "a == 1" so they can be condensed into "a in {1,2}"
         elif len(condition) == 1:
-            depends_on = condition[0].split()[0]
-            condition_to_add = condition[0].split()[2]
+            to_add = Condition.parse(condition[0])
             for i, sc in enumerate(self.conditions):
-                if len(sc) == 1 and sc[0].split()[0] == depends_on:
+                if len(sc) == 1 and Condition.parse(sc[0]).name == \
+                        to_add.name:
                     # Conditions can be condensed
-                    condition_values = sc[0].split()[2]
-                    if "," in condition_values:
-                        condition_values = condition_values[1:-1].split(",")
-                        if condition_to_add in condition_values:
-                            added = True
-                            break
-                        else:
-                            condition_values.append(condition_to_add)
-                            self.conditions[i][0] = "%s in %s" % (depends_on,
-                                        "{" + ",".join(condition_values) + "}")
-                    else:
-                        if condition_to_add == condition_values:
-                            added = True
-                            break
-                        else:
-                            condition_values = [condition_values,
-                                                condition_to_add]
-                            self.conditions[i][0] = "%s in %s" % (depends_on,
-                                "{" + ",".join(condition_values) + "}")
+                    condition_values = list(Condition.parse(sc[0]).values)
+                    for value in to_add.values:
+                        if value not in condition_values:
+                            condition_values.append(value)
+                    if len(condition_values) > 1:
+                        self.conditions[i][0] = str(Condition(
+                            to_add.name, "in", condition_values))
                     added = True
                     break
 
@@ -416,122 +499,484 @@ class NormalIntegerHyperparameter(IntegerHyperparameter):
                 q=self.q, base=self.base, conditions=self.conditions)
 
 
-def create_dag_from_hyperparameters(hyperparameters):
-    if type(hyperparameters) in [dict, OrderedDict]:
-        hyperparameters = hyperparameters.values()
-    elif type(hyperparameters) in [list, tuple]:
-        pass
-    else:
-        raise ValueError("Type %s not supported (%s)" %
-                         (type(hyperparameters), str(hyperparameters)))
-    hyperparameters.sort(key=lambda theta: theta.name, reverse=True)
+def sort_topologically(hyperparameters):
+    """Return the hyperparameters such that every parent comes before its
+    children.
+
+    Hyperparameters without an order between them are sorted by their
+    names. Raises a ValueError if a condition depends on an unknown
+    hyperparameter or if the conditions contain a cycle.
+    """
+    by_name = dict((hyperparameter.name, hyperparameter)
+                   for hyperparameter in hyperparameters)
+    children = dict((name, set()) for name in by_name)
+    num_parents = dict()
+    for hyperparameter in hyperparameters:
+        parents = set()
+        for conditions in hyperparameter.conditions:
+            for condition in conditions:
+                parent = Condition.parse(condition).name
+                if parent not in by_name:
+                    raise ValueError("%s depends on %s which is not defined"
+                                     % (hyperparameter.name, parent))
+                parents.add(parent)
+        num_parents[hyperparameter.name] = len(parents)
+        for parent in parents:
+            children[parent].add(hyperparameter.name)
+
+    # Kahn's algorithm
+    ready = [name for name in by_name if num_parents[name] == 0]
+    heapq.heapify(ready)
+    order = list()
+    while len(ready) > 0:
+        name = heapq.heappop(ready)
+        order.append(by_name[name])
+        for child in children[name]:
+            num_parents[child] -= 1
+            if num_parents[child] == 0:
+                heapq.heappush(ready, child)
+
+    if len(order) != len(by_name):
+        cycle = sorted([name for name in num_parents if num_parents[name] > 0])
+        raise ValueError("Hyperparameter configurations contain a cycle "
+                         "between %s" % str(cycle))
+    return order
+
+
+ROOT = '__HPOlib_configuration_space_root__'
+
+# DAGs of all search spaces seen so far, see create_dag_from_hyperparameters
+dag_cache = dict()
+
+
+class DAG(object):
+    """The hyperparameters of a configuration space and their conditions.
+
+    There is an edge from every parent to a hyperparameter which depends on
+    it and from ROOT to every unconditional hyperparameter. nodes contains
+    the names of the hyperparameters in topological order, children maps
+    every node (including ROOT) to a dictionary of its children and the
+    condition of the edge, which is a tuple (parent, operator, value) or
+    None for edges from ROOT.
+    """
+    def __init__(self, nodes, children, hyperparameters):
+        self.nodes = nodes
+        self.children = children
+        self.hyperparameters = hyperparameters
+
+    def __contains__(self, name):
+        return name in self.hyperparameters
+
+    def get_hyperparameter(self, name):
+        return self.hyperparameters[name]
+
+    def get_children(self, name):
+        """Return an OrderedDict of the children of name sorted by their
+        names."""
+        return OrderedDict(sorted(self.children[name].items()))
+
+
+def get_space_hash(hyperparameters):
+    """Return a hash of the names and conditions of hyperparameters, which
+    determine the structure of their DAG."""
+    structure = sorted([(hyperparameter.name, hyperparameter.conditions)
+                        for hyperparameter in hyperparameters])
+    return hashlib.md5(repr(structure)).hexdigest()
+
+
+def _get_ancestors(name, parents, ancestors):
+    if name not in ancestors:
+        found = set()
+        for parent in parents[name]:
+            found.add(parent)
+            found.update(_get_ancestors(parent, parents, ancestors))
+        ancestors[name] = found
+    return ancestors[name]
+
 
-    dg = nx.DiGraph()
-    dg.add_node('__HPOlib_configuration_space_root__')
-    to_visit = deque(hyperparameters)
-    visited = dict()
+def _create_children(hyperparameters):
+    children = dict([(ROOT, dict())])
+    # The direct parents of every node, used to find the ancestors
+    parents = dict()
+    ancestors = dict([(ROOT, set())])
 
-    while len(to_visit) > 0:
-        # TODO: there is no cycle detection in here!
-        hyperparameter = to_visit.popleft()
+    for hyperparameter in hyperparameters:
         name = hyperparameter.name
+        children[name] = dict()
+        parents[name] = list()
 
+        # All parents are already inserted into the Graph
+        depends_on = []
         if hyperparameter.conditions != [[]]:
-            # Extend to handle or-conditions
-            #if len(hyperparameter.conditions) > 1:
-            #    print hyperparameter.name, hyperparameter.conditions
-            #    raise NotImplementedError()
-
-            # extract all conditions and check if all parent nodes are
-            # already inserted into the Graph
-            depends_on = []
-            do_continue = False
-            for i, conditions in enumerate(hyperparameter.conditions):
+            for conditions in hyperparameter.conditions:
                 depends_on.append([])
                 for condition in conditions:
-                    depends_on_name = condition.split()[0]
-                    operator = condition.split()[1]
-                    value = condition.split()[2]
-                    if depends_on_name not in visited:
-                        to_visit.append(hyperparameter)
-                        continue
-                    depends_on[-1].append((depends_on_name, operator, value))
-                if len(depends_on[-1]) != len(conditions):
-                    do_continue = True
-                    continue
-            if do_continue:
-                continue
-        else:
-            depends_on = []
-
-        visited[name] = hyperparameter
-        dg.add_node(name, hyperparameter=hyperparameter)
+                    condition = Condition.parse(condition)
+                    depends_on[-1].append((condition.name,
+                                           condition.operator,
+                                           condition.value))
 
         if len(depends_on) == 0:
-            dg.add_edge('__HPOlib_configuration_space_root__', name)
-        else:
-            for dependency_path in depends_on:
-                if len(dependency_path) == 1:
-                    d_name, op, value = dependency_path[0]
-                    dg.add_edge(d_name, name, condition=(d_name, op, value))
-                else:
-                    # Add links to all direct parents, these can be less than
-                    # the number of values in depends_on. The direct parent
-                    # depends on all other values in depends_on except itself
-                    parents = []
-                    for i, d in enumerate(dependency_path):
-                        d_name, op, value = d
-                        parents.append(nx.ancestors(dg, d_name))
-
-                    candidates = []
-                    for i, d in enumerate(dependency_path):
-                        d_name, op, value = d
-                        for j, d2 in enumerate(dependency_path):
-                            if i == j:
-                                continue
-                            if d_name in parents[j]:
-                                candidates.append(j)
-                            else:
-                                continue
-
-                    if len(candidates) != 1:
-                        print hyperparameter, depends_on
-                        print parents
-                        print candidates
-                        raise ValueError()
-
-                    parent = dependency_path[candidates[0]][0]
-                    condition = dependency_path[candidates[0]]
-
-                    dg.add_edge(parent, name, condition=condition)
-
-    if not nx.is_directed_acyclic_graph(dg):
-        cycles = list(nx.simple_cycles(dg))
-        raise ValueError("Hyperparameter configurations contain a cycle %s" %
-                         str(cycles))
-    """
-    nx.write_dot(DG, "hyperparameters.dot")
-    import matplotlib.pyplot as plt
-    plt.title("draw_networkx")
-    pos = nx.graphviz_layout(DG, prog='dot')
-    nx.draw(DG, pos, with_labels=True)
-    plt.savefig('nx_test.png')
+            children[ROOT][name] = None
+            parents[name].append(ROOT)
+            continue
+
+        for dependency_path in depends_on:
+            if len(dependency_path) == 1:
+                condition = dependency_path[0]
+            else:
+                # Add links to all direct parents, these can be less than
+                # the number of values in depends_on. The direct parent
+                # depends on all other values in depends_on except itself
+                candidates = []
+                for i, d in enumerate(dependency_path):
+                    for j, d2 in enumerate(dependency_path):
+                        if i == j:
+                            continue
+                        if d[0] in _get_ancestors(d2[0], parents, ancestors):
+                            candidates.append(j)
+
+                if len(candidates) != 1:
+                    raise ValueError("Cannot find the direct parent of %s "
+                                     "in %s" % (name, str(dependency_path)))
+                condition = dependency_path[candidates[0]]
+
+            children[condition[0]][name] = condition
+            parents[name].append(condition[0])
+    return children
+
+
+def create_dag_from_hyperparameters(hyperparameters):
+    """Return the DAG of hyperparameters, see DAG.
+
+    The structure of the DAG is cached by the names and conditions of the
+    hyperparameters, building the DAG of a known search space again only
+    costs computing its hash. Raises a ValueError if the conditions contain
+    a cycle or depend on unknown hyperparameters.
     """
-    return dg
+    if isinstance(hyperparameters, dict):
+        hyperparameters = hyperparameters.values()
+    elif type(hyperparameters) in [list, tuple]:
+        pass
+    else:
+        raise ValueError("Type %s not supported (%s)" %
+                         (type(hyperparameters), str(hyperparameters)))
+
+    space_hash = get_space_hash(hyperparameters)
+    if space_hash not in dag_cache:
+        hyperparameters = sort_topologically(hyperparameters)
+        dag_cache[space_hash] = (
+            [hyperparameter.name for hyperparameter in hyperparameters],
+            _create_children(hyperparameters))
+    nodes, children = dag_cache[space_hash]
+    return DAG(nodes, children, dict((hyperparameter.name, hyperparameter)
+                                     for hyperparameter in hyperparameters))
 
 
 def get_dag(dag):
-    sorted_dag = dag.copy()
-
-    # The children of a node are traversed in a random order. Therefore,
-    # copy the graph, sort the children and then traverse it
-    for adj in sorted_dag.adj:
-        sorted_dag.adj[adj] = OrderedDict(
-            sorted(sorted_dag.adj[adj].items(), key=lambda item: item[0]))
-
-    nodes = nx.dfs_postorder_nodes(sorted_dag,
-                                   source='__HPOlib_configuration_space_root__')
-    nodes = [node for node in nodes if node !=
-             '__HPOlib_configuration_space_root__']
+    """Return the names of all hyperparameters in the depth-first postorder
+    from the root of dag, the children of a node are visited in the order
+    of their names."""
+    nodes = []
+    visited = set([ROOT])
+    stack = [(ROOT, iter(sorted(dag.children[ROOT])))]
+    while len(stack) > 0:
+        node, children = stack[-1]
+        for child in children:
+            if child not in visited:
+                visited.add(child)
+                stack.append((child, iter(sorted(dag.children[child]))))
+                break
+        else:
+            stack.pop()
+            if node != ROOT:
+                nodes.append(node)
     return nodes
 
+
+class ConfigurationSpace(object):
+    """A configuration space which samples, encodes and decodes many
+    configurations at once.
+
+    A configuration is represented by one row of a matrix with one column
+    per hyperparameter (in the order of the attribute names) and values in
+    the unit hypercube. Inactive hyperparameters are NaN. Numerical
+    hyperparameters are scaled linearly (logarithmically if they have a
+    base) between lower and upper, normal hyperparameters by their
+    cumulative distribution function. Choice i of a categorical
+    hyperparameter with k choices is (i + 0.5) / k.
+
+    forbidden_clauses is a list of ForbiddenClause, if it is None the
+    forbidden clauses of a SearchSpace are used.
+    """
+    def __init__(self, hyperparameters, forbidden_clauses=None):
+        if forbidden_clauses is None:
+            forbidden_clauses = getattr(hyperparameters, "forbidden_clauses",
+                                        list())
+        if isinstance(hyperparameters, dict):
+            hyperparameters = hyperparameters.values()
+        # The DAG gives an order in which every parent comes before its
+        # children
+        dag = create_dag_from_hyperparameters(list(hyperparameters))
+        self.names = list(reversed(get_dag(dag)))
+        self.hyperparameters = [dag.get_hyperparameter(name)
+                                for name in self.names]
+        self.index = dict((name, i) for i, name in enumerate(self.names))
+
+        # For every hyperparameter a list of or-conditions, each a list of
+        # (parent index, allowed values in the unit hypercube)
+        self.conditions = list()
+        for hyperparameter in self.hyperparameters:
+            or_conditions = list()
+            if hyperparameter.has_conditions():
+                for and_conditions in hyperparameter.conditions:
+                    or_conditions.append([self._compile_condition(condition)
+                                          for condition in and_conditions])
+            self.conditions.append(or_conditions)
+
+        # For every forbidden clause a list of (index, forbidden value in the
+        # unit hypercube)
+        self.forbidden_clauses = list(forbidden_clauses)
+        self.forbidden = [self._compile_forbidden_clause(clause)
+                          for clause in self.forbidden_clauses]
+
+    def __len__(self):
+        return len(self.names)
+
+    def _compile_condition(self, condition):
+        condition = Condition.parse(condition)
+        values = condition.values
+        parent = self.index[condition.name]
+        hyperparameter = self.hyperparameters[parent]
+        if isinstance(hyperparameter, NumericalHyperparameter):
+            values = [float(value) for value in values]
+        return parent, self._encode_column(parent, values)
+
+    def _compile_forbidden_clause(self, clause):
+        compiled = list()
+        for name, value in clause.assignments:
+            if name not in self.index:
+                raise ValueError("Forbidden clause %s refers to %s which is "
+                                 "not defined" % (clause, name))
+            i = self.index[name]
+            if isinstance(self.hyperparameters[i], NumericalHyperparameter):
+                value = float(value)
+            compiled.append((i, self._encode_column(i, [value])[0]))
+        return compiled
+
+    def _get_choices(self, i):
+        hyperparameter = self.hyperparameters[i]
+        if isinstance(hyperparameter, Constant):
+            return [str(hyperparameter.value)]
+        return [str(choice) for choice in hyperparameter.choices]
+
+    def _get_bounds(self, hyperparameter):
+        lower, upper = hyperparameter.lower, hyperparameter.upper
+        if isinstance(hyperparameter, IntegerHyperparameter):
+            # Every integer gets an interval of the same size
+            lower, upper = lower - 0.49999, upper + 0.49999
+        if hyperparameter.base is not None:
+            log_base = np.log(hyperparameter.base)
+            return np.log(lower) / log_base, np.log(upper) / log_base
+        return lower, upper
+
+    def _encode_column(self, i, values):
+        hyperparameter = self.hyperparameters[i]
+        if isinstance(hyperparameter, (CategoricalHyperparameter, Constant)):
+            choices = self._get_choices(i)
+            index = dict((choice, j) for j, choice in enumerate(choices))
+            return (np.array([index.get(str(value), np.NaN)
+                              for value in values],
+                             dtype=np.float64) + 0.5) / len(choices)
+
+        values = np.array(values, dtype=np.float64)
+        if hyperparameter.base is not None:
+            # A quantized value can be zero
+            with np.errstate(divide="ignore"):
+                values = np.log(values) / np.log(hyperparameter.base)
+        if isinstance(hyperparameter, (NormalFloatHyperparameter,
+                                       NormalIntegerHyperparameter)):
+            return scipy.special.ndtr((values - hyperparameter.mu) /
+                                      hyperparameter.sigma)
+        lower, upper = self._get_bounds(hyperparameter)
+        return (values - lower) / (upper - lower)
+
+    def _decode_column(self, i, vector):
+        hyperparameter = self.hyperparameters[i]
+        if isinstance(hyperparameter, (CategoricalHyperparameter, Constant)):
+            choices = self._get_choices(i)
+            return np.minimum(np.floor(vector * len(choices)),
+                              len(choices) - 1)
+
+        if isinstance(hyperparameter, (NormalFloatHyperparameter,
+                                       NormalIntegerHyperparameter)):
+            values = hyperparameter.mu + hyperparameter.sigma * \
+                scipy.special.ndtri(vector)
+        else:
+            lower, upper = self._get_bounds(hyperparameter)
+            values = lower + vector * (upper - lower)
+        if hyperparameter.base is not None:
+            values = np.power(hyperparameter.base, values)
+        if hyperparameter.q is not None:
+            values = np.round(values / hyperparameter.q) * hyperparameter.q
+        if isinstance(hyperparameter, IntegerHyperparameter):
+            values = np.round(values)
+        if isinstance(hyperparameter, UniformFloatHyperparameter) or \
+                isinstance(hyperparameter, UniformIntegerHyperparameter):
+            values = np.clip(values, hyperparameter.lower,
+                             hyperparameter.upper)
+        return values
+
+    def get_active(self, matrix):
+        """Return a boolean matrix which is True for every active
+        hyperparameter of every configuration in matrix."""
+        matrix = np.asarray(matrix, dtype=np.float64)
+        active = np.zeros(matrix.shape, dtype=bool)
+        for i, or_conditions in enumerate(self.conditions):
+            if len(or_conditions) == 0:
+                active[:, i] = True
+                continue
+            for and_conditions in or_conditions:
+                fulfilled = np.ones(len(matrix), dtype=bool)
+                for parent, allowed in and_conditions:
+                    fulfilled &= active[:, parent]
+                    fulfilled &= np.any(np.isclose(
+                        matrix[:, parent, np.newaxis], allowed), axis=1)
+                active[:, i] |= fulfilled
+        return active
+
+    def get_forbidden(self, matrix):
+        """Return a boolean array which is True for every configuration in
+        matrix which matches one of the forbidden clauses."""
+        matrix = np.asarray(matrix, dtype=np.float64)
+        forbidden = np.zeros(len(matrix), dtype=bool)
+        for clause in self.forbidden:
+            matches = np.ones(len(matrix), dtype=bool)
+            for i, value in clause:
+                matches &= np.isclose(matrix[:, i], value)
+            forbidden |= matches
+        return forbidden
+
+    def validate(self, matrix):
+        """Return a boolean array which is True for every configuration in
+        matrix whose active hyperparameters are inside the unit hypercube,
+        whose inactive hyperparameters are NaN and which is not
+        forbidden."""
+        matrix = np.asarray(matrix, dtype=np.float64)
+        active = self.get_active(matrix)
+        with np.errstate(invalid="ignore"):
+            inside = (matrix >= 0) & (matrix <= 1)
+        return np.all(np.where(active, inside, np.isnan(matrix)), axis=1) & \
+            ~self.get_forbidden(matrix)
+
+    def impute_inactive(self, matrix):
+        """Set all inactive hyperparameters of matrix to NaN (in place)."""
+        matrix[~self.get_active(matrix)] = np.NaN
+        return matrix
+
+    def sample(self, n, rng=None, max_tries=100):
+        """Return n random configurations as a matrix of shape
+        (n, len(self)).
+
+        Every hyperparameter is drawn from its prior, e.g. log-uniformly if
+        it has a base, and is rounded to q (if given) and to an integer for
+        integer hyperparameters. Forbidden configurations are drawn again
+        until max_tries is exceeded, then a ValueError is raised."""
+        if rng is None:
+            rng = np.random
+        matrix = self._sample(n, rng)
+        for try_ in range(max_tries):
+            forbidden = np.flatnonzero(self.get_forbidden(matrix))
+            if len(forbidden) == 0:
+                return matrix
+            matrix[forbidden] = self._sample(len(forbidden), rng)
+        raise ValueError("Could not sample %d configurations which are not "
+                         "forbidden in %d tries" % (n, max_tries))
+
+    def _sample(self, n, rng):
+        matrix = rng.uniform(size=(n, len(self)))
+        for i in range(len(self)):
+            values = self._decode_column(i, matrix[:, i])
+            if isinstance(self.hyperparameters[i],
+                          (CategoricalHyperparameter, Constant)):
+                matrix[:, i] = (values + 0.5) / len(self._get_choices(i))
+            else:
+                # Encode the rounded values
+                matrix[:, i] = self._encode_column(i, values)
+        return self.impute_inactive(matrix)
+
+    def canonicalize(self, configuration):
+        """Return a copy of configuration (a dictionary of names and values)
+        with values normalized by the type of their hyperparameter.
+
+        Values of categorical hyperparameters become the index of the
+        choice, numerical values are rounded to q and integers. Inactive
+        hyperparameters are removed, unknown names are kept unchanged.
+        """
+        canonical = dict()
+        typed = dict()
+        for name, value in configuration.items():
+            if name not in self.index:
+                canonical[name] = value
+                continue
+            i = self.index[name]
+            hyperparameter = self.hyperparameters[i]
+            if isinstance(hyperparameter, (CategoricalHyperparameter,
+                                           Constant)):
+                choices = self._get_choices(i)
+                value = str(value).strip("'").strip('"')
+                typed[name] = value
+                canonical[name] = choices.index(value) if value in choices \
+                    else value
+                continue
+            value = float(value)
+            if hyperparameter.q is not None:
+                value = round(value / hyperparameter.q) * hyperparameter.q
+            if isinstance(hyperparameter, IntegerHyperparameter):
+                value = int(round(value))
+            typed[name] = value
+            canonical[name] = value
+
+        active = self.get_active(self.encode([typed]))[0]
+        for i, name in enumerate(self.names):
+            if name in canonical and not active[i]:
+                del canonical[name]
+        return canonical
+
+    def encode(self, configurations):
+        """Convert a list of configurations (dictionaries of names and
+        values) into a matrix, missing hyperparameters become NaN."""
+        matrix = np.empty((len(configurations), len(self)), dtype=np.float64)
+        for i, name in enumerate(self.names):
+            values = [configuration.get(name) for configuration in
+                      configurations]
+            missing = np.array([value is None for value in values])
+            if isinstance(self.hyperparameters[i], NumericalHyperparameter):
+                values = [np.NaN if value is None else value
+                          for value in values]
+            matrix[:, i] = self._encode_column(i, values)
+            matrix[missing, i] = np.NaN
+        return matrix
+
+    def decode(self, matrix):
+        """Convert a matrix into a list of configurations, inactive
+        hyperparameters are left out."""
+        matrix = np.asarray(matrix, dtype=np.float64)
+        configurations = [dict() for row in range(len(matrix))]
+        for i, name in enumerate(self.names):
+            rows = np.flatnonzero(np.isfinite(matrix[:, i]))
+            values = self._decode_column(i, matrix[rows, i])
+            hyperparameter = self.hyperparameters[i]
+            if isinstance(hyperparameter, (CategoricalHyperparameter,
+                                           Constant)):
+                choices = hyperparameter.choices if isinstance(
+                    hyperparameter, CategoricalHyperparameter) else \
+                    [hyperparameter.value]
+                values = [choices[int(value)] for value in values]
+            elif isinstance(hyperparameter, IntegerHyperparameter):
+                values = values.astype(int).tolist()
+            else:
+                values = values.tolist()
+            for row, value in itertools.izip(rows, values):
+                configurations[row][name] = value
+        return configurations
@@ -18,64 +18,234 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from argparse import ArgumentParser, FileType
-from string import upper
+"""Convert search spaces between the formats of SMAC (pcs), hyperopt/TPE
+(pyll) and Spearmint (protobuf).
 
-import pb_parser
-import pcs_parser
-import pyll_parser
+Many files can be converted into many formats at once. Every file content
+is parsed only once (the search spaces are cached by a hash of the content)
+and the conversions run in parallel. The parser of a format is only
+imported if the format is used.
+"""
+
+from argparse import ArgumentParser
+import copy
+import hashlib
+import importlib
+import multiprocessing
+import os
+import sys
+import traceback
 
 
 __authors__ = ["Katharina Eggensperger", "Matthias Feurer"]
 __contact__ = "automl.org"
 
 
+# Format -> (parser module, the filename HPOlib expects for this format)
+FORMATS = {"SMAC": ("pcs_parser", "params.pcs"),
+           "TPE": ("pyll_parser", "space.py"),
+           "SPEARMINT": ("pb_parser", "config.pb")}
+
+# Search spaces by (format, md5 hash of the file content)
+searchspace_cache = dict()
+
+
+def normalize_format(name):
+    name = name.upper()
+    if name == "HYPEROPT":
+        name = "TPE"
+    if name not in FORMATS:
+        raise ValueError("Unknown format %s, must be one of %s" %
+                         (name, str(sorted(FORMATS))))
+    return name
+
+
+def get_parser(fmt):
+    return importlib.import_module("HPOlib.format_converter.%s" %
+                                   FORMATS[fmt][0])
+
+
+def read_searchspace(content, conv_from):
+    """Parse content in the format conv_from.
+
+    The result is cached by the hash of content, a copy is returned because
+    the writers may change the hyperparameters.
+    """
+    key = (conv_from, hashlib.md5(content).hexdigest())
+    if key not in searchspace_cache:
+        if conv_from == "SMAC":
+            # The pcs parser reads lines
+            searchspace_cache[key] = get_parser(conv_from).read(
+                content.splitlines())
+        else:
+            searchspace_cache[key] = get_parser(conv_from).read(content)
+    return copy.deepcopy(searchspace_cache[key])
+
+
+def convert(content, conv_from, conv_to):
+    """Convert content from the format conv_from to the format conv_to."""
+    return get_parser(conv_to).write(read_searchspace(content, conv_from))
+
+
+def get_output_files(input_files, conv_to, output_directory):
+    """Return for every input file a list of (format, output file).
+
+    The directories of the input files are recreated relative to their
+    common parent directory inside output_directory, every output file gets
+    the filename HPOlib expects for its format (see FORMATS).
+    """
+    directories = [os.path.dirname(os.path.abspath(input_file))
+                   for input_file in input_files]
+    common = os.path.commonprefix([directory + os.sep
+                                   for directory in directories])
+    common = os.path.dirname(common)
+
+    output_files = list()
+    seen = set()
+    for directory in directories:
+        relative = os.path.relpath(directory, common)
+        outputs = list()
+        for fmt in conv_to:
+            output_file = os.path.normpath(os.path.join(
+                output_directory, relative, FORMATS[fmt][1]))
+            if output_file in seen:
+                raise ValueError("More than one input file would be "
+                                 "converted to %s" % output_file)
+            seen.add(output_file)
+            outputs.append((fmt, output_file))
+        output_files.append(outputs)
+    return output_files
+
+
+def _convert_group(task):
+    # All input files of a group have the same content, it is parsed once
+    content, conv_from, outputs = task
+    written = list()
+    try:
+        for fmt, output_file in outputs:
+            new_space = convert(content, conv_from, fmt)
+            directory = os.path.dirname(output_file)
+            if directory and not os.path.isdir(directory):
+                try:
+                    os.makedirs(directory)
+                except OSError:
+                    # Created by another process in the meantime
+                    if not os.path.isdir(directory):
+                        raise
+            with open(output_file, "w") as fh:
+                fh.write(new_space)
+            written.append(output_file)
+    except Exception:
+        return written, traceback.format_exc()
+    return written, None
+
+
+def convert_files(input_files, conv_from, conv_to, output_directory,
+                  n_jobs=1):
+    """Convert many files from conv_from into all formats of conv_to.
+
+    Files with the same content are parsed only once, the conversions run in
+    n_jobs processes. Returns a tuple of the list of written files and a
+    dictionary which maps the input files which could not be converted to
+    the error.
+    """
+    conv_from = normalize_format(conv_from)
+    conv_to = [normalize_format(fmt) for fmt in conv_to]
+    output_files = get_output_files(input_files, conv_to, output_directory)
+
+    groups = dict()
+    for input_file, outputs in zip(input_files, output_files):
+        with open(input_file) as fh:
+            content = fh.read()
+        key = hashlib.md5(content).hexdigest()
+        if key not in groups:
+            groups[key] = (content, conv_from, list(), list())
+        groups[key][2].extend(outputs)
+        groups[key][3].append(input_file)
+    groups = groups.values()
+    tasks = [(content, fmt, outputs) for content, fmt, outputs, inputs in
+             groups]
+
+    if n_jobs == 1:
+        results = [_convert_group(task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(n_jobs)
+        try:
+            results = pool.map(_convert_group, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    written = list()
+    errors = dict()
+    for group, (group_written, error) in zip(groups, results):
+        written.extend(group_written)
+        if error is not None:
+            for input_file in group[3]:
+                errors[input_file] = error
+    return written, errors
+
+
 def main():
     # python convert.py --from SMAC --to TPE -f space.any -s space.else
+    # python convert.py --from SMAC --to TPE --to SPEARMINT -o out *.pcs
     prog = "python convert.py"
     description = "Automatically convert a searchspace from one format to another"
 
     parser = ArgumentParser(description=description, prog=prog)
 
-    parser.add_argument("--from", dest="conv_from", choices=['SMAC', 'Smac', 'smac',
-                                                             'TPE', 'Tpe', 'tpe', 'hyperopt',
-                                                             'SPEARMINT', 'Spearmint', 'spearmint'],
+    formats = ['SMAC', 'Smac', 'smac', 'TPE', 'Tpe', 'tpe', 'hyperopt',
+               'SPEARMINT', 'Spearmint', 'spearmint']
+    parser.add_argument("--from", dest="conv_from", choices=formats,
                         default="", help="Convert from which format?", required=True)
-    parser.add_argument("--to", dest="conv_to", choices=['SMAC', 'Smac', 'smac',
-                                                         'TPE', 'Tpe', 'tpe', 'hyperopt',
-                                                         'SPEARMINT', 'Spearmint', 'spearmint'],
-                        default="", help="Convert to which format?", required=True)
-    parser.add_argument('input_file', nargs='?', type=FileType('r'))
+    parser.add_argument("--to", dest="conv_to", choices=formats,
+                        action="append", required=True,
+                        help="Convert to which format? Can be given more "
+                             "than once")
+    parser.add_argument('input_file', nargs='*', default=list())
     parser.add_argument("-s", "--save", dest="save", metavar="destination",
                         default="", help="Where to save the new searchspace?")
+    parser.add_argument("-o", "--output_directory", dest="output_directory",
+                        default="",
+                        help="Convert many files, the directory structure of "
+                             "the input files is recreated in this directory, "
+                             "the new searchspaces get the default filename "
+                             "of their format")
+    parser.add_argument("-j", "--jobs", dest="jobs", type=int, default=1,
+                        help="Number of parallel conversions")
 
     args, unknown = parser.parse_known_args()
 
-    # Unifying strings
-    args.conv_to = upper(args.conv_to)
-    args.conv_from = upper(args.conv_from)
-    if args.conv_from == "HYPEROPT":
-        args.conv_from = "TPE"
-    if args.conv_to == "HYPEROPT":
-        args.conv_to = "TPE"
-
-    if args.input_file is None:
+    if len(args.input_file) == 0:
         raise ValueError("No input file given")
 
-    read_options = {"SMAC": pcs_parser.read,
-                    "SPEARMINT": pb_parser.read,
-                    "TPE": pyll_parser.read
-                    }
+    if args.output_directory != "":
+        written, errors = convert_files(args.input_file, args.conv_from,
+                                        args.conv_to, args.output_directory,
+                                        n_jobs=args.jobs)
+        print "Wrote %d files to %s" % (len(written), args.output_directory)
+        for input_file in sorted(errors):
+            print "Could not convert %s:\n%s" % (input_file,
+                                                 errors[input_file])
+        if len(errors) > 0:
+            sys.exit(1)
+        return
+
+    if len(args.input_file) != 1 or len(args.conv_to) != 1:
+        parser.error("Converting more than one file or into more than one "
+                     "format needs an output directory")
+
+    conv_from = normalize_format(args.conv_from)
+    conv_to = normalize_format(args.conv_to[0])
+    with open(args.input_file[0]) as fh:
+        content = fh.read()
+
     # First read searchspace
     print "Reading searchspace..."
-    searchspace = read_options[args.conv_from](args.input_file)
+    searchspace = read_searchspace(content, conv_from)
     print "...done. Found %d params" % len(searchspace)
 
-    write_options = {"SMAC": pcs_parser.write,
-                     "SPEARMINT": pb_parser.write,
-                     "TPE": pyll_parser.write
-                     }
-    new_space = write_options[args.conv_to](searchspace)
+    new_space = get_parser(conv_to).write(searchspace)
 
     # No write it
     if args.save != "":
@@ -86,4 +256,4 @@ def main():
         print new_space
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
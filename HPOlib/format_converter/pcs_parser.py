@@ -21,36 +21,37 @@
 __authors__ = ["Katharina Eggensperger", "Matthias Feurer"]
 __contact__ = "automl.org"
 
-from collections import OrderedDict
+import re
 import StringIO
 import sys
 
 import numpy as np
-import pyparsing
 
 import configuration_space
 
 
-# Build pyparsing expressions for params
-pp_param_name = pyparsing.Word(pyparsing.alphanums + "_" + "-" + "@" + "." + ":" + ";" + "\\" + "/" + "?" + "!" +
-                               "$" + "%" + "&" + "*" + "+" + "<" + ">")
-pp_digits = "0123456789"
-pp_plusorminus = pyparsing.Literal('+') | pyparsing.Literal('-')
-pp_int = pyparsing.Combine(pyparsing.Optional(pp_plusorminus) + pyparsing.Word(pp_digits))
-pp_float = pyparsing.Combine(pyparsing.Optional(pp_plusorminus) + pyparsing.Optional(pp_int) + "." + pp_int)
-pp_eorE = pyparsing.Literal('e') | pyparsing.Literal('E')
-pp_e_notation = pyparsing.Combine(pp_float + pp_eorE + pp_int)
-pp_number = pp_e_notation | pp_float | pp_int
-pp_numberorname = pp_number | pp_param_name
-pp_il = pyparsing.Word("il")
-pp_choices = pp_param_name + pyparsing.Optional(pyparsing.OneOrMore("," + pp_param_name))
-
-pp_cont_param = pp_param_name + "[" + pp_number + "," + pp_number + "]" + \
-    "[" + pp_number + "]" + pyparsing.Optional(pp_il)
-pp_cat_param = pp_param_name + "{" + pp_choices + "}" + "[" + pp_param_name + "]"
-pp_condition = pp_param_name + "|" + pp_param_name + "in" + "{" + pp_choices + "}"
-pp_forbidden_clause = "{" + pp_param_name + "=" + pp_numberorname + \
-    pyparsing.Optional(pyparsing.OneOrMore("," + pp_param_name + "=" + pp_numberorname)) + "}"
+# Regular expressions for the lines of a pcs file
+_name = r"[A-Za-z0-9_\-@.:;\\/?!$%&*+<>]+"
+_number = r"[+-]?(?:\d*\.\d+(?:[eE][+-]?\d+)?|\d+)"
+_choices = r"%s(?:\s*,\s*%s)*" % (_name, _name)
+
+# name [lower, upper] [default]il
+pcs_continuous = re.compile(r"(%s)\s*\[\s*(%s)\s*,\s*(%s)\s*\]\s*\[\s*%s\s*\]"
+                            r"\s*([il]*)" % (_name, _number, _number, _number))
+# name {choice, choice} [default]
+pcs_categorical = re.compile(r"(%s)\s*\{\s*(%s)\s*\}\s*\[\s*%s\s*\]" %
+                             (_name, _choices, _name))
+# child | parent in {choice, choice}
+pcs_condition = re.compile(r"(%s)\s*\|\s*(%s)\s+in\s*\{\s*(%s)\s*\}" %
+                           (_name, _name, _choices))
+# {name=value, name=value}
+pcs_forbidden_clause = re.compile(r"\{\s*%s\s*=\s*%s(?:\s*,\s*%s\s*=\s*%s)*"
+                                  r"\s*\}" % (_name, _name, _name, _name))
+pcs_assignment = re.compile(r"(%s)\s*=\s*(%s)" % (_name, _name))
+
+
+def _split_choices(choices):
+    return [choice.strip() for choice in choices.split(",")]
 
 
 def build_categorical(param):
@@ -125,9 +126,19 @@ def build_condition(name, condition):
         return condition_template % (name, condition[0], condition[2])
 
 
+def build_forbidden_clause(clause):
+    return str(clause)
+
+
 def read(pcs_string, debug=False):
-    searchspace = OrderedDict()
+    """Read a search space in the pcs format.
+
+    Returns a configuration_space.SearchSpace, the forbidden clauses of the
+    pcs file are stored in its attribute forbidden_clauses.
+    """
+    searchspace = configuration_space.SearchSpace()
     conditions = list()
+    forbidden_clauses = list()
     # some statistics
     ct = 0
     cont_ct = 0
@@ -149,11 +160,11 @@ def read(pcs_string, debug=False):
 
         if "|" in line:
             # It's a condition
-            try:
-                c = pp_condition.parseString(line)
-                conditions.append(c)
-            except pyparsing.ParseException:
+            match = pcs_condition.match(line)
+            if match is None:
                 raise NotImplementedError("Could not parse condition: %s" % line)
+            conditions.append((match.group(1), match.group(2),
+                               _split_choices(match.group(3))))
             continue
         if "}" not in line and "]" not in line:
             print "Skipping: %s" % line
@@ -169,39 +180,29 @@ def read(pcs_string, debug=False):
                   "float": configuration_space.UniformFloatHyperparameter,
                   "categorical": configuration_space.CategoricalHyperparameter}
 
-        try:
-            param_list = pp_cont_param.parseString(line)
-            il = param_list[9:]
-            if len(il) > 0:
-                il = il[0]
-            param_list = param_list[:9]
-            name = param_list[0]
-            lower = float(param_list[2])
-            upper = float(param_list[4])
-            paramtype = "int" if "i" in il else "float"
-            base = 10 if "l" in il else None
-            param = create[paramtype](name=name, lower=lower, upper=upper, q=None, base=base, conditions=None)
-            cont_ct += 1
-        except pyparsing.ParseException:
-            pass
-
-        try:
-            param_list = pp_cat_param.parseString(line)
-            name = param_list[0]
-            choices = [c for c in param_list[2:-4:2]]
-            param = create["categorical"](name=name, choices=choices, conditions=None)
-            cat_ct += 1
-        except pyparsing.ParseException:
-            pass
-
-        try:
-            # noinspection PyUnusedLocal
-            param_list = pp_forbidden_clause.parseString(line)
-            # TODO: remove this hotfix!
-            continue
-            raise NotImplementedError("We cannot handle forbidden clauses: %s" % line)
-        except pyparsing.ParseException:
-            pass
+        # The first bracket tells which kind of line this is
+        if line.startswith("{"):
+            if pcs_forbidden_clause.match(line) is not None:
+                forbidden_clauses.append(pcs_assignment.findall(line))
+                continue
+        elif line.find("[") >= 0 and (line.find("{") < 0 or
+                                      line.find("[") < line.find("{")):
+            match = pcs_continuous.match(line)
+            if match is not None:
+                name, lower, upper, il = match.groups()
+                paramtype = "int" if "i" in il else "float"
+                base = 10 if "l" in il else None
+                param = create[paramtype](name=name, lower=float(lower),
+                                          upper=float(upper), q=None,
+                                          base=base, conditions=None)
+                cont_ct += 1
+        else:
+            match = pcs_categorical.match(line)
+            if match is not None:
+                param = create["categorical"](
+                    name=match.group(1),
+                    choices=_split_choices(match.group(2)), conditions=None)
+                cat_ct += 1
 
         if param is None:
             raise NotImplementedError("Could not parse: %s" % line)
@@ -227,10 +228,7 @@ def read(pcs_string, debug=False):
 
 
     #Now handle conditions
-    for cond in conditions:
-        child = cond[0]
-        parent = cond[2]
-        restrictions = cond[5:-1:2]
+    for child, parent, restrictions in conditions:
         # TODO remove this hotfix
         child = normalize_param_name(child)
         parent = normalize_param_name(parent)
@@ -251,6 +249,14 @@ def read(pcs_string, debug=False):
         else:
             searchspace[child].conditions[0].extend([cond_str, ])
 
+    for assignments in forbidden_clauses:
+        for name, value in assignments:
+            if name not in searchspace:
+                raise ValueError("%s is not defined, but used in a forbidden "
+                                 "clause" % name)
+        searchspace.forbidden_clauses.append(
+            configuration_space.ForbiddenClause(assignments))
+
     if debug:
         print
         print "============== Reading Results"
@@ -261,6 +267,7 @@ def read(pcs_string, debug=False):
         print "#Invalid lines: %d ( of %d )" % (line_ct - len(conditions) - ct, line_ct)
         print "#Parameter: %d" % len(searchspace)
         print "#Conditions: %d" % len(conditions)
+        print "#Forbidden clauses: %d" % len(forbidden_clauses)
         print "#Conditioned params: %d" % sum([1 if len(searchspace[j].conditions[0]) > 0 else 0 for j in searchspace])
         print "#Categorical: %d" % cat_ct
         print "#Continuous: %d" % cont_ct
@@ -300,6 +307,12 @@ def write(searchspace):
         param_lines.write("\n\n")
         for line in condition_lines:
             param_lines.write(line)
+
+    forbidden_clauses = getattr(searchspace, "forbidden_clauses", list())
+    if len(forbidden_clauses) > 0:
+        param_lines.write("\n\n")
+        param_lines.write("\n".join([build_forbidden_clause(clause)
+                                     for clause in forbidden_clauses]))
     param_lines.seek(0)
     return param_lines.getvalue()
 
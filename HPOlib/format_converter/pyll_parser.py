@@ -1,4 +1,4 @@
-from collections import OrderedDict, deque
+from collections import deque
 import copy
 import math
 import StringIO
@@ -52,12 +52,14 @@ class PyllReader(object):
 
 
     def __init__(self):
-        self.hyperparameters = OrderedDict()
+        self.hyperparameters = configuration_space_module.SearchSpace()
         self.constants = list()
 
     def read(self, pyll_string):
         exec pyll_string
         space = hyperopt.pyll.as_apply(space)   # Space is generated by exec
+        # Optional, a list of dictionaries written by PyllWriter
+        forbidden_clauses = locals().get("forbidden_clauses", list())
 
         if space.name not in ("dict", "pos_args", "switch"):
             raise ValueError("The configuration space must consist of a dict "
@@ -75,6 +77,11 @@ class PyllReader(object):
         else:
             NotImplementedError()
 
+        for clause in forbidden_clauses:
+            self.hyperparameters.forbidden_clauses.append(
+                configuration_space_module.ForbiddenClause(
+                    sorted(clause.items())))
+
         for key in sorted(self.hyperparameters):
             print self.hyperparameters[key]
         return self.hyperparameters
@@ -500,6 +507,17 @@ def write(configuration_space):
     return pyll_writer.write(configuration_space)
 
 
+def build(configuration_space):
+    """Return the hyperopt search space of configuration_space.
+
+    The space is the same as the variable space of the module written by
+    write, but it is built without writing and importing python code. It
+    can be pickled.
+    """
+    pyll_builder = PyllBuilder()
+    return pyll_builder.build(configuration_space)
+
+
 class PyllWriter(object):
     def __init__(self):
         self.hyperparameters = {}
@@ -513,23 +531,10 @@ class PyllWriter(object):
         self.hyperparameters = {}
 
     def write(self, configuration_space):
-        configuration_space = copy.deepcopy(configuration_space)
         for key in configuration_space:
             print configuration_space[key]
-
-        # Name conversions must happen here because the hyperparameter are
-        # later on referenced by this name, the values are converted later!!!
-        for hyperparameter in configuration_space.values():
-            if isinstance(hyperparameter, configuration_space_module
-                    .NumericalHyperparameter) and hyperparameter.base is not \
-                    None:
-                if abs(hyperparameter.base - np.e) < 0.0000001:
-                    continue
-                else:
-                    hyperparameter.name = self.convert_name(hyperparameter)
-
-        configuration_dag = configuration_space_module\
-            .create_dag_from_hyperparameters(configuration_space)
+        configuration_space, configuration_dag = self.prepare(
+            configuration_space)
 
         configuration_string = StringIO.StringIO()
         configuration_string.write('from hyperopt import hp\n')
@@ -547,18 +552,50 @@ class PyllWriter(object):
             .join(['"%s": param_%s' % (name, self.hyperparameters[name])
                    for name in hyperparameter_names]))
         configuration_string.write('}\n')
+
+        # hyperopt does not know forbidden clauses, they are kept for the
+        # conversion back and for HPOlib
+        forbidden_clauses = getattr(configuration_space, "forbidden_clauses",
+                                    list())
+        if len(forbidden_clauses) > 0:
+            configuration_string.write('\nforbidden_clauses = [')
+            configuration_string.write(', '.join([
+                '{%s}' % ', '.join(['"%s": "%s"' % (name, value)
+                                    for name, value in clause.assignments])
+                for clause in forbidden_clauses]))
+            configuration_string.write(']\n')
         configuration_string.seek(0)
         return configuration_string.getvalue()
 
+    def prepare(self, configuration_space):
+        """Return a copy of configuration_space with converted names and its
+        DAG."""
+        configuration_space = copy.deepcopy(configuration_space)
+
+        # Name conversions must happen here because the hyperparameter are
+        # later on referenced by this name, the values are converted later!!!
+        for hyperparameter in configuration_space.values():
+            if isinstance(hyperparameter, configuration_space_module
+                    .NumericalHyperparameter) and hyperparameter.base is not \
+                    None:
+                if abs(hyperparameter.base - np.e) < 0.0000001:
+                    continue
+                else:
+                    hyperparameter.name = self.convert_name(hyperparameter)
+
+        configuration_dag = configuration_space_module\
+            .create_dag_from_hyperparameters(configuration_space)
+        return configuration_space, configuration_dag
+
     def traverse_dag_depth_first(self, dag):
         hyperparameter_names = []
         strings = []
 
         for name in configuration_space_module.get_dag(dag):
-            hyperparameter = dag.node[name]['hyperparameter']
+            hyperparameter = dag.get_hyperparameter(name)
             if hyperparameter.conditions == [[]]:
                 hyperparameter_names.append(name)
-            children = dag[name]
+            children = dag.get_children(name)
             _, string = self.write_hyperparameter(hyperparameter, children)
             strings.append(string)
 
@@ -620,12 +657,12 @@ class PyllWriter(object):
 
         for key in children:
             child = children[key]
-            operator = child['condition'][1]
+            operator = child[1]
             if operator == "==":
-                value = child['condition'][2]
+                value = child[2]
                 choices[value][key] = child
             elif operator == "in":
-                values = child['condition'][2].replace("{", "").replace("}", "")
+                values = child[2].replace("{", "").replace("}", "")
                 values = values.split(",")
                 for value in values:
                     choices[value][key] = child
@@ -634,8 +671,13 @@ class PyllWriter(object):
                                           "conditions which is not yet "
                                           "implemented: %s" % operator)
 
-        index = "param_%d" % len(self.hyperparameters)
-        self.hyperparameters[name] = len(self.hyperparameters)
+        return name, self.write_choices(parameter, choices)
+
+    def write_choices(self, parameter, choices):
+        """Return the line which assigns hp.choice to a new variable, choices
+        maps every value to the names of the hyperparameters it activates."""
+        name = parameter.name
+        index = self.add_hyperparameter(parameter)
         return_string = '%s = hp.choice("%s", [\n' % (index, name)
         for choice in sorted(choices):
             return_string += '    {'
@@ -645,8 +687,18 @@ class PyllWriter(object):
                                  (key, self.hyperparameters[key])
             return_string += '},\n'
         return_string += '    ])'
+        return return_string
 
-        return name, return_string
+    def write_expression(self, parameter, function, arguments,
+                         to_int=False):
+        """Return the line which assigns hp.<function>(name, *arguments) to
+        a new variable, wrapped by pyll.scope.int if to_int is True."""
+        index = self.add_hyperparameter(parameter)
+        expression = 'hp.%s("%s", %s)' % (function, parameter.name, ", ".join(
+            ["%s" % argument for argument in arguments]))
+        if to_int:
+            expression = 'pyll.scope.int(%s)' % expression
+        return '%s = %s' % (index, expression)
 
     def write_uniform(self, parameter):
         name = parameter.name
@@ -663,9 +715,8 @@ class PyllWriter(object):
                 parameter.upper = float(parameter.upper) + (parameter.q / 2.0)
 
         lower, upper = self.get_bounds_as_exponent(parameter)
-        index = self.add_hyperparameter(parameter)
-        return name, '%s = hp.uniform("%s", %s, %s)' % \
-            (index, name, lower, upper)
+        return name, self.write_expression(parameter, "uniform",
+                                           (lower, upper))
 
     def write_uniform_int(self, parameter):
         name = parameter.name
@@ -677,9 +728,8 @@ class PyllWriter(object):
         parameter.upper = float(parameter.upper) + 0.5
         lower, upper = self.get_bounds_as_exponent(parameter)
         q = 1.0
-        index = self.add_hyperparameter(parameter)
-        return name, '%s = pyll.scope.int(hp.quniform("%s", %s, %s, %s))' \
-            % (index, name, lower, upper, q)
+        return name, self.write_expression(parameter, "quniform",
+                                           (lower, upper, q), to_int=True)
 
     def write_quniform(self, parameter):
         name = parameter.name
@@ -687,9 +737,8 @@ class PyllWriter(object):
         parameter.upper = float(parameter.upper) + (parameter.q / 2.0)
         lower, upper = self.get_bounds_as_exponent(parameter)
         q = float(parameter.q)
-        index = self.add_hyperparameter(parameter)
-        return name, '%s = hp.quniform("%s", %s, %s, %s)' % \
-            (index, name, lower, upper, q)
+        return name, self.write_expression(parameter, "quniform",
+                                           (lower, upper, q))
 
     def write_quniform_int(self, parameter):
         name = parameter.name
@@ -698,16 +747,14 @@ class PyllWriter(object):
         lower, upper = self.get_bounds_as_exponent(parameter)
         q = float(parameter.q) if parameter.q is not None else 1.0
         assert abs(q - int(q)) < 0.000001
-        index = self.add_hyperparameter(parameter)
-        return name, '%s = pyll.scope.int(hp.quniform("%s", %s, %s, %s))' \
-            % (index, name, lower, upper, q)
+        return name, self.write_expression(parameter, "quniform",
+                                           (lower, upper, q), to_int=True)
 
     def write_loguniform(self, parameter):
         name = parameter.name
         lower, upper = self.get_bounds_as_exponent(parameter)
-        index = self.add_hyperparameter(parameter)
-        return name, '%s = hp.loguniform("%s", %s, %s)' % \
-            (index, name, lower, upper)
+        return name, self.write_expression(parameter, "loguniform",
+                                           (lower, upper))
 
     def write_loguniform_int(self, parameter):
         name = parameter.name
@@ -715,9 +762,8 @@ class PyllWriter(object):
         parameter.upper = float(parameter.upper) + 0.5
         lower, upper = self.get_bounds_as_exponent(parameter)
         q = 1.0
-        index = self.add_hyperparameter(parameter)
-        return name, '%s = pyll.scope.int(hp.qloguniform("%s", %s, %s, %s))' % \
-            (index, name, lower, upper, q)
+        return name, self.write_expression(parameter, "qloguniform",
+                                           (lower, upper, q), to_int=True)
 
     def write_qloguniform(self, parameter):
         name = parameter.name
@@ -725,9 +771,8 @@ class PyllWriter(object):
         parameter.upper = float(parameter.upper) + (parameter.q / 2.0)
         lower, upper = self.get_bounds_as_exponent(parameter)
         q = float(parameter.q)
-        index = self.add_hyperparameter(parameter)
-        return name, '%s = hp.qloguniform("%s", %s, %s, %s)' % \
-            (index, name, lower, upper, q)
+        return name, self.write_expression(parameter, "qloguniform",
+                                           (lower, upper, q))
 
     def write_qloguniform_int(self, parameter):
         name = parameter.name
@@ -736,32 +781,29 @@ class PyllWriter(object):
         lower, upper = self.get_bounds_as_exponent(parameter)
         q = float(parameter.q)
         assert abs(q - int(q)) < 0.000001
-        index = self.add_hyperparameter(parameter)
-        return name, '%s = pyll.scope.int(hp.qloguniform("%s", %s, %s, %s))' % \
-            (index, name, lower, upper, q)
+        return name, self.write_expression(parameter, "qloguniform",
+                                           (lower, upper, q), to_int=True)
 
     def write_normal(self, parameter):
         name = parameter.name
         mu = float(parameter.mu)
         sigma = float(parameter.sigma)
-        index = self.add_hyperparameter(parameter)
-        return name, '%s = hp.normal("%s", %s, %s)' % (index, name, mu, sigma)
+        return name, self.write_expression(parameter, "normal", (mu, sigma))
 
     def write_normal_int(self, parameter):
         name = parameter.name
         mu = float(parameter.mu)
         sigma = float(parameter.sigma)
-        index = self.add_hyperparameter(parameter)
-        return name, '%s = pyll.scope.int(hp.qnormal("%s", %s, %s, 1.0))' % \
-                     (index, name, mu, sigma)
+        return name, self.write_expression(parameter, "qnormal",
+                                           (mu, sigma, 1.0), to_int=True)
 
     def write_qnormal(self, parameter):
         name = parameter.name
         mu = float(parameter.mu)
         sigma = float(parameter.sigma)
         q = float(parameter.q)
-        index = self.add_hyperparameter(parameter)
-        return name, '%s = hp.qnormal("%s", %s, %s, %s)' % (index, name, mu, sigma, q)
+        return name, self.write_expression(parameter, "qnormal",
+                                           (mu, sigma, q))
 
     def write_qnormal_int(self, parameter):
         name = parameter.name
@@ -769,33 +811,30 @@ class PyllWriter(object):
         sigma = float(parameter.sigma)
         q = float(parameter.q)
         assert abs(q - int(q)) < 0.000001
-        index = self.add_hyperparameter(parameter)
-        return name, '%s = pyll.scope.int(hp.qnormal("%s", %s, %s, %s))' % \
-                     (index, name, mu, sigma, q)
+        return name, self.write_expression(parameter, "qnormal",
+                                           (mu, sigma, q), to_int=True)
 
     def write_lognormal(self, parameter):
         name = parameter.name
         mu = float(parameter.mu)
         sigma = float(parameter.sigma)
-        index = self.add_hyperparameter(parameter)
-        return name, '%s = hp.lognormal("%s", %s, %s)' % (index, name, mu, sigma)
+        return name, self.write_expression(parameter, "lognormal",
+                                           (mu, sigma))
 
     def write_lognormal_int(self, parameter):
         name = parameter.name
         mu = float(parameter.mu)
         sigma = float(parameter.sigma)
-        index = self.add_hyperparameter(parameter)
-        return name, '%s = pyll.scope.int(hp.qlognormal("%s", %s, %s, 1.0))' \
-                     % (index, name, mu, sigma)
+        return name, self.write_expression(parameter, "qlognormal",
+                                           (mu, sigma, 1.0), to_int=True)
 
     def write_qlognormal(self, parameter):
         name = parameter.name
         mu = float(parameter.mu)
         sigma = float(parameter.sigma)
         q = float(parameter.q)
-        index = self.add_hyperparameter(parameter)
-        return name, '%s = hp.qlognormal("%s", %s, %s, %s)' % \
-                     (index, name, mu, sigma, q)
+        return name, self.write_expression(parameter, "qlognormal",
+                                           (mu, sigma, q))
 
     def write_qlognormal_int(self, parameter):
         name = parameter.name
@@ -803,9 +842,8 @@ class PyllWriter(object):
         sigma = float(parameter.sigma)
         q = float(parameter.q)
         assert abs(q - int(q)) < 0.000001
-        index = self.add_hyperparameter(parameter)
-        return name, '%s = pyll.scope.int(hp.qlognormal("%s", %s, %s, %s))' % \
-                     (index, name, mu, sigma, q)
+        return name, self.write_expression(parameter, "qlognormal",
+                                           (mu, sigma, q), to_int=True)
 
     def convert_name(self, parameter):
         """Add the LOG_ instruction to the name."""
@@ -857,4 +895,50 @@ class PyllWriter(object):
             else:
                 raise ValueError("Base Value %s not allowed" % str(base))
 
-        return lower, upper
\ No newline at end of file
+        return lower, upper
+
+
+class PyllBuilder(PyllWriter):
+    """Builds the pyll graph of a configuration space in memory.
+
+    Uses the conversions of PyllWriter, but every write_* method returns a
+    hyperopt object instead of a line of python code.
+    """
+    def __init__(self):
+        super(PyllBuilder, self).__init__()
+        self.objects = dict()
+
+    def reset_hyperparameter_countr(self):
+        super(PyllBuilder, self).reset_hyperparameter_countr()
+        self.objects = dict()
+
+    def build(self, configuration_space):
+        configuration_space, configuration_dag = self.prepare(
+            configuration_space)
+        objects, hyperparameter_names = self.traverse_dag_depth_first(
+            configuration_dag)
+        return dict([(name, self.objects[name])
+                     for name in hyperparameter_names])
+
+    def write_expression(self, parameter, function, arguments,
+                         to_int=False):
+        self.add_hyperparameter(parameter)
+        expression = getattr(hyperopt.hp, function)(
+            parameter.name, *[float(argument) for argument in arguments])
+        if to_int:
+            expression = hyperopt.pyll.scope.int(expression)
+        self.objects[parameter.name] = expression
+        return expression
+
+    def write_choices(self, parameter, choices):
+        name = parameter.name
+        self.add_hyperparameter(parameter)
+        options = list()
+        for choice in sorted(choices):
+            option = {name: choice}
+            for key in sorted(choices[choice]):
+                option[key] = self.objects[key]
+            options.append(option)
+        expression = hyperopt.hp.choice(name, options)
+        self.objects[name] = expression
+        return expression
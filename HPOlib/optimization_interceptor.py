@@ -19,7 +19,6 @@
 from argparse import ArgumentParser
 from collections import OrderedDict
 import logging
-from logging.handlers import SocketHandler
 import os
 import sys
 import time
@@ -29,8 +28,10 @@ import numpy as np
 
 from HPOlib.dispatcher import dispatcher
 from HPOlib.Experiment import Experiment
-from HPOlib.wrapping_util import format_traceback, \
-    load_experiment_config_file, remove_param_metadata
+import HPOlib.profiling as profiling
+import HPOlib.result_cache
+from HPOlib.wrapping_util import format_traceback, get_params_hash, \
+    load_experiment_config_file, remove_param_metadata, ParameterDecoder
 
 
 __authors__ = ["Katharina Eggensperger", "Matthias Feurer"]
@@ -40,6 +41,11 @@ __contact__ = "automl.org"
 hpolib_logger = logging.getLogger("HPOlib")
 logger = logging.getLogger("HPOlib.optimization_interceptor")
 
+# Every search space file which was read, see load_search_space
+_search_spaces = dict()
+# The ParameterDecoder of every search space file, see get_parameter_decoder
+_decoders = dict()
+
 
 # TODO: This should be in a util function sometime in the future
 #       Is duplicated in runsolver_wrapper.py
@@ -58,10 +64,77 @@ def load_experiment_file():
     return experiment
 
 
-def do_cv(arguments, parameters, experiment, folds=10):
+def get_search_space_file(cfg):
+    """Return the absolute path of HPOLIB:search_space or None.
+
+    A relative path is searched in the current directory and in the
+    directory of the benchmark (the parent of the experiment directory).
+    """
+    search_space = cfg.get("HPOLIB", "search_space")
+    if not search_space:
+        return None
+    candidates = [os.path.abspath(search_space),
+                  os.path.join(os.path.dirname(os.getcwd()), search_space)]
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            return candidate
+    raise ValueError("Search space not found. Searched at %s" %
+                     " and ".join(candidates))
+
+
+def load_search_space(cfg):
+    """Return the search space of HPOLIB:search_space.
+
+    Returns a tuple of the search space (see pcs_parser.read) and its
+    ConfigurationSpace or (None, None) if no search space is configured.
+    """
+    search_space_file = get_search_space_file(cfg)
+    if search_space_file is None:
+        return None, None
+    if search_space_file not in _search_spaces:
+        # Only needed if a search space is configured
+        from HPOlib.format_converter import configuration_space, pcs_parser
+        with open(search_space_file) as fh:
+            searchspace = pcs_parser.read(fh)
+        _search_spaces[search_space_file] = \
+            (searchspace, configuration_space.ConfigurationSpace(searchspace))
+    return _search_spaces[search_space_file]
+
+
+def get_parameter_decoder(cfg):
+    """Return the ParameterDecoder of HPOLIB:search_space or None if no
+    search space is configured."""
+    search_space_file = get_search_space_file(cfg)
+    if search_space_file is None:
+        return None
+    if search_space_file not in _decoders:
+        _decoders[search_space_file] = \
+            ParameterDecoder.from_space(load_search_space(cfg)[0])
+    return _decoders[search_space_file]
+
+
+def get_forbidden_clause(parameters, cfg):
+    """Return the forbidden clause of HPOLIB:search_space which forbids
+    parameters or None if the parameters are allowed."""
+    searchspace, space = load_search_space(cfg)
+    if space is None or len(space.forbidden) == 0:
+        return None
+    # Values are compared after encoding, '1.0' matches a clause value 1
+    row = space.encode([parameters])
+    if not space.get_forbidden(row)[0]:
+        return None
+    # Find the matching clause for the log message
+    for clause, compiled in zip(space.forbidden_clauses, space.forbidden):
+        if all([np.isclose(row[0, i], value) for i, value in compiled]):
+            return clause
+
+
+def do_cv(arguments, parameters, experiment, folds=10,
+          interceptor_start=None, cfg=None, profiler=None):
     logger.info("Starting Cross validation")
     sys.stdout.flush()
-    cfg = load_experiment_config_file()
+    if cfg is None:
+        cfg = load_experiment_config_file()
 
     # Store the results to hand them back to tpe and spearmint
     results = []
@@ -70,7 +143,12 @@ def do_cv(arguments, parameters, experiment, folds=10):
     try:
         for fold in range(folds):
             arguments.instance = fold
-            result, wallclock_time = run_one_instance(arguments, parameters, experiment)
+            # Only the first fold was started together with the interceptor,
+            # later folds start when their predecessor is finished
+            result, wallclock_time = run_one_instance(
+                arguments, parameters, experiment,
+                interceptor_start=interceptor_start if fold == 0 else None,
+                cfg=cfg, profiler=profiler if fold == 0 else None)
             results.append(result)
             times.append(wallclock_time)
 
@@ -79,7 +157,7 @@ def do_cv(arguments, parameters, experiment, folds=10):
             if crashed_runs >= cfg.getint("HPOLIB", "max_crash_per_cv"):
                 logger.warning("Aborting CV because the number of crashes "
                                "exceeds the configured max_crash_per_cv value")
-                return worst_possible
+                return worst_possible, np.nansum(times)
 
             # TODO: Error Handling
         
@@ -100,8 +178,26 @@ def do_cv(arguments, parameters, experiment, folds=10):
     return mean, np.nansum(times)
 
 
-def run_one_instance(arguments, parameters, experiment):
-    """Execute one instance."""
+def run_one_instance(arguments, parameters, experiment,
+                     interceptor_start=None, cfg=None, profiler=None):
+    """Execute one instance.
+
+    The timestamps of the phases of this evaluation (see
+    Experiment.TIMESTAMP_NAMES) are stored in the experiment together with the
+    result. interceptor_start is the time the interceptor was started, if it
+    is None the time this function is called is used. cfg is the experiment
+    configuration, it is loaded if it is None.
+
+    profiler is a running profiler which main started for a sampled
+    evaluation (see profiling.is_sampled). Its profile_base is set here and
+    main saves it. Otherwise the evaluation is sampled here and profiled
+    until its result is saved.
+    """
+    timestamps = dict()
+    if interceptor_start is None:
+        interceptor_start = time.time()
+    timestamps["interceptor_start"] = interceptor_start
+
     if arguments.instance is not None:
         instance = int(arguments.instance)
     else:
@@ -109,36 +205,104 @@ def run_one_instance(arguments, parameters, experiment):
 
     if experiment.is_closed():
         experiment = load_experiment_file()
+    # The caller may have opened the experiment long before
+    timestamps["lock_acquired"] = experiment.lock_acquired
 
+    if cfg is None:
+        cfg = load_experiment_config_file()
+    space = load_search_space(cfg)[1]
     # Side-effect: adds a job if it is not yet in the experiments file
-    trial_index = get_trial_index(experiment, instance, parameters)
+    trial_index = get_trial_index(experiment, instance, parameters, space)
+    forbidden_clause = get_forbidden_clause(parameters, cfg)
+    # The profiler is paused while the target algorithm runs, the
+    # python_file dispatcher profiles the target function on its own
+    if profiler is not None:
+        profile_base = profiling.get_profile_base(cfg, trial_index, instance,
+                                                  sampled=True)
+        profiler.profile_base = profile_base
+        save_profile = False
+    else:
+        profile_base = profiling.get_profile_base(cfg, trial_index, instance)
+        if profile_base is not None:
+            profiler = profiling.start_profiler()
+        save_profile = True
     experiment.set_one_fold_running(trial_index, instance)
-    experiment._save_jobs()
+    experiment._save_jobs(save_summary=False)
     experiment.close()  # release Experiment lock
 
     logger.info("Starting instance evaluation for configuration: %s, "
                 "instance: %s" % (str(trial_index), str(instance)))
     logger.info("Parameters: %s", str(parameters))
-    cfg = load_experiment_config_file()
-
-    try:
-        status, wallclock_time, result, additional_data = \
-            dispatcher.main(arguments, parameters, instance)
-
-        # TODO: Error Handling
 
-    except Exception as e:
-        logger.error(format_traceback(sys.exc_info()))
-        logger.error("Instance evaluation failed: %s %s", sys.exc_info()[0], e)
+    timestamps["dispatch_start"] = time.time()
+    # The result cache is only accessed after the Experiment lock is
+    # released, it must not serialize the evaluations
+    result_cache = None
+    cached = None
+    if forbidden_clause is None:
+        result_cache = HPOlib.result_cache.get_result_cache(cfg)
+    if result_cache is not None:
+        params_hash = get_params_hash(parameters, space)
+        cached = result_cache.get(params_hash, instance)
+    if forbidden_clause is not None:
+        # The target algorithm is not called, the trial is recorded as
+        # crashed
+        logger.warning("Configuration %s is forbidden by %s and is not "
+                       "evaluated", str(trial_index), str(forbidden_clause))
         result = np.NaN
         status = "CRASHED"
-        wallclock_time = np.NaN
-        additional_data = str(e)
+        wallclock_time = 0.0
+        additional_data = "Forbidden configuration: %s" % str(forbidden_clause)
+    elif cached is not None:
+        logger.info("Configuration %s, instance %s found in the result "
+                    "cache %s", str(trial_index), str(instance),
+                    result_cache.filename)
+        # Only the time of the lookup is charged, the duration of the
+        # original evaluation is kept in the additional data
+        result, cached_duration, cached_additional_data = cached
+        status = "SAT"
+        wallclock_time = time.time() - timestamps["dispatch_start"]
+        additional_data = "Result cache hit, duration: %f; %s" % \
+            (cached_duration, cached_additional_data)
+    else:
+        try:
+            if profile_base is not None:
+                profiler.disable()
+            status, wallclock_time, result, additional_data = \
+                dispatcher.main(arguments, parameters, instance,
+                                timestamps=timestamps,
+                                profile_base=profile_base, cfg=cfg)
+
+            # TODO: Error Handling
+
+        except Exception as e:
+            logger.error(format_traceback(sys.exc_info()))
+            logger.error("Instance evaluation failed: %s %s",
+                         sys.exc_info()[0], e)
+            result = np.NaN
+            status = "CRASHED"
+            wallclock_time = np.NaN
+            additional_data = str(e)
+        # Only successful evaluations are stored, crashes may be transient
+        if result_cache is not None and status == "SAT":
+            result_cache.put(params_hash, instance, result, wallclock_time,
+                             additional_data)
+    if result_cache is not None:
+        result_cache.close()
+    if profile_base is not None:
+        profiler.enable()
+    timestamps["result_parsed"] = time.time()
 
     # Do bookkeeping!
     if experiment.is_closed():
         experiment = load_experiment_file()
 
+    if result_cache is not None:
+        if cached is not None:
+            experiment.result_cache_hits += 1
+        else:
+            experiment.result_cache_misses += 1
+
     if status == "SAT":
         experiment.set_one_fold_complete(trial_index, instance, result,
                                          wallclock_time, additional_data)
@@ -150,8 +314,14 @@ def run_one_instance(arguments, parameters, experiment):
     else:
         # TODO: We need a global stopping mechanism
         pass
+    # The pickle is written right after this, so this is the last point in
+    # time which can be stored in it
+    timestamps["saved"] = time.time()
+    experiment.set_one_fold_timestamps(trial_index, instance, timestamps)
     experiment._save_jobs()
     experiment.close()  # release lock
+    if profile_base is not None and save_profile:
+        profiling.save_profiler(profiler, profile_base, "interceptor")
 
     logger.info("Finished instance Evaluation for configuration: %s, "
                 "instance %s; result: %f, duration: %f" %
@@ -159,16 +329,24 @@ def run_one_instance(arguments, parameters, experiment):
     return result, wallclock_time
 
 
-def get_trial_index(experiment, fold, params):
+def get_trial_index(experiment, fold, params, configuration_space=None):
     # Check whether we are in a new configuration; This has to check whether
     # the params were already inserted but also whether the fold already run
     # This is checked twice; the instance_result has to be not NaN and the
     # entry in instance_order has to exist
+    # Configurations are compared by their canonical hash, with a
+    # configuration_space the types of the hyperparameters are respected
+    params_hash = get_params_hash(params, configuration_space)
     new = True
     trial_index = float("NaN")
     for idx, trial in enumerate(experiment.trials):
-        exp = trial['params']
-        if exp == params and (idx, fold) not in experiment.instance_order and \
+        if 'params_hash' not in trial:
+            # Experiment pickles written before VERSION 3 have no params
+            # hash, it is computed with the same configuration_space
+            trial['params_hash'] = get_params_hash(trial['params'],
+                                                   configuration_space)
+        if trial['params_hash'] == params_hash and \
+                (idx, fold) not in experiment.instance_order and \
                 (experiment.get_trial_from_id(idx)['instance_results'][fold] ==
                      np.NaN or
                          experiment.get_trial_from_id(idx)['instance_results'][
@@ -179,11 +357,16 @@ def get_trial_index(experiment, fold, params):
             trial_index = idx
             break
     if new:
-        trial_index = experiment.add_job(params)
+        trial_index = experiment.add_job(params, params_hash)
     return trial_index
 
 
-def parse_params(params_list):
+def format_result(result, wallclock_time):
+    """Return the line which tells the optimizer bridges the result."""
+    return "Result: %f, Runtime: %f\n" % (float(result), float(wallclock_time))
+
+
+def parse_params(params_list, decoder=None):
     """Parse a list of parameters which was given on the command line.
 
     Parameters
@@ -192,6 +375,9 @@ def parse_params(params_list):
             A list of string. Values at a position with an even index are
             considered to be the parameter name (starting with a '-'),
             followed by its value.
+        decoder : ParameterDecoder, optional
+            Removes the LOG/Q metadata, see get_parameter_decoder. If None,
+            remove_param_metadata is used.
 
     Returns
     -------
@@ -216,12 +402,16 @@ def parse_params(params_list):
 
         params_dict[key] = value
 
-    remove_param_metadata(params_dict)
+    if decoder is not None:
+        decoder.decode(params_dict)
+    else:
+        remove_param_metadata(params_dict)
     return params_dict
 
 
-def parse_cli():
-    """Parse the arguments of the optimization interceptor."""
+def parse_cli(decoder=None):
+    """Parse the arguments of the optimization interceptor, see
+    parse_params for the decoder."""
     # First, check if --params or --parameters is on the command line,
     # treat everything which is before that as arguments to the optimization
     # interceptor, everything behind as parameters for the target algorithm
@@ -243,17 +433,22 @@ def parse_cli():
                                               'validation.')
     parser.add_argument('--params', action='store_true', required=True)
     arguments = parser.parse_args(args=arguments)
-    params = parse_params(parameters)
+    params = parse_params(parameters, decoder)
     return arguments, params
 
 
-def main(arguments, parameters):
-    config = load_experiment_config_file()
+def main(arguments, parameters, interceptor_start=None, cfg=None,
+         profiler=None):
+    """Evaluate parameters, see run_one_instance for the profiler."""
+    if interceptor_start is None:
+        interceptor_start = time.time()
+    config = load_experiment_config_file() if cfg is None else cfg
 
     loglevel = config.getint("HPOLIB", "HPOlib_loglevel")
     hpolib_logger.setLevel(loglevel)
     host = config.get("HPOLIB", "logging_host")
     if host:
+        from logging.handlers import SocketHandler
         port = config.getint("HPOLIB", "logging_port")
         socketh = SocketHandler(host, port)
         hpolib_logger.addHandler(socketh)
@@ -265,17 +460,21 @@ def main(arguments, parameters):
     cv_starttime = time.time()
     experiment = load_experiment_file()
     experiment.start_cv(cv_starttime)
-    experiment._save_jobs()
+    experiment._save_jobs(save_summary=False)
     experiment.close()
 
     folds = config.getint('HPOLIB', 'number_cv_folds')
 
     if arguments.instance is None and folds > 1:
         result, wallclock_time = \
-            do_cv(arguments, parameters, experiment, folds=folds)
+            do_cv(arguments, parameters, experiment, folds=folds,
+                  interceptor_start=interceptor_start, cfg=config,
+                  profiler=profiler)
     else:
         result, wallclock_time = \
-            run_one_instance(arguments, parameters, experiment)
+            run_one_instance(arguments, parameters, experiment,
+                             interceptor_start=interceptor_start, cfg=config,
+                             profiler=profiler)
 
     # Load the experiment to do time-keeping
     if experiment.is_closed():
@@ -285,12 +484,22 @@ def main(arguments, parameters):
     experiment._save_jobs()
     experiment.close()
 
-    sys.stdout.write("Result: %f, Runtime: %f\n" %
-                     (float(result), float(wallclock_time)))
+    if profiler is not None and \
+            getattr(profiler, "profile_base", None) is not None:
+        profiling.save_profiler(profiler, profiler.profile_base,
+                                "interceptor")
+
+    sys.stdout.write(format_result(result, wallclock_time))
     sys.stdout.flush()
     return result
 
 
 if __name__ == "__main__":
-    arguments, parameters = parse_cli()
-    main(arguments, parameters)
+    start = time.time()
+    cfg = load_experiment_config_file()
+    # A sampled evaluation is profiled from here on, see run_one_instance
+    profiler = profiling.start_profiler() if profiling.is_sampled(cfg) \
+        else None
+    arguments, parameters = parse_cli(get_parameter_decoder(cfg))
+    main(arguments, parameters, interceptor_start=start, cfg=cfg,
+         profiler=profiler)
@@ -0,0 +1,440 @@
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Measure the overhead HPOlib adds to every function evaluation.
+
+The benchmark creates a throw-away experiment directory and then
+
+1. times every phase of an evaluation inside this process (config parsing,
+   parameter parsing, locking, pickle load/save, dispatch and result
+   parsing),
+2. times the import of every module the interceptor needs and
+3. runs complete evaluations in a new interpreter with every command line
+   the optimizer bridges use to call the optimization_interceptor.
+
+The bridges themselves are not run, they need the optimizer packages. The
+bridge measurements therefore contain the interpreter startup and all work
+of the interceptor, but not the time an optimizer needs to start the
+subprocess through a shell.
+
+The results are returned as a dictionary and can be written as JSON, which
+makes it possible to compare dispatchers, lockers or storage backends on the
+same hardware.
+"""
+
+from argparse import ArgumentParser
+from collections import OrderedDict
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import HPOlib
+import HPOlib.config_parser.parse as parse
+from HPOlib.dispatcher import dispatcher
+import HPOlib.Experiment as Experiment
+import HPOlib.Locker as Locker
+import HPOlib.optimization_interceptor as optimization_interceptor
+import HPOlib.wrapping_util as wrapping_util
+
+
+__authors__ = ["Katharina Eggensperger", "Matthias Feurer"]
+__contact__ = "automl.org"
+
+
+logger = logging.getLogger("HPOlib.overhead_benchmark")
+
+EXPERIMENT_NAME = "bench"
+
+TARGETS = {"noop": ("HPOlib.overhead_benchmark", "noop"),
+           "branin": ("HPOlib.benchmarks.benchmark_functions",
+                      "save_branin")}
+
+# The command lines the optimizer bridges use to call the optimization
+# interceptor. TPE (tpecall.py) and Spearmint (spearmint_to_HPOlib.py) run the
+# module, SMAC (SMAC_to_HPOlib.py) additionally passes the fold and the
+# ConfigurationRunner runs the file.
+BRIDGES = OrderedDict([
+    ("module", ["-m", "HPOlib.optimization_interceptor", "--params"]),
+    ("module_fold", ["-m", "HPOlib.optimization_interceptor", "--fold", "0",
+                     "--params"]),
+    ("file", [os.path.splitext(os.path.abspath(
+        optimization_interceptor.__file__))[0] + ".py", "--params"])])
+
+PHASES = ["interpreter_startup", "import", "config_parsing",
+          "parameter_parsing", "lock_wait", "pickle_load", "pickle_save",
+          "dispatch", "result_parsing"]
+
+# Imported in this order, every module is charged with the modules it
+# imports additionally to the ones before it
+IMPORTS = ["numpy", "HPOlib.Locker", "HPOlib.config_parser.parse",
+           "HPOlib.wrapping_util", "HPOlib.Experiment", "HPOlib.profiling",
+           "HPOlib.dispatcher.dispatcher", "HPOlib.optimization_interceptor"]
+
+
+def noop(params, **kwargs):
+    """Target function which does nothing."""
+    return 0.0
+
+
+def _summarize(samples):
+    samples = np.array(samples, dtype=np.float64)
+    return OrderedDict([("n", len(samples)),
+                        ("mean", float(np.mean(samples))),
+                        ("median", float(np.median(samples))),
+                        ("std", float(np.std(samples))),
+                        ("min", float(np.min(samples))),
+                        ("max", float(np.max(samples)))])
+
+
+def _get_environment():
+    # The subprocesses must be able to import the same HPOlib as we do
+    env = dict(os.environ)
+    hpolib_root = os.path.dirname(os.path.dirname(
+        os.path.abspath(HPOlib.__file__)))
+    python_path = env.get("PYTHONPATH")
+    env["PYTHONPATH"] = hpolib_root if not python_path else \
+        os.pathsep.join([hpolib_root, python_path])
+    return env
+
+
+def _parse_result(output):
+    """Return the result and runtime of the interceptor's output or None.
+
+    Parses the line written by optimization_interceptor.format_result the
+    same way the optimizer bridges do.
+    """
+    for line in output.split("\n"):
+        pos = line.find("Result:")
+        if pos != -1:
+            result_array = line[pos:].split()
+            return float(result_array[1].strip(",")), \
+                float(result_array[3].strip(","))
+    return None
+
+
+def _sample_params(rng):
+    return OrderedDict([("x", "%f" % rng.uniform(-5, 10)),
+                        ("y", "%f" % rng.uniform(0, 15))])
+
+
+def create_experiment_directory(target="noop", dispatcher_name="python_file",
+                                base_dir=None):
+    """Create an experiment directory which can be used by the interceptor.
+
+    Returns the path of the directory, which is named like the directories
+    wrapping.py creates so that get_optimizer() finds the experiment pickle.
+    """
+    if target not in TARGETS:
+        raise ValueError("Unknown target %s, choose one of %s" %
+                         (target, str(TARGETS.keys())))
+    python_module, python_function = TARGETS[target]
+
+    base_dir = tempfile.mkdtemp(dir=base_dir)
+    experiment_dir = os.path.join(base_dir, EXPERIMENT_NAME + "_1")
+    os.mkdir(experiment_dir)
+
+    general_default = os.path.join(os.path.dirname(parse.__file__),
+                                   "generalDefault.cfg")
+    config = parse.parse_config(general_default, allow_no_value=True)
+    config.set("HPOLIB", "dispatcher", dispatcher_name)
+    config.set("HPOLIB", "python_module", python_module)
+    config.set("HPOLIB", "python_function", python_function)
+    config.set("HPOLIB", "function", "%s -c 'pass'" % sys.executable)
+    config.set("HPOLIB", "number_of_jobs", "1")
+    config.set("HPOLIB", "result_on_terminate", "1000")
+    config.set("HPOLIB", "HPOlib_loglevel", "30")
+    config.set("HPOLIB", "is_not_original_config_file", "True")
+    cfg_filename = os.path.join(experiment_dir, "config.cfg")
+    with open(cfg_filename, "w") as fh:
+        wrapping_util.save_config_to_file(fh, config, write_nones=True)
+    wrapping_util.save_config_snapshot(os.path.join(
+        experiment_dir, wrapping_util.CONFIG_SNAPSHOT_FILENAME), config,
+        cfg_filename)
+
+    experiment = Experiment.Experiment(experiment_dir, EXPERIMENT_NAME)
+    experiment.starttime.append(time.time())
+    experiment._save_jobs()
+    experiment.close()
+    return experiment_dir
+
+
+def _time_subprocess(call, env, cwd):
+    starttime = time.time()
+    proc = subprocess.Popen(call, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, env=env, cwd=cwd)
+    stdout, stderr = proc.communicate()
+    return time.time() - starttime, stdout, stderr
+
+
+def measure_phases(experiment_dir, evaluations, seed=1):
+    """Time the phases of an evaluation inside this process.
+
+    The phases are measured in isolation, but in the same order and on the
+    same files as optimization_interceptor.run_one_instance uses them.
+
+    Returns an OrderedDict mapping each phase name to a list of durations.
+    """
+    rng = random.Random(seed)
+    env = _get_environment()
+    samples = OrderedDict([(phase, list()) for phase in PHASES])
+
+    for i in range(evaluations):
+        duration, _, _ = _time_subprocess([sys.executable, "-c", "pass"],
+                                          env, experiment_dir)
+        samples["interpreter_startup"].append(duration)
+        duration, _, _ = _time_subprocess(
+            [sys.executable, "-c", "import HPOlib.optimization_interceptor"],
+            env, experiment_dir)
+        samples["import"].append(max(0, duration -
+                                     samples["interpreter_startup"][-1]))
+
+    cur_dir = os.getcwd()
+    os.chdir(experiment_dir)
+    try:
+        pkl = os.path.abspath(EXPERIMENT_NAME + ".pkl")
+        for i in range(evaluations):
+            params = _sample_params(rng)
+
+            starttime = time.time()
+            cfg = wrapping_util.load_experiment_config_file()
+            samples["config_parsing"].append(time.time() - starttime)
+
+            starttime = time.time()
+            params = optimization_interceptor.parse_params(
+                sum([["-" + key, "'%s'" % params[key]] for key in params],
+                    []), optimization_interceptor.get_parameter_decoder(cfg))
+            samples["parameter_parsing"].append(time.time() - starttime)
+
+            locker = Locker.Locker()
+            starttime = time.time()
+            locker.lock_wait(pkl)
+            samples["lock_wait"].append(time.time() - starttime)
+            locker.unlock(pkl)
+
+            starttime = time.time()
+            experiment = Experiment.Experiment(".", EXPERIMENT_NAME)
+            samples["pickle_load"].append(time.time() - starttime)
+            trial_index = optimization_interceptor.get_trial_index(
+                experiment, 0, params)
+            experiment.set_one_fold_running(trial_index, 0)
+
+            starttime = time.time()
+            status, wallclock_time, result, additional_data = \
+                dispatcher.main(None, params, 0)
+            samples["dispatch"].append(time.time() - starttime)
+
+            result = cfg.getfloat("HPOLIB", "result_on_terminate") \
+                if status != "SAT" else result
+            starttime = time.time()
+            _parse_result(optimization_interceptor.format_result(
+                result, wallclock_time))
+            samples["result_parsing"].append(time.time() - starttime)
+
+            experiment.set_one_fold_complete(trial_index, 0, result,
+                                             wallclock_time)
+            starttime = time.time()
+            experiment._save_jobs()
+            samples["pickle_save"].append(time.time() - starttime)
+            experiment.close()
+    finally:
+        os.chdir(cur_dir)
+
+    return samples
+
+
+def measure_imports(experiment_dir, evaluations, modules=None):
+    """Time how long importing the interceptor takes, split by module.
+
+    The modules are imported in a new interpreter in the given order (default:
+    IMPORTS), so the time of a module only contains what was not already
+    imported by the modules before it.
+
+    Returns an OrderedDict mapping each module to a list of durations.
+    """
+    if modules is None:
+        modules = IMPORTS
+    env = _get_environment()
+    script = "import time\n" \
+             "for module in %r:\n" \
+             "    starttime = time.time()\n" \
+             "    __import__(module)\n" \
+             "    print module, time.time() - starttime\n" % list(modules)
+
+    samples = OrderedDict([(module, list()) for module in modules])
+    for i in range(evaluations):
+        duration, stdout, stderr = _time_subprocess(
+            [sys.executable, "-c", script], env, experiment_dir)
+        durations = dict([line.split() for line in stdout.split("\n")
+                          if line.strip()])
+        if len(durations) != len(modules):
+            raise ValueError("Could not import all modules:\n%s" % stderr)
+        for module in modules:
+            samples[module].append(float(durations[module]))
+    return samples
+
+
+def measure_bridges(experiment_dir, evaluations, bridges=None, seed=1):
+    """Run complete evaluations through the optimization interceptor.
+
+    For every command line in BRIDGES, the interceptor is started in a new
+    interpreter and its output is parsed like the bridges do. The overhead
+    is the wallclock time of the call minus the runtime the interceptor
+    reports for the target function.
+
+    Returns an OrderedDict mapping each bridge name to a dictionary with
+    the lists 'wallclock' and 'overhead'.
+    """
+    if bridges is None:
+        bridges = BRIDGES.keys()
+    rng = random.Random(seed)
+    env = _get_environment()
+
+    samples = OrderedDict()
+    for bridge in bridges:
+        if bridge not in BRIDGES:
+            raise ValueError("Unknown bridge %s, choose from %s" %
+                             (bridge, str(BRIDGES.keys())))
+        samples[bridge] = {"wallclock": list(), "overhead": list()}
+        for i in range(evaluations):
+            call = [sys.executable] + BRIDGES[bridge]
+            params = _sample_params(rng)
+            for key in params:
+                call.extend(["-" + key, "'%s'" % params[key]])
+
+            duration, stdout, stderr = _time_subprocess(call, env,
+                                                        experiment_dir)
+            parsed = _parse_result(stdout)
+            if parsed is None:
+                raise ValueError("Evaluation through bridge %s did not "
+                                 "return a result:\n%s\n%s" %
+                                 (bridge, stdout, stderr))
+            runtime = parsed[1]
+            samples[bridge]["wallclock"].append(duration)
+            samples[bridge]["overhead"].append(duration - runtime)
+    return samples
+
+
+def run_benchmark(evaluations=10, target="noop",
+                  dispatcher_name="python_file", bridges=None, seed=1,
+                  keep_samples=False):
+    """Run the overhead benchmark and return a machine-readable summary."""
+    experiment_dir = create_experiment_directory(
+        target=target, dispatcher_name=dispatcher_name)
+    try:
+        phases = measure_phases(experiment_dir, evaluations, seed=seed)
+        imports = measure_imports(experiment_dir, evaluations)
+        bridge_samples = measure_bridges(experiment_dir, evaluations,
+                                         bridges=bridges, seed=seed)
+    finally:
+        shutil.rmtree(os.path.dirname(experiment_dir))
+
+    results = OrderedDict()
+    results["hpolib_version"] = HPOlib.__version__
+    results["python"] = platform.python_version()
+    results["host"] = platform.node()
+    results["platform"] = platform.platform()
+    results["target"] = target
+    results["dispatcher"] = dispatcher_name
+    results["evaluations"] = evaluations
+    results["phases"] = OrderedDict([(phase, _summarize(phases[phase]))
+                                     for phase in phases])
+    results["imports"] = OrderedDict([(module, _summarize(imports[module]))
+                                      for module in imports])
+    results["bridges"] = OrderedDict()
+    for bridge in bridge_samples:
+        results["bridges"][bridge] = OrderedDict(
+            [(key, _summarize(bridge_samples[bridge][key]))
+             for key in ("wallclock", "overhead")])
+    if keep_samples:
+        results["samples"] = OrderedDict([("phases", phases),
+                                          ("imports", imports),
+                                          ("bridges", bridge_samples)])
+    return results
+
+
+def format_results(results):
+    lines = ["HPOlib %s, python %s, target %s, dispatcher %s, %d "
+             "evaluations" % (results["hpolib_version"], results["python"],
+                              results["target"], results["dispatcher"],
+                              results["evaluations"]),
+             "%30s | %10s | %10s | %10s" % ("Phase", "Mean [ms]",
+                                            "Median [ms]", "Max [ms]")]
+    for phase in results["phases"]:
+        summary = results["phases"][phase]
+        lines.append("%30s | %10.3f | %10.3f | %10.3f" %
+                     (phase, summary["mean"] * 1000,
+                      summary["median"] * 1000, summary["max"] * 1000))
+    for module in results["imports"]:
+        summary = results["imports"][module]
+        lines.append("%30s | %10.3f | %10.3f | %10.3f" %
+                     ("import %s" % module.replace("HPOlib.", ""),
+                      summary["mean"] * 1000, summary["median"] * 1000,
+                      summary["max"] * 1000))
+    for bridge in results["bridges"]:
+        summary = results["bridges"][bridge]["overhead"]
+        lines.append("%30s | %10.3f | %10.3f | %10.3f" %
+                     ("%s overhead" % bridge, summary["mean"] * 1000,
+                      summary["median"] * 1000, summary["max"] * 1000))
+    return "\n".join(lines)
+
+
+def main():
+    prog = "HPOlib-bench"
+    description = "Measure the per-evaluation overhead of HPOlib with a " \
+                  "no-op or a cheap target function."
+    parser = ArgumentParser(description=description, prog=prog)
+    parser.add_argument("-n", "--evaluations", type=int, default=10,
+                        help="Number of evaluations per phase and bridge.")
+    parser.add_argument("--target", choices=sorted(TARGETS.keys()),
+                        default="noop", help="Target function.")
+    parser.add_argument("--dispatcher", default="python_file",
+                        help="Value for HPOLIB:dispatcher.")
+    parser.add_argument("--bridges", nargs="+", choices=BRIDGES.keys(),
+                        default=None, help="Only run these bridges.")
+    parser.add_argument("-s", "--seed", type=int, default=1)
+    parser.add_argument("-o", "--output", default=None,
+                        help="Write the results as JSON to this file.")
+    parser.add_argument("--samples", action="store_true", default=False,
+                        help="Include all single measurements in the JSON.")
+    args = parser.parse_args()
+
+    results = run_benchmark(evaluations=args.evaluations, target=args.target,
+                            dispatcher_name=args.dispatcher,
+                            bridges=args.bridges, seed=args.seed,
+                            keep_samples=args.samples)
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    sys.stderr.write(format_results(results) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Profile a fraction of all function evaluations with cProfile.
+
+Profiling is switched on with HPOLIB:profile_evaluations, the fraction of
+evaluations which are profiled. For every sampled evaluation two files are
+written to HPOLIB:profile_directory:
+
+* trial_<id>_fold_<fold>_interceptor.pstats with the time HPOlib spends in
+  the optimization_interceptor (locking, bookkeeping, pickling). For the
+  first fold of a call this covers the interceptor's main from parsing the
+  command line on; starting the interpreter, the imports and loading the
+  configuration happen before the evaluation can be sampled, HPOlib-bench
+  measures them. And
+* trial_<id>_fold_<fold>_target.pstats with the time spent in the target
+  function if it is called by the python_file dispatcher.
+
+HPOlib-profile merges all these files into one .pstats file per kind and a
+file with collapsed stacks, which can be read by flamegraph.pl or speedscope.
+"""
+
+from argparse import ArgumentParser
+import cProfile
+import glob
+import logging
+import os
+import pstats
+import random
+import sys
+
+
+__authors__ = ["Katharina Eggensperger", "Matthias Feurer"]
+__contact__ = "automl.org"
+
+
+logger = logging.getLogger("HPOlib.profiling")
+
+KINDS = ["interceptor", "target"]
+DEFAULT_DIRECTORY = "profiles"
+
+
+def is_sampled(cfg):
+    """Decide whether an evaluation is profiled."""
+    fraction = cfg.getfloat("HPOLIB", "profile_evaluations")
+    return fraction > 0 and random.random() < fraction
+
+
+def get_profile_base(cfg, trial_index, fold, sampled=None):
+    """Decide whether this evaluation is profiled.
+
+    Returns the path prefix for the profile files of this evaluation or None
+    if the evaluation is not sampled. If sampled is None, the evaluation is
+    sampled with is_sampled. A relative HPOLIB:profile_directory is
+    interpreted relative to the experiment directory (the current working
+    directory of the optimization_interceptor).
+    """
+    if sampled is None:
+        sampled = is_sampled(cfg)
+    if not sampled:
+        return None
+
+    directory = cfg.get("HPOLIB", "profile_directory")
+    if not directory:
+        directory = DEFAULT_DIRECTORY
+    directory = os.path.abspath(directory)
+    try:
+        os.makedirs(directory)
+    except OSError:
+        if not os.path.isdir(directory):
+            raise
+    return os.path.join(directory, "trial_%d_fold_%d" % (trial_index, fold))
+
+
+def get_profile_filename(profile_base, kind):
+    return "%s_%s.pstats" % (profile_base, kind)
+
+
+def start_profiler():
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def save_profiler(profiler, profile_base, kind):
+    """Stop the profiler and write its statistics.
+
+    A profile which cannot be written is logged and otherwise ignored, it
+    must never change the result of a function evaluation.
+    """
+    profiler.disable()
+    filename = get_profile_filename(profile_base, kind)
+    try:
+        profiler.dump_stats(filename)
+    except (IOError, OSError) as e:
+        logger.error("Could not write profile %s: %s", filename, str(e))
+        return None
+    return filename
+
+
+def load_stats(filenames):
+    """Merge a list of .pstats files into one pstats.Stats object."""
+    stats = None
+    for filename in filenames:
+        if stats is None:
+            stats = pstats.Stats(filename)
+        else:
+            stats.add(filename)
+    return stats
+
+
+def _format_function(function):
+    filename, line, name = function
+    if filename == "~":
+        # Builtins like <len> or <method 'append' of 'list' objects>
+        return name
+    return "%s (%s:%d)" % (name, os.path.basename(filename), line)
+
+
+def collapse_stats(stats, max_depth=64):
+    """Convert a pstats.Stats object into collapsed stacks.
+
+    cProfile only records caller/callee pairs and not complete stacks. The
+    cumulative time of a function is therefore distributed to its callers
+    proportional to the time spent in the call from every caller, like
+    gprof2dot or flameprof do. Recursive calls are cut off.
+
+    Returns a dictionary which maps a stack (a tuple of frame names, the root
+    comes first) to the time in seconds spent in the last frame of the stack.
+    """
+    raw = stats.stats
+    callees = dict()
+    for function, (cc, nc, tt, ct, callers) in raw.items():
+        for caller, caller_stats in callers.items():
+            # Python 2.7 cProfile stores a tuple, the profile module a number
+            edge_time = caller_stats[3] if isinstance(caller_stats, tuple) \
+                else raw[function][3]
+            callees.setdefault(caller, []).append((function, edge_time))
+
+    stacks = dict()
+
+    def _walk(function, stack, time_budget):
+        cumulative_time = raw[function][3]
+        if cumulative_time <= 0 or time_budget <= 0:
+            return
+        scale = min(1.0, time_budget / cumulative_time)
+        frames = stack + (_format_function(function),)
+        own_time = raw[function][2] * scale
+        if own_time > 0:
+            stacks[frames] = stacks.get(frames, 0) + own_time
+        if len(frames) >= max_depth:
+            return
+        for callee, edge_time in callees.get(function, []):
+            if callee == function or _format_function(callee) in stack:
+                continue
+            _walk(callee, frames, edge_time * scale)
+
+    roots = [function for function, values in raw.items()
+             if not values[4]]
+    for root in roots:
+        _walk(root, tuple(), raw[root][3])
+    return stacks
+
+
+def write_collapsed_stacks(stacks, filename):
+    """Write stacks in the collapsed format (frame;frame;frame count).
+
+    The count is the time in microseconds.
+    """
+    with open(filename, "w") as fh:
+        for frames in sorted(stacks):
+            count = int(round(stacks[frames] * 1e6))
+            if count > 0:
+                fh.write("%s %d\n" % (";".join(frames), count))
+
+
+def aggregate(profile_directory, output_directory=None):
+    """Merge all profiles in profile_directory.
+
+    For every kind of profile (interceptor and target) a merged
+    <kind>.pstats and a <kind>.collapsed file are written to
+    output_directory (defaults to profile_directory). Returns a dictionary
+    which maps the kind to a tuple (number of merged profiles, pstats.Stats).
+    """
+    if output_directory is None:
+        output_directory = profile_directory
+    if not os.path.isdir(output_directory):
+        os.makedirs(output_directory)
+
+    aggregated = dict()
+    for kind in KINDS:
+        filenames = sorted(glob.glob(os.path.join(
+            profile_directory, "trial_*_fold_*_%s.pstats" % kind)))
+        if len(filenames) == 0:
+            continue
+        stats = load_stats(filenames)
+        stats.dump_stats(os.path.join(output_directory, "%s.pstats" % kind))
+        write_collapsed_stacks(collapse_stats(stats), os.path.join(
+            output_directory, "%s.collapsed" % kind))
+        aggregated[kind] = (len(filenames), stats)
+    return aggregated
+
+
+def main():
+    prog = "HPOlib-profile"
+    description = "Merge the profiles written by HPOLIB:profile_evaluations " \
+                  "into one .pstats and one collapsed stack file per kind."
+    parser = ArgumentParser(description=description, prog=prog)
+    parser.add_argument("directory", help="The experiment directory or the "
+                                          "profile directory.")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Where to write the merged files, default is "
+                             "the profile directory.")
+    parser.add_argument("-n", "--number", type=int, default=20,
+                        help="Print the n most expensive functions.")
+    args = parser.parse_args()
+
+    profile_directory = args.directory
+    if os.path.isdir(os.path.join(profile_directory, DEFAULT_DIRECTORY)):
+        profile_directory = os.path.join(profile_directory, DEFAULT_DIRECTORY)
+
+    aggregated = aggregate(profile_directory, args.output)
+    if len(aggregated) == 0:
+        sys.stderr.write("Found no profiles in %s\n" % profile_directory)
+        sys.exit(1)
+
+    for kind in KINDS:
+        if kind not in aggregated:
+            continue
+        num_profiles, stats = aggregated[kind]
+        sys.stdout.write("%s: merged %d profiles\n" % (kind, num_profiles))
+        stats.sort_stats("cumulative").print_stats(args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""A persistent cache for the results of deterministic target algorithms.
+
+The cache is switched on with HPOLIB:result_cache, the path of an SQLite
+database. A relative path is interpreted relative to the benchmark directory
+(the parent of the experiment directory), all runs of a benchmark share the
+cache. The optimization_interceptor looks up every (configuration, fold)
+before calling the dispatcher and stores every successful evaluation.
+
+Entries belong to a namespace, a hash of the benchmark directory, the
+options of HPOLIB which define the target algorithm and all benchmark
+specific sections of the configuration, see get_namespace. Changing e.g. the
+dataset settings of a benchmark starts a new namespace.
+They expire after HPOLIB:result_cache_ttl seconds, if the cache holds more
+than HPOLIB:result_cache_size entries the oldest ones are removed. A value
+of 0 disables the respective limit.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+
+
+__authors__ = ["Katharina Eggensperger", "Matthias Feurer"]
+__contact__ = "automl.org"
+
+
+logger = logging.getLogger("HPOlib.result_cache")
+
+# Configuration options which define the target algorithm
+NAMESPACE_OPTIONS = ["dispatcher", "function", "python_module",
+                     "python_function", "number_cv_folds"]
+# Sections of the configuration which do not change the result of the target
+# algorithm: HPOLIB (only NAMESPACE_OPTIONS are used) and the optimizers
+IGNORED_SECTIONS = ["HPOLIB", "SMAC", "TPE", "SPEARMINT", "irace",
+                    "ConfigurationRunner"]
+
+
+def get_namespace(cfg):
+    """Return the namespace of the entries of this benchmark."""
+    values = [os.path.dirname(os.getcwd())]
+    values.extend([cfg.get("HPOLIB", option) for option in NAMESPACE_OPTIONS])
+    for section in sorted(cfg.sections()):
+        if section not in IGNORED_SECTIONS:
+            values.append((section, sorted(cfg.items(section, raw=True))))
+    return hashlib.md5(repr(values)).hexdigest()
+
+
+def get_result_cache(cfg):
+    """Return the ResultCache of HPOLIB:result_cache or None if the cache is
+    switched off."""
+    filename = cfg.get("HPOLIB", "result_cache")
+    if not filename:
+        return None
+    filename = os.path.join(os.path.dirname(os.getcwd()), filename)
+    return ResultCache(filename, get_namespace(cfg),
+                       ttl=cfg.getfloat("HPOLIB", "result_cache_ttl"),
+                       size=cfg.getint("HPOLIB", "result_cache_size"))
+
+
+class ResultCache(object):
+    """Results of a target algorithm by (params hash, fold).
+
+    The database can be used by many processes at the same time, every
+    access is a single transaction. The table is only created if it does not
+    exist yet, opening an existing cache does not write to it.
+    """
+    def __init__(self, filename, namespace, ttl=0, size=0, timeout=60):
+        self.filename = filename
+        self.namespace = namespace
+        self.ttl = ttl
+        self.size = size
+        self.connection = sqlite3.connect(filename, timeout=timeout)
+        if self.connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND "
+                "name = 'results'").fetchone() is not None:
+            return
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS results (namespace TEXT, "
+                "params_hash TEXT, fold INTEGER, result REAL, duration REAL, "
+                "additional_data TEXT, created REAL, "
+                "PRIMARY KEY (namespace, params_hash, fold))")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS results_created ON "
+                "results (created)")
+
+    def __len__(self):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def _get_oldest_allowed(self):
+        return time.time() - self.ttl if self.ttl > 0 else None
+
+    def get(self, params_hash, fold):
+        """Return a tuple (result, duration, additional_data) or None if the
+        evaluation is not in the cache or expired."""
+        row = self.connection.execute(
+            "SELECT result, duration, additional_data, created FROM results "
+            "WHERE namespace = ? AND params_hash = ? AND fold = ?",
+            (self.namespace, params_hash, fold)).fetchone()
+        oldest_allowed = self._get_oldest_allowed()
+        if row is None or (oldest_allowed is not None and
+                           row[3] < oldest_allowed):
+            return None
+        return row[0], row[1], row[2]
+
+    def put(self, params_hash, fold, result, duration, additional_data=""):
+        """Store the result of an evaluation and evict old entries."""
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.namespace, params_hash, fold, float(result),
+                 float(duration), str(additional_data), time.time()))
+            self._evict()
+
+    def _evict(self):
+        oldest_allowed = self._get_oldest_allowed()
+        if oldest_allowed is not None:
+            self.connection.execute("DELETE FROM results WHERE created < ?",
+                                    (oldest_allowed, ))
+        if self.size > 0:
+            self.connection.execute(
+                "DELETE FROM results WHERE rowid IN (SELECT rowid FROM "
+                "results ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.size, ))
@@ -263,9 +263,13 @@ def main():
 
         config.set("HPOLIB", "logging_port", str(logging_port))
 
-    with open(os.path.join(optimizer_dir_in_experiment, "config.cfg"), "w") as f:
+    cfg_filename = os.path.join(optimizer_dir_in_experiment, "config.cfg")
+    with open(cfg_filename, "w") as f:
         config.set("HPOLIB", "is_not_original_config_file", "True")
         wrapping_util.save_config_to_file(f, config, write_nones=True)
+    wrapping_util.save_config_snapshot(os.path.join(
+        optimizer_dir_in_experiment, wrapping_util.CONFIG_SNAPSHOT_FILENAME),
+        config, cfg_filename)
 
     # initialize/reload pickle file
     if args.restore:
@@ -18,20 +18,20 @@
 
 from argparse import ArgumentParser
 from ConfigParser import SafeConfigParser
+import cPickle
 import datetime
+import hashlib
 import logging
 import imp
 import math
 import numpy as np
 import traceback
 import os
-import psutil
 import re
 import signal
 from StringIO import StringIO
 import sys
 import types
-import inspect
 import config_parser.parse as parse
 
 
@@ -41,6 +41,11 @@ __contact__ = "automl.org"
 
 logger = logging.getLogger("HPOlib.wrapping_util")
 
+# Written next to the config.cfg by wrapping.py, can be loaded without parsing.
+# It must not end with .pkl, the plotting scripts take every pickle in the
+# experiment directory for an experiment pickle
+CONFIG_SNAPSHOT_FILENAME = ".config_snapshot"
+
 
 def nan_mean(arr):
     # First: Sum all finite elements
@@ -120,12 +125,66 @@ def get_optimizer():
     return "_".join(os.getcwd().split("/")[-1].split("_")[0:-2])
 
 
+def get_config_hash(cfg_filename):
+    """Return the md5 hash of the content of the file cfg_filename."""
+    with open(cfg_filename, "rb") as fh:
+        return hashlib.md5(fh.read()).hexdigest()
+
+
+def save_config_snapshot(filename, config, cfg_filename):
+    """Save the values of config in a file which is fast to load.
+
+    The snapshot contains the same values as the config.cfg cfg_filename
+    written by save_config_to_file and is read by load_experiment_config_file
+    as long as the hash of cfg_filename does not change.
+    """
+    # Go through the config file format to get exactly the values which are
+    # read from the config.cfg, e.g. None becomes 'None'
+    fh = StringIO()
+    save_config_to_file(fh, config, write_nones=True)
+    fh.seek(0)
+    written_config = SafeConfigParser(allow_no_value=True)
+    written_config.readfp(fh)
+    fh.close()
+
+    snapshot = [(section, written_config.items(section, raw=True))
+                for section in written_config.sections()]
+    with open(filename, "wb") as fh:
+        cPickle.dump((get_config_hash(cfg_filename), snapshot), fh,
+                     cPickle.HIGHEST_PROTOCOL)
+
+
+def load_config_snapshot(filename, cfg_filename):
+    """Load a snapshot written by save_config_snapshot.
+
+    Returns None if cfg_filename was changed after the snapshot was written.
+    """
+    with open(filename, "rb") as fh:
+        cfg_hash, snapshot = cPickle.load(fh)
+    if cfg_hash != get_config_hash(cfg_filename):
+        return None
+    config = SafeConfigParser(allow_no_value=True)
+    for section, items in snapshot:
+        config.add_section(section)
+        for key, value in items:
+            config.set(section, key, value)
+    return config
+
+
 def load_experiment_config_file():
     # Load the config file, this holds information about data, black box fn etc.
     try:
         cfg_filename = "config.cfg"
-        config = SafeConfigParser(allow_no_value=True)
-        config.read(cfg_filename)
+        # Only use the snapshot if the config.cfg was not changed after the
+        # snapshot was written
+        try:
+            config = load_config_snapshot(CONFIG_SNAPSHOT_FILENAME,
+                                          cfg_filename)
+        except (IOError, EOFError, ValueError, cPickle.UnpicklingError):
+            config = None
+        if config is None:
+            config = SafeConfigParser(allow_no_value=True)
+            config.read(cfg_filename)
         if not config.has_option("HPOLIB", "is_not_original_config_file"):
             logger.critical("Config file in directory %s seems to be an"
                             " original config which was not created by wrapping.py. "
@@ -330,41 +389,247 @@ class Exit:
         self.signal = signal_
 
 
+# Markers of parameters which are defined on the log scale, checked in this
+# order, and of quantized parameters
+LOG_MARKERS = [("LOG10_", lambda value: np.power(10, value)),
+               ("LOG2_", lambda value: np.power(2, value)),
+               ("LOG_", np.exp)]
+Q_MARKER = re.compile(r'Q[0-999\.]{1,10}_')
+
+
+def compile_param_name(name):
+    """Return the transform plan of a parameter name, a tuple (name without
+    metadata, function of the log scale or None, q value or None).
+
+    See remove_param_metadata for the markers.
+    """
+    new_name = name
+    transform = None
+    for marker, function in LOG_MARKERS:
+        pos = name.find(marker)
+        if pos != -1:
+            new_name = name[0:pos] + name[pos + len(marker):]
+            transform = function
+            break
+
+    q = None
+    m = Q_MARKER.search(name)
+    if m is not None:
+        pos = new_name.find(m.group(0))
+        new_name = new_name[0:pos] + new_name[pos + len(m.group(0)):]
+        q = float(m.group(0)[1:-1])
+    return new_name, transform, q
+
+
+def get_marked_names(hyperparameter):
+    """Return the names under which an optimizer may pass a hyperparameter.
+
+    Readers of search spaces remove the LOG/Q markers from the names and
+    store them as base and q of the hyperparameter, this is the inverse. The
+    list contains the spellings of the pcs and the pyll writer with the Q
+    marker before or after the LOG marker, and the plain name for optimizers
+    which handle the log scale themselves.
+    """
+    name = hyperparameter.name
+    base = getattr(hyperparameter, "base", None)
+    q = getattr(hyperparameter, "q", None)
+    if q is None and base is not None and \
+            hasattr(hyperparameter, "check_int"):
+        # Integer hyperparameters on the log scale are quantized by 1
+        q = 1
+
+    log_markers = [""]
+    if base is not None:
+        for marker, marker_base in [("LOG10_", 10), ("LOG2_", 2),
+                                    ("LOG_", np.e)]:
+            if abs(base - marker_base) < 0.000001:
+                log_markers.append(marker)
+    q_markers = [""]
+    if q is not None:
+        q_markers.extend(sorted(set(["Q%s_" % q, "Q%f_" % q,
+                                           "Q%g_" % q])))
+
+    names = list()
+    for log_marker in log_markers:
+        for q_marker in q_markers:
+            for marked in (log_marker + q_marker + name,
+                           q_marker + log_marker + name):
+                if marked not in names:
+                    names.append(marked)
+    return names
+
+
+class ParameterDecoder(object):
+    """Removes the metadata from parameter names and values.
+
+    The transform plan of every parameter name (see compile_param_name) is
+    compiled once, names which are not yet known are compiled when they are
+    seen for the first time. Use from_space to compile all names of a search
+    space in advance.
+    """
+    def __init__(self, names=()):
+        self.plans = dict()
+        for name in names:
+            self.compile(name)
+
+    @classmethod
+    def from_space(cls, space):
+        """Create a decoder for a search space, either a dictionary of
+        hyperparameters (see pcs_parser.read) or a
+        HPOlib.format_converter.configuration_space.ConfigurationSpace.
+
+        The plans of all names in get_marked_names are compiled."""
+        if isinstance(space, dict):
+            hyperparameters = space.values()
+        else:
+            hyperparameters = space.hyperparameters
+        names = list()
+        for hyperparameter in hyperparameters:
+            names.extend(get_marked_names(hyperparameter))
+        return cls(names)
+
+    def compile(self, name):
+        plan = compile_param_name(name)
+        self.plans[name] = plan
+        return plan
+
+    def decode(self, params):
+        """Remove the metadata from params in place."""
+        for name in list(params):
+            plan = self.plans.get(name)
+            if plan is None:
+                plan = self.compile(name)
+            new_name, transform, q = plan
+
+            value = params[name]
+            if isinstance(value, str):
+                value = value.strip("'").strip('"')
+            if transform is not None:
+                value = transform(float(value))
+            if q is not None:
+                value = round(float(value) / q) * q
+
+            if new_name != name:
+                del params[name]
+            params[new_name] = value
+
+    def decode_batch(self, params_list):
+        """Remove the metadata from every dictionary in params_list in place."""
+        for params in params_list:
+            self.decode(params)
+
+
+# Used by remove_param_metadata, keeps the plans of all names seen so far
+_decoder = ParameterDecoder()
+
+
 def remove_param_metadata(params):
     """
     Check whether some params are defined on the Log scale or with a Q value,
     must be marked with "LOG$_{paramname}" or Q[0-999]_$paramname
     LOG_/Q_ will be removed from the paramname
     """
-    for para in params:
-        new_name = para
-
-        if isinstance(params[para], str):
-            params[para] = params[para].strip("'")
-            params[para] = params[para].strip('"')
-        if "LOG10_" in para:
-            pos = para.find("LOG10_")
-            new_name = para[0:pos] + para[pos + 6:]
-            params[new_name] = np.power(10, float(params[para]))
-            del params[para]
-        elif "LOG2_" in para:
-            pos = para.find("LOG2_")
-            new_name = para[0:pos] + para[pos + 5:]
-            params[new_name] = np.power(2, float(params[para]))
-            del params[para]
-        elif "LOG_" in para:
-            pos = para.find("LOG_")
-            new_name = para[0:pos] + para[pos + 4:]
-            params[new_name] = np.exp(float(params[para]))
-            del params[para]
-            # Check for Q value, returns round(x/q)*q
-        m = re.search(r'Q[0-999\.]{1,10}_', para)
-        if m is not None:
-            pos = new_name.find(m.group(0))
-            tmp = new_name[0:pos] + new_name[pos + len(m.group(0)):]
-            q = float(m.group(0)[1:-1])
-            params[tmp] = round(float(params[new_name]) / q) * q
-            del params[new_name]
+    _decoder.decode(params)
+
+
+def canonicalize_value(value, coerce_numbers=False):
+    """Return a canonical representation of a parameter value.
+
+    Numbers are rounded to 12 significant digits and become an int if they
+    are integral. Strings lose surrounding quotes and are otherwise kept as
+    given, e.g. the categorical values '1' and '1.0' stay different. With
+    coerce_numbers, strings which can be parsed as a number are treated as
+    that number.
+    """
+    if isinstance(value, basestring):
+        value = value.strip().strip("'").strip('"')
+        if not coerce_numbers:
+            return value
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    if not np.isfinite(number):
+        return str(number)
+    number = float("%.12g" % number)
+    if number == int(number):
+        return int(number)
+    return number
+
+
+def canonicalize_params(params, configuration_space=None,
+                        coerce_numbers=False):
+    """Return the parameters as a sorted list of canonical (name, value)
+    tuples.
+
+    Names lose a leading minus and the LOG/Q markers of
+    remove_param_metadata, values are canonicalized with canonicalize_value
+    (see there for coerce_numbers).
+    configuration_space is an optional
+    HPOlib.format_converter.configuration_space.ConfigurationSpace, if given
+    the values are first normalized by the types of their hyperparameters,
+    see ConfigurationSpace.canonicalize.
+    """
+    params = dict([(name[1:] if name.startswith("-") else name, value)
+                   for name, value in params.items()])
+    remove_param_metadata(params)
+    if configuration_space is not None:
+        params = configuration_space.canonicalize(params)
+    return sorted([(name, canonicalize_value(value, coerce_numbers))
+                   for name, value in params.items()])
+
+
+def get_params_hash(params, configuration_space=None, bits=128,
+                    coerce_numbers=False):
+    """Return a stable hash of the canonical parameters (see
+    canonicalize_params) as a hex string of 64 or 128 bits.
+
+    Configurations which only differ in the representation of their values,
+    e.g. LOG10_x=-1 and x=0.1, get the same hash. Strings are only compared
+    as numbers with a configuration_space (for its numerical
+    hyperparameters) or with coerce_numbers.
+    """
+    if bits not in (64, 128):
+        raise ValueError("bits must be 64 or 128, not %s" % str(bits))
+    canonical = canonicalize_params(params, configuration_space,
+                                    coerce_numbers)
+    return hashlib.md5(repr(canonical)).hexdigest()[:bits / 4]
+
+
+_SEQUENCE_TYPES = (list, tuple, np.ndarray)
+
+
+def _flatten_parameter(key, value, new_dict, params):
+    if type(value) == dict:
+        _flatten(value, new_dict, params)
+    elif type(value) in _SEQUENCE_TYPES and \
+            all([type(v) not in _SEQUENCE_TYPES for v in value]):
+        # Spearmint special case, keep only the first element
+        # Adding: variable_id = val
+        if len(value) == 1:
+            new_dict[key] = value[0]
+        else:
+            for v_idx, v in enumerate(value):
+                new_dict[key + "_%s" % v_idx] = v
+    elif type(value) in _SEQUENCE_TYPES:
+        for v in reversed(value):
+            _flatten(v, new_dict, params)
+    else:
+        new_dict[key] = value
+
+
+def _flatten(param, new_dict, params):
+    # Entries are visited last to first, later entries are overwritten by
+    # earlier ones with the same name
+    if type(param) in _SEQUENCE_TYPES:
+        for sub_param in reversed(param):
+            _flatten(sub_param, new_dict, params)
+    elif isinstance(param, dict):
+        for key, value in reversed(param.items()):
+            _flatten_parameter(key, value, new_dict, params)
+    else:
+        raise Exception(
+            "Invalid params, cannot be flattened: \n%s." % params)
 
 
 def flatten_parameter_dict(params):
@@ -379,53 +644,7 @@ def flatten_parameter_dict(params):
     #    'l2_penalty_nz': hp.lognormal('l2_penalty_nz', np.log(1.0e-6), 3.)}])
     # Lists cannot be forwarded via the command line, therefore the list has to
     # be unpacked. ONLY THE FIRST VALUE IS FORWARDED!
-
-    # This class enables us to distinguish tuples, which are parameters from
-    # tuples which contain different things...
-    class Parameter:
-        def __init__(self, pparam):
-            self.pparam = pparam
-
-    params_to_check = list()
-    params_to_check.append(params)
-
     new_dict = dict()
-    while len(params_to_check) != 0:
-        param = params_to_check.pop()
-
-        if type(param) in (list, tuple, np.ndarray):
-
-            for sub_param in param:
-                params_to_check.append(sub_param)
-
-        elif isinstance(param, dict):
-            params_to_check.extend([Parameter(tmp_param) for tmp_param in
-                                    zip(param.keys(), param.values())])
-
-        elif isinstance(param, Parameter):
-            key = param.pparam[0]
-            value = param.pparam[1]
-            if type(value) == dict:
-                params_to_check.append(value)
-            elif type(value) in (list, tuple, np.ndarray) and \
-                    all([type(v) not in (list, tuple, np.ndarray) for v in
-                         value]):
-                # Spearmint special case, keep only the first element
-                # Adding: variable_id = val
-                if len(value) == 1:
-                    new_dict[key] = value[0]
-                else:
-                    for v_idx, v in enumerate(value):
-                        new_dict[key + "_%s" % v_idx] = v
-                        # new_dict[key] = value[0]
-            elif type(value) in (list, tuple, np.ndarray):
-                for v in value:
-                    params_to_check.append(v)
-            else:
-                new_dict[key] = value
+    _flatten(params, new_dict, params)
+    return new_dict
 
-        else:
-            raise Exception(
-                "Invalid params, cannot be flattened: \n%s." % params)
-    params = new_dict
-    return params
\ No newline at end of file
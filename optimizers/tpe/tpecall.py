@@ -77,6 +77,30 @@ def command_line_function(params, cli_target):
     return result
 
 
+def load_search_space(space_file):
+    """Return the hyperopt search space stored in space_file.
+
+    space_file is either a python module with a variable space (e.g.
+    space.py), a pickled search space (.pkl, see pyll_parser.build) or a
+    search space in the pcs format, which is converted in memory.
+    """
+    name, ext = os.path.splitext(os.path.basename(space_file))
+    if ext == ".pkl":
+        with open(space_file) as fh:
+            return cPickle.load(fh)
+    elif ext == ".pcs":
+        from HPOlib.format_converter import pcs_parser, pyll_parser
+        with open(space_file) as fh:
+            return pyll_parser.build(pcs_parser.read(fh))
+
+    # A python module, load the dict space
+    sys.path.append("./")
+    sys.path.append("")
+
+    module = import_module(name)
+    return module.space
+
+
 def main():
     prog = "python statistics.py WhatIsThis <manyPickles> WhatIsThis <manyPickles> [WhatIsThis <manyPickles>]"
     description = "Return some statistical information"
@@ -84,7 +108,8 @@ def main():
     parser = ArgumentParser(description=description, prog=prog)
 
     parser.add_argument("-p", "--space",
-                        dest="spaceFile", help="Where is the space.py located?")
+                        dest="spaceFile", help="Where is the space.py (or a pickled "
+                             "space or a pcs file) located?")
     parser.add_argument("-m", "--maxEvals",
                         dest="maxEvals", help="How many evaluations?")
     parser.add_argument("-s", "--seed", default="1",
@@ -112,15 +137,7 @@ def main():
         logger.critical("Search space not found: %s" % args.spaceFile)
         sys.exit(1)
 
-    # First remove ".py"
-    space, ext = os.path.splitext(os.path.basename(args.spaceFile))
-
-    # Then load dict searchSpace and out function cv.py
-    sys.path.append("./")
-    sys.path.append("")
-
-    module = import_module(space)
-    search_space = module.space
+    search_space = load_search_space(args.spaceFile)
 
     cli_target = "HPOlib.optimization_interceptor"
     fn = partial(command_line_function, cli_target=cli_target)
@@ -31,7 +31,8 @@ data_files = []
 scripts = ['scripts/HPOlib-run', 'scripts/HPOlib-plot',
            'runsolver/src/runsolver', 'scripts/HPOlib-convert',
            'scripts/remove_minus.py', 'scripts/HPOlib-testbest',
-           'scripts/HPOlib-getBest', 'scripts/HPOlib-pyFanova']
+           'scripts/HPOlib-getBest', 'scripts/HPOlib-pyFanova',
+           'scripts/HPOlib-bench', 'scripts/HPOlib-profile']
 
 
 def read(fname):
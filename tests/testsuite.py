@@ -2,14 +2,24 @@ import unittest
 
 import unittests.test_benchmark_util as test_benchmark_util
 import unittests.test_configuration_space as test_configuration_space
+import unittests.test_convert as test_convert
 import unittests.test_optimization_interceptor as test_optimization_interceptor
 import unittests.test_data_utils as test_data_utils
 import unittests.test_dispatcher as test_dispatcher
+import unittests.test_do_all_plots as test_do_all_plots
 import unittests.test_experiment as test_experiment
+import unittests.test_get_top_k as test_get_top_k
+import unittests.test_export as test_export
+import unittests.test_overhead_benchmark as test_overhead_benchmark
 import unittests.test_pb_converter as test_pb_converter
 import unittests.test_pcs_converter as test_pcs_converter
+import unittests.test_plot_data_profile as test_plot_data_profile
 import unittests.test_plot_util as test_plot_util
+import unittests.test_profiling as test_profiling
 import unittests.test_pyll_util as test_pyll_util
+import unittests.test_result_cache as test_result_cache
+import unittests.test_results as test_results
+import unittests.test_statistics as test_statistics
 import unittests.test_runsolver_wrapper as test_runsolver_wrapper
 import unittests.test_wrapping as test_wrapping
 import unittests.test_wrapping_util as test_wrapping_util
@@ -21,14 +31,24 @@ def suite():
     _suite = unittest.TestSuite()
     _suite.addTest(unittest.makeSuite(test_benchmark_util.BenchmarkUtilTest))
     _suite.addTest(unittest.makeSuite(test_configuration_space.TestConfigurationSpace))
+    _suite.addTest(unittest.makeSuite(test_convert.ConvertTest))
     _suite.addTest(unittest.makeSuite(test_optimization_interceptor.OptimizationInterceptorTest))
     _suite.addTest(unittest.makeSuite(test_data_utils.DataUtilTest))
     _suite.addTest(unittest.makeSuite(test_dispatcher.DispatcherTest))
+    _suite.addTest(unittest.makeSuite(test_do_all_plots.DoAllPlotsTest))
     _suite.addTest(unittest.makeSuite(test_experiment.ExperimentTest))
+    _suite.addTest(unittest.makeSuite(test_export.ExportTest))
+    _suite.addTest(unittest.makeSuite(test_get_top_k.GetTopKTest))
+    _suite.addTest(unittest.makeSuite(test_overhead_benchmark.OverheadBenchmarkTest))
     _suite.addTest(unittest.makeSuite(test_pb_converter.TestPbConverter))
     _suite.addTest(unittest.makeSuite(test_pcs_converter.TestPCSConverter))
+    _suite.addTest(unittest.makeSuite(test_plot_data_profile.PlotDataProfileTest))
     _suite.addTest(unittest.makeSuite(test_plot_util.PlotUtilTest))
+    _suite.addTest(unittest.makeSuite(test_profiling.ProfilingTest))
     _suite.addTest(unittest.makeSuite(test_pyll_util.TestPyllReader))
+    _suite.addTest(unittest.makeSuite(test_result_cache.ResultCacheTest))
+    _suite.addTest(unittest.makeSuite(test_results.ResultsTest))
+    _suite.addTest(unittest.makeSuite(test_statistics.StatisticsTest))
     _suite.addTest(unittest.makeSuite(test_pyll_util.TestPyllWriter))
     _suite.addTest(unittest.makeSuite(test_runsolver_wrapper.RunsolverWrapperTest))
     _suite.addTest(unittest.makeSuite(test_wrapping.WrappingTest))
@@ -0,0 +1,58 @@
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+import HPOlib.Experiment as Experiment
+
+
+def create_run(run_dir, optimizer, results, params=None, folds=1,
+               duration=1.0, cv_times=False):
+    """Create an experiment pickle in the new directory run_dir.
+
+    Every entry of results is one complete trial, a list with one result
+    per fold if folds > 1. params are the parameters of the trials (default:
+    x is the result), trials without a result are added but never run. With
+    cv_times every trial gets the times doAllPlots needs to compute the
+    optimizer overhead.
+
+    Returns the path of the experiment pickle.
+    """
+    if params is None:
+        params = [{"x": str(result)} for result in results]
+    os.makedirs(run_dir)
+    experiment = Experiment.Experiment(run_dir, optimizer, folds=folds)
+    if cv_times:
+        experiment.starttime.append(0)
+    for i, trial_params in enumerate(params):
+        trial = experiment.add_job(trial_params)
+        if i >= len(results):
+            continue
+        if cv_times:
+            experiment.start_cv(10 * i + 1)
+        fold_results = results[i] if folds > 1 else [results[i]]
+        for fold, result in enumerate(fold_results):
+            experiment.set_one_fold_running(trial, fold)
+            experiment.set_one_fold_complete(trial, fold, result, duration)
+        if cv_times:
+            experiment.end_cv(10 * i + 3)
+    if cv_times:
+        experiment.endtime.append(10 * len(results))
+    experiment._save_jobs()
+    experiment.close()
+    return os.path.join(run_dir, optimizer + ".pkl")
@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 import HPOlib.format_converter.configuration_space as configuration_space
 
 
@@ -9,4 +11,250 @@ class TestConfigurationSpace(unittest.TestCase):
         param = configuration_space.UniformFloatHyperparameter(
             "@1:max-feature-time", 1.0, 600.0, q=1.0, base=10.0)
         param = param.to_integer()
-        print param
\ No newline at end of file
+        print param
+
+    def _get_space(self):
+        classifier = configuration_space.CategoricalHyperparameter(
+            "classifier", ["svm", "nn"])
+        kernel = configuration_space.CategoricalHyperparameter(
+            "kernel", ["rbf", "linear"], conditions=[["classifier == svm"]])
+        C = configuration_space.UniformFloatHyperparameter(
+            "C", 0.03125, 32768, base=2, conditions=[["classifier == svm"]])
+        gamma = configuration_space.UniformFloatHyperparameter(
+            "gamma", 0.000030518, 8, base=2,
+            conditions=[["kernel == rbf", "classifier == svm"]])
+        neurons = configuration_space.UniformIntegerHyperparameter(
+            "neurons", 16, 1024, q=16, conditions=[["classifier == nn"]])
+        lr = configuration_space.NormalFloatHyperparameter(
+            "lr", -2, 1, base=10, conditions=[["classifier == nn"]])
+        dropout = configuration_space.UniformFloatHyperparameter(
+            "dropout", 0, 0.5, q=0.1, conditions=[["neurons in {16,32}"]])
+        return configuration_space.ConfigurationSpace(
+            [classifier, kernel, C, gamma, neurons, lr, dropout])
+
+    def test_sample(self):
+        space = self._get_space()
+        names = space.names
+        # Parents come before their children
+        self.assertLess(names.index("classifier"), names.index("kernel"))
+        self.assertLess(names.index("kernel"), names.index("gamma"))
+        self.assertLess(names.index("neurons"), names.index("dropout"))
+
+        matrix = space.sample(5000, np.random.RandomState(1))
+        self.assertEqual((5000, 7), matrix.shape)
+        finite = matrix[np.isfinite(matrix)]
+        self.assertTrue(np.all((finite >= 0) & (finite <= 1)))
+
+        configurations = space.decode(matrix)
+        for configuration in configurations:
+            svm = configuration["classifier"] == "svm"
+            self.assertEqual(svm, "kernel" in configuration)
+            self.assertEqual(svm, "C" in configuration)
+            self.assertEqual(svm and configuration["kernel"] == "rbf",
+                             "gamma" in configuration)
+            self.assertEqual(not svm, "neurons" in configuration)
+            self.assertEqual(not svm, "lr" in configuration)
+            self.assertEqual(not svm and configuration["neurons"] in (16, 32),
+                             "dropout" in configuration)
+            if svm:
+                self.assertTrue(0.03125 <= configuration["C"] <= 32768)
+            else:
+                self.assertEqual(0, configuration["neurons"] % 16)
+                self.assertTrue(16 <= configuration["neurons"] <= 1024)
+            if "dropout" in configuration:
+                self.assertIn(configuration["dropout"],
+                              [0, 0.1, 0.2, 0.30000000000000004, 0.4, 0.5])
+
+        # log-uniform and log-normal
+        C = [np.log2(c["C"]) for c in configurations if "C" in c]
+        self.assertAlmostEqual(5, np.mean(C), delta=0.5)
+        lr = [np.log10(c["lr"]) for c in configurations if "lr" in c]
+        self.assertAlmostEqual(-2, np.mean(lr), delta=0.1)
+        self.assertAlmostEqual(1, np.std(lr), delta=0.1)
+
+    def test_encode_decode(self):
+        space = self._get_space()
+        matrix = space.sample(100, np.random.RandomState(1))
+        np.testing.assert_allclose(matrix, space.encode(space.decode(matrix)))
+
+        configurations = [{"classifier": "nn", "neurons": 16, "lr": 0.01,
+                           "dropout": 0.2},
+                          {"classifier": "svm", "kernel": "linear", "C": 1,
+                           "gamma": 2}]
+        matrix = space.encode(configurations)
+        self.assertAlmostEqual(0.5, matrix[0, space.index["lr"]])
+        self.assertAlmostEqual(0.75, matrix[0, space.index["classifier"]])
+        self.assertAlmostEqual(0.25, matrix[1, space.index["C"]])
+        self.assertTrue(np.isnan(matrix[0, space.index["C"]]))
+
+        # gamma is not active for a linear kernel
+        active = space.get_active(matrix)
+        self.assertFalse(active[1, space.index["gamma"]])
+        self.assertTrue(active[0, space.index["dropout"]])
+        decoded = space.decode(space.impute_inactive(matrix))
+        self.assertAlmostEqual(0.01, decoded[0].pop("lr"))
+        self.assertEqual({"classifier": "nn", "neurons": 16, "dropout": 0.2},
+                         decoded[0])
+        self.assertEqual({"classifier": "svm", "kernel": "linear", "C": 1},
+                         decoded[1])
+
+    def test_condition(self):
+        condition = configuration_space.Condition.parse("a in {1,2}")
+        self.assertEqual("a", condition.name)
+        self.assertEqual("in", condition.operator)
+        self.assertEqual(["1", "2"], condition.values)
+        self.assertEqual("a in {1,2}", str(condition))
+        self.assertIs(condition,
+                      configuration_space.Condition.parse("a in {1,2}"))
+        self.assertEqual(["b"],
+                         configuration_space.Condition.parse("a == b").values)
+        self.assertRaises(ValueError, configuration_space.Condition.parse,
+                          "a==b")
+        self.assertRaises(NotImplementedError,
+                          configuration_space.Condition.parse, "a > 1")
+
+    def test_append_condition(self):
+        param = configuration_space.CategoricalHyperparameter("b", ["x", "y"])
+        param.append_condition(["a == 1"])
+        param.append_condition(["a == 2"])
+        param.append_condition(["a in {2,3}"])
+        param.append_condition(["c == 1", "d == 1"])
+        self.assertEqual([["a in {1,2,3}"], ["c == 1", "d == 1"]],
+                         param.conditions)
+
+    def test_sort_topologically(self):
+        # A deep chain whose names are in the reverse order
+        params = [configuration_space.CategoricalHyperparameter(
+            "p%04d" % i, ["0", "1"],
+            conditions=[["p%04d == 1" % (i + 1)]] if i < 1999 else None)
+            for i in range(2000)]
+        order = configuration_space.sort_topologically(params)
+        self.assertEqual(["p%04d" % i for i in range(1999, -1, -1)],
+                         [param.name for param in order])
+        dag = configuration_space.create_dag_from_hyperparameters(params)
+        self.assertEqual(("p0001", "==", "1"),
+                         dag.get_children("p0001")["p0000"])
+
+        params[1999].conditions = [["p0000 == 1"]]
+        self.assertRaisesRegexp(ValueError, "cycle",
+                                configuration_space.sort_topologically,
+                                params)
+        params[1999].conditions = [["q == 1"]]
+        self.assertRaisesRegexp(ValueError, "q which is not defined",
+                                configuration_space.sort_topologically,
+                                params)
+
+    def test_validate(self):
+        space = self._get_space()
+        matrix = space.sample(10, np.random.RandomState(1))
+        self.assertTrue(np.all(space.validate(matrix)))
+
+        svm = matrix[:, space.index["classifier"]] == 0.25
+        # An inactive value which is set
+        invalid = matrix.copy()
+        invalid[svm, space.index["neurons"]] = 0.5
+        self.assertEqual((~svm).tolist(), space.validate(invalid).tolist())
+        # An active value which is missing
+        invalid = matrix.copy()
+        invalid[svm, space.index["C"]] = np.NaN
+        self.assertEqual((~svm).tolist(), space.validate(invalid).tolist())
+        # An active value outside of the unit hypercube
+        invalid = matrix.copy()
+        invalid[svm, space.index["C"]] = 1.5
+        self.assertEqual((~svm).tolist(), space.validate(invalid).tolist())
+
+    def test_forbidden_clauses(self):
+        clause = configuration_space.ForbiddenClause([("classifier", "svm"),
+                                                      ("kernel", "rbf")])
+        self.assertEqual("{classifier=svm, kernel=rbf}", str(clause))
+        self.assertTrue(clause.is_forbidden({"classifier": "svm",
+                                             "kernel": "rbf", "C": 1}))
+        self.assertFalse(clause.is_forbidden({"classifier": "svm",
+                                              "kernel": "linear"}))
+        self.assertFalse(clause.is_forbidden({"classifier": "nn"}))
+        self.assertRaises(ValueError, configuration_space.ForbiddenClause, [])
+
+        hyperparameters = configuration_space.SearchSpace(
+            [(name, hyperparameter) for name, hyperparameter in
+             zip(self._get_space().names,
+                 self._get_space().hyperparameters)])
+        hyperparameters.forbidden_clauses.append(clause)
+        space = configuration_space.ConfigurationSpace(hyperparameters)
+        self.assertEqual([clause], space.forbidden_clauses)
+
+        unrestricted = self._get_space()
+        matrix = unrestricted.sample(1000, np.random.RandomState(1))
+        configurations = unrestricted.decode(matrix)
+        expected = [clause.is_forbidden(configuration)
+                    for configuration in configurations]
+        self.assertTrue(any(expected))
+        self.assertEqual(expected, space.get_forbidden(matrix).tolist())
+        self.assertEqual([not forbidden for forbidden in expected],
+                         space.validate(matrix).tolist())
+
+        matrix = space.sample(1000, np.random.RandomState(1))
+        self.assertFalse(np.any(space.get_forbidden(matrix)))
+        self.assertTrue(np.all(space.validate(matrix)))
+
+        # Forbidding every classifier makes sampling impossible
+        everything = configuration_space.ConfigurationSpace(
+            hyperparameters, forbidden_clauses=[
+                configuration_space.ForbiddenClause([("classifier", "svm")]),
+                configuration_space.ForbiddenClause([("classifier", "nn")])])
+        self.assertRaises(ValueError, everything.sample, 10)
+        self.assertRaises(ValueError, configuration_space.ConfigurationSpace,
+                          hyperparameters, [configuration_space
+                          .ForbiddenClause([("unknown", "1")])])
+
+    def test_canonicalize(self):
+        space = self._get_space()
+        self.assertEqual({"classifier": 0, "kernel": 1, "C": 2.5},
+                         space.canonicalize({"classifier": "svm",
+                                             "kernel": "'linear'",
+                                             "C": "2.5", "neurons": "32",
+                                             "dropout": "0.1"}))
+        self.assertEqual({"classifier": 1, "neurons": 32, "lr": 0.01,
+                          "dropout": 0.1, "unknown": "x"},
+                         space.canonicalize({"classifier": "nn",
+                                             "neurons": "29.0", "lr": 0.01,
+                                             "dropout": "0.12",
+                                             "unknown": "x"}))
+
+    def test_create_dag_from_hyperparameters(self):
+        def get_params():
+            return [configuration_space.CategoricalHyperparameter(
+                        "classifier", ["svm", "nn"]),
+                    configuration_space.CategoricalHyperparameter(
+                        "kernel", ["rbf", "linear"],
+                        conditions=[["classifier == svm"]]),
+                    configuration_space.UniformFloatHyperparameter(
+                        "gamma", 0.1, 1,
+                        conditions=[["kernel == rbf", "classifier == svm"]]),
+                    configuration_space.UniformFloatHyperparameter(
+                        "C", 0.1, 1, conditions=[["classifier == svm"]]),
+                    configuration_space.UniformFloatHyperparameter(
+                        "lr", 0.1, 1, conditions=[["classifier == nn"]])]
+
+        params = get_params()
+        dag = configuration_space.create_dag_from_hyperparameters(params)
+        self.assertEqual(["classifier", "C", "kernel", "gamma", "lr"],
+                         dag.nodes)
+        self.assertEqual(["C", "kernel", "lr"],
+                         dag.get_children("classifier").keys())
+        # gamma only depends on its direct parent
+        self.assertEqual({"gamma": ("kernel", "==", "rbf")},
+                         dag.get_children("kernel"))
+        self.assertEqual(["C", "gamma", "kernel", "lr", "classifier"],
+                         configuration_space.get_dag(dag))
+
+        # The structure is cached, but the new hyperparameters are used
+        other_params = get_params()
+        other_dag = configuration_space.create_dag_from_hyperparameters(
+            other_params)
+        self.assertIs(dag.children, other_dag.children)
+        self.assertIs(other_params[2], other_dag.get_hyperparameter("gamma"))
+        other_params[2].conditions = [["classifier == nn"]]
+        other_dag = configuration_space.create_dag_from_hyperparameters(
+            other_params)
+        self.assertEqual(["C", "gamma", "kernel", "lr"],
+                         other_dag.get_children("classifier").keys())
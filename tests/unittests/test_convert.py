@@ -0,0 +1,98 @@
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import HPOlib.format_converter.convert as convert
+import HPOlib.format_converter.pcs_parser as pcs_parser
+
+
+PCS = "classifier {svm, nn} [svm]\nC [0.03125, 32768] [32]l\n" \
+      "C | classifier in {svm}\n"
+
+
+class ConvertTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        convert.searchspace_cache.clear()
+        self.input_files = list()
+        for benchmark, content in [("a", PCS), ("b", PCS),
+                                   ("c", "x [0, 1] [0.5]\n")]:
+            directory = os.path.join(self.tmp_dir, "benchmarks", benchmark,
+                                     "smac")
+            os.makedirs(directory)
+            self.input_files.append(os.path.join(directory, "params.pcs"))
+            with open(self.input_files[-1], "w") as fh:
+                fh.write(content)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_normalize_format(self):
+        self.assertEqual("TPE", convert.normalize_format("hyperopt"))
+        self.assertEqual("SMAC", convert.normalize_format("Smac"))
+        self.assertRaises(ValueError, convert.normalize_format, "irace")
+
+    def test_get_output_files(self):
+        output_files = convert.get_output_files(self.input_files,
+                                                ["TPE", "SMAC"], "out")
+        self.assertEqual([("TPE", "out/a/smac/space.py"),
+                          ("SMAC", "out/a/smac/params.pcs")],
+                         output_files[0])
+        self.assertEqual(("TPE", "out/c/smac/space.py"), output_files[2][0])
+        self.assertEqual([[("SPEARMINT", "out/config.pb")]],
+                         convert.get_output_files(self.input_files[:1],
+                                                  ["SPEARMINT"], "out"))
+        self.assertRaises(ValueError, convert.get_output_files,
+                          self.input_files[:1] * 2, ["TPE"], "out")
+
+    def test_convert_files(self):
+        output_directory = os.path.join(self.tmp_dir, "out")
+        written, errors = convert.convert_files(
+            self.input_files, "smac", ["TPE", "smac"], output_directory)
+        self.assertEqual({}, errors)
+        self.assertEqual(6, len(written))
+        # a and b have the same content, it is parsed only once
+        self.assertEqual(2, len(convert.searchspace_cache))
+
+        with open(self.input_files[0]) as fh:
+            expected = convert.convert(fh.read(), "SMAC", "TPE")
+        for benchmark in ["a", "b"]:
+            with open(os.path.join(output_directory, benchmark, "smac",
+                                   "space.py")) as fh:
+                self.assertEqual(expected, fh.read())
+            with open(os.path.join(output_directory, benchmark, "smac",
+                                   "params.pcs")) as fh:
+                self.assertEqual(pcs_parser.read(PCS.splitlines()),
+                                 pcs_parser.read(fh))
+
+    def test_convert_files_parallel(self):
+        with open(self.input_files[2], "w") as fh:
+            fh.write("x [0, 1]\n")
+        output_directory = os.path.join(self.tmp_dir, "out")
+        written, errors = convert.convert_files(
+            self.input_files, "SMAC", ["TPE"], output_directory, n_jobs=2)
+        self.assertEqual(2, len(written))
+        self.assertEqual([self.input_files[2]], errors.keys())
+        self.assertIn("NotImplementedError", errors[self.input_files[2]])
+        self.assertTrue(os.path.exists(os.path.join(output_directory, "b",
+                                                    "smac", "space.py")))
@@ -21,7 +21,9 @@ import ConfigParser
 from contextlib import contextmanager
 import numpy as np
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 
 import HPOlib.data_util as data_util
@@ -92,6 +94,84 @@ class DataUtilTest(unittest.TestCase):
         self.assertRaises(IOError, data_util.load_file,
                           "", "uditare", 1)
 
+    def test_load_shared_file(self):
+        cache_dir = tempfile.mkdtemp()
+        train_data = np.arange(200).reshape((100, 2))
+        np.save("train_data.npy", train_data)
+
+        data = data_util.load_file("train_data.npy", "numpy", 100,
+                                   cache_dir=cache_dir)
+        self.assertIsInstance(data, np.memmap)
+        self.assertTrue((train_data == data).all())
+        self.assertFalse(data.flags.writeable)
+        cache_file = data_util.get_shared_cache_filename("train_data.npy",
+                                                         100, cache_dir)
+        self.assertTrue(os.path.exists(cache_file))
+        self.assertFalse(os.path.exists(cache_file + ".lock"))
+
+        # A second load attaches to the same file
+        data = data_util.load_file("train_data.npy", "numpy", 100,
+                                   cache_dir=cache_dir)
+        self.assertEqual(os.path.realpath(cache_file),
+                         os.path.realpath(data.filename))
+
+        # use_percentage is part of the key
+        data = data_util.load_file("train_data.npy", "numpy", 10,
+                                   cache_dir=cache_dir)
+        self.assertTrue((train_data[:10] == data).all())
+        self.assertEqual(2, len(os.listdir(cache_dir)))
+        os.remove("train_data.npy")
+
+        # Lists of python objects cannot be shared and are returned as they are
+        train_data = [{"a": 1}, {"b": 2}, {"c": 3}, {"d": 4}]
+        fh = open("train_data.pkl", "w")
+        cPickle.dump(train_data, fh)
+        fh.close()
+        data = data_util.load_file("train_data.pkl", "pickle", 50,
+                                   cache_dir=cache_dir)
+        self.assertEqual([{"a": 1}, {"b": 2}], data)
+        os.remove("train_data.pkl")
+        shutil.rmtree(cache_dir)
+
+    def test_prune_shared_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        np.save("train_data.npy", np.arange(200).reshape((100, 2)))
+        data_util.load_file("train_data.npy", "numpy", 100,
+                            cache_dir=cache_dir)
+        data_util.load_file("train_data.npy", "numpy", 50,
+                            cache_dir=cache_dir)
+        self.assertEqual(2, len(os.listdir(cache_dir)))
+
+        # A new version of the data file replaces all old entries
+        mtime = os.path.getmtime("train_data.npy")
+        os.utime("train_data.npy", (mtime + 10, mtime + 10))
+        data_util.load_file("train_data.npy", "numpy", 100,
+                            cache_dir=cache_dir)
+        cache_file = data_util.get_shared_cache_filename("train_data.npy",
+                                                         100, cache_dir)
+        self.assertEqual([os.path.basename(cache_file)],
+                         os.listdir(cache_dir))
+
+        # Entries which were not used for a long time
+        data_util.load_file("train_data.npy", "numpy", 50,
+                            cache_dir=cache_dir)
+        os.utime(cache_file, (mtime - 100, mtime - 100))
+        self.assertEqual([cache_file], data_util.prune_shared_cache(
+            cache_dir, max_age=50))
+        self.assertEqual(1, len(os.listdir(cache_dir)))
+
+        # Size limit and removing everything
+        data_util.load_file("train_data.npy", "numpy", 100,
+                            cache_dir=cache_dir, max_cache_size=0)
+        self.assertEqual([os.path.basename(cache_file)],
+                         os.listdir(cache_dir))
+        open(os.path.join(cache_dir, "unrelated.npy"), "w").close()
+        data_util.prune_shared_cache(cache_dir, max_size=0)
+        self.assertEqual(["unrelated.npy"], os.listdir(cache_dir))
+
+        os.remove("train_data.npy")
+        shutil.rmtree(cache_dir)
+
     @unittest.skip("Not implemented yet")
     def test_custom_split(self):
         self.fail()
@@ -0,0 +1,77 @@
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import HPOlib.Plotting.doAllPlots as doAllPlots
+from tests.unittests.experiments.util import create_run
+
+
+class DoAllPlotsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _create_run(self, optimizer, seed, values):
+        return create_run(os.path.join(self.tmp_dir, "%s_%d" %
+                                       (optimizer, seed)),
+                          optimizer, values, duration=2.0, cv_times=True)
+
+    def test_get_tasks(self):
+        tasks = doAllPlots.get_tasks([["a.pkl"]], [["a", 1]], self.tmp_dir, 1)
+        self.assertEqual(["plotTrace.py", "plotOptimizerOverhead.py",
+                          "statistics.py", "MeanTrace_perEval.py",
+                          "MeanTrace_perTime.py"],
+                         [name for name, save, kwargs in tasks])
+        self.assertEqual(os.path.join(self.tmp_dir, "statistics_1.txt"),
+                         tasks[2][1])
+
+        tasks = doAllPlots.get_tasks([["a.pkl"], ["b.pkl"]],
+                                     [["a", 1], ["b", 1]], "", 1)
+        self.assertEqual(["plotBoxWhisker.py", "generateTexTable.py"],
+                         [name for name, save, kwargs in tasks[:2]])
+        self.assertEqual([""] * len(tasks),
+                         [save for name, save, kwargs in tasks])
+
+    def test_render(self):
+        pkl_list = [[self._create_run("good", 1, [5, 1, 0]),
+                     self._create_run("good", 2, [4, 2, 2])],
+                    [self._create_run("bad", 1, [6, 5, 4]),
+                     self._create_run("bad", 2, [7, 7, 1])]]
+        name_list = [["good", 2], ["bad", 2]]
+        save_dir = os.path.join(self.tmp_dir, "plots")
+        os.mkdir(save_dir)
+
+        tasks = doAllPlots.get_tasks(pkl_list, name_list, save_dir, 1,
+                                     maxvalue=10)
+        for n_jobs in (1, 2):
+            results = list(doAllPlots.render(tasks, pkl_list, name_list,
+                                             n_jobs=n_jobs))
+            self.assertEqual([(name, save) for name, save, kwargs in tasks],
+                             [(name, save) for name, save, success, duration
+                              in results])
+            for name, save, success, duration in results:
+                self.assertTrue(success, name)
+                self.assertTrue(os.path.exists(save), save)
+                os.remove(save)
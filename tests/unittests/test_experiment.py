@@ -49,6 +49,10 @@ class ExperimentTest(unittest.TestCase):
             os.remove("test_exp.pkl.lock")
         except OSError:
             pass
+        try:
+            os.remove("test_exp" + Experiment.SUMMARY_SUFFIX)
+        except OSError:
+            pass
 
     def test_init(self):
         # TODO: Somehow test in which folder the experiment is created
@@ -174,6 +178,8 @@ class ExperimentTest(unittest.TestCase):
         self.assertEqual(len(exp.trials), 1)
         self.assertEqual(len(exp.instance_order), 0)
         self.assertDictEqual(trial['params'], {"x": 1, "y": 2})
+        self.assertEqual(Experiment.get_params_hash({"x": 1.0, "y": 2}),
+                         trial['params_hash'])
         _sanity_check(exp)
 
     # There is no seperate method which checks that set_one_fold_running
@@ -228,6 +234,63 @@ class ExperimentTest(unittest.TestCase):
         self.assertRaises(AssertionError, experiment.set_one_fold_crashed,
                           0, 0, 1000, 0)
 
+    def test_summary(self):
+        experiment = Experiment.Experiment(".", "test_exp", folds=2)
+        id0 = experiment.add_job({"x": 0})
+        experiment.set_one_fold_running(id0, 0)
+        experiment.set_one_fold_complete(id0, 0, 0.5, 2.0,
+                                         additional_data="A" * 1000)
+        experiment.set_one_fold_running(id0, 1)
+        experiment.set_one_fold_crashed(id0, 1, 1000, 3.0)
+        id1 = experiment.add_job({"x": 1})
+        experiment._save_jobs()
+        self.assertTrue(os.path.exists("test_exp" +
+                                       Experiment.SUMMARY_SUFFIX))
+
+        summary = Experiment.load_summary("test_exp.pkl")
+        expected = Experiment.summarize_jobs(experiment.__dict__)
+        self.assertEqual(sorted(expected.keys()), sorted(summary.keys()))
+        self.assertEqual("test_exp", summary["experiment_name"])
+        self.assertEqual(2, summary["folds"])
+        self.assertEqual([[id0, 0], [id0, 1]],
+                         summary["instance_order"].tolist())
+        self.assertEqual([Experiment.COMPLETE_STATE,
+                          Experiment.CANDIDATE_STATE],
+                         summary["status"].tolist())
+        self.assertEqual([[Experiment.COMPLETE_STATE,
+                           Experiment.BROKEN_STATE], [0, 0]],
+                         summary["instance_status"].tolist())
+        self.assertEqual([0.5, 1000], summary["instance_results"][0].tolist())
+        self.assertTrue(np.isnan(summary["instance_results"][1]).all())
+        self.assertEqual([2.0, 3.0], summary["instance_durations"][0].tolist())
+        self.assertEqual(Experiment.get_params_hash({"x": 1}),
+                         summary["params_hash"][1])
+        self.assertNotEqual(summary["params_hash"][0],
+                            summary["params_hash"][1])
+
+        # A summary of an older version of the pickle is not used
+        summary_file = "test_exp" + Experiment.SUMMARY_SUFFIX
+        with open(summary_file, "rb") as fh:
+            old_summary = fh.read()
+        experiment.set_one_fold_running(id1, 0)
+        experiment.set_one_fold_complete(id1, 0, 0.1, 1.0)
+        experiment._save_jobs()
+        with open(summary_file, "wb") as fh:
+            fh.write(old_summary)
+        summary = Experiment.load_summary("test_exp.pkl")
+        self.assertEqual(0.1, summary["instance_results"][1][0])
+        os.remove(summary_file)
+        summary = Experiment.load_summary("test_exp.pkl")
+        self.assertEqual(0.1, summary["instance_results"][1][0])
+
+        # Saving a running fold does not write a summary
+        id2 = experiment.add_job({"x": 2})
+        experiment.set_one_fold_running(id2, 0)
+        experiment._save_jobs(save_summary=False)
+        self.assertFalse(os.path.exists(summary_file))
+        summary = Experiment.load_summary("test_exp.pkl")
+        self.assertEqual(Experiment.RUNNING_STATE, summary["status"][2])
+
     def test_additional_data(self):
         experiment = Experiment.Experiment(".", "test_exp", folds=1)
         id0 = experiment.add_job({"x": 0})
@@ -242,6 +305,34 @@ class ExperimentTest(unittest.TestCase):
         self.assertEqual("B", experiment.get_trial_from_id(id1)
             ['additional_data'][0])
         
+    def test_set_one_fold_timestamps(self):
+        experiment = Experiment.Experiment(".", "test_exp", folds=2)
+        id0 = experiment.add_job({"x": 0})
+        timestamps = experiment.get_trial_from_id(id0)['instance_timestamps']
+        self.assertEqual((2, len(Experiment.TIMESTAMP_NAMES)),
+                         timestamps.shape)
+        self.assertFalse(np.isfinite(timestamps).any())
+
+        experiment.set_one_fold_timestamps(id0, 1, {"interceptor_start": 1.,
+                                                    "dispatch_start": 3.,
+                                                    "saved": 7.})
+        timestamps = experiment.get_trial_from_id(id0)['instance_timestamps']
+        self.assertFalse(np.isfinite(timestamps[0]).any())
+        self.assertEqual([1., 3., 7.], list(timestamps[1][[0, 2, 6]]))
+        self.assertEqual(3, np.sum(np.isfinite(timestamps[1])))
+
+        self.assertRaises(ValueError, experiment.set_one_fold_timestamps,
+                          id0, 0, {"unknown_phase": 1.})
+
+        # Timestamps are added to trials of old pickles
+        del experiment.get_trial_from_id(id0)['instance_timestamps']
+        experiment._save_jobs()
+        del experiment
+        experiment = Experiment.Experiment(".", "test_exp")
+        timestamps = experiment.get_trial_from_id(id0)['instance_timestamps']
+        self.assertEqual((2, len(Experiment.TIMESTAMP_NAMES)),
+                         timestamps.shape)
+
     def test_one_fold_workflow(self):
         experiment = Experiment.Experiment(".", "test_exp", folds=5)
         trial_index = experiment.add_job({"x": 5})
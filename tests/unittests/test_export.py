@@ -0,0 +1,153 @@
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import csv
+import json
+import os
+import shutil
+import StringIO
+import tempfile
+import unittest
+
+import numpy as np
+
+import HPOlib.export as export
+from HPOlib.format_converter import pcs_parser
+from tests.unittests.experiments.util import create_run
+
+
+class ExportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.pkl_files = [self._create_run("tpe", 1, 3),
+                          self._create_run("tpe", 2, 2),
+                          self._create_run("smac", 1, 4)]
+        self.output = os.path.join(self.tmp_dir, "dataset")
+        self.searchspace = pcs_parser.read(StringIO.StringIO(
+            "x [-5, 10] [2.5]\nkernel {rbf, linear} [rbf]\n"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _create_run(self, optimizer, seed, num_trials):
+        # Old pickles store parameter names with a leading minus
+        params = [{"-x": str(i * 0.5), "-kernel": "rbf"} if i % 2 == 0 else
+                  {"-x": str(i * 0.5)} for i in range(num_trials)]
+        # The last trial is never evaluated
+        params.append({"-x": "1"})
+        return create_run(os.path.join(self.tmp_dir, "%s_%d_2014" %
+                                       (optimizer, seed)),
+                          optimizer, [[i, i + 1] for i in range(num_trials)],
+                          params=params, folds=2)
+
+    def test_export_csv(self):
+        filenames = export.export_dataset(self.pkl_files, self.output, "csv",
+                                          chunk_size=2)
+        self.assertEqual([os.path.join(self.output, "optimizer=tpe",
+                                       "part-00000.csv"),
+                          os.path.join(self.output, "optimizer=tpe",
+                                       "part-00001.csv"),
+                          os.path.join(self.output, "optimizer=smac",
+                                       "part-00002.csv")], filenames)
+        with open(filenames[2]) as fh:
+            rows = list(csv.reader(fh))
+        self.assertEqual(["run", "id", "status", "result", "std", "duration",
+                          "test_status", "test_result", "test_duration",
+                          "fold_0_result", "fold_1_result", "params"],
+                         rows[0])
+        self.assertEqual(6, len(rows))
+        self.assertEqual(["smac_1_2014", "1", "3", "1.5"], rows[2][:4])
+        self.assertEqual(["1.0", "2.0"], rows[2][-3:-1])
+        self.assertEqual({"x": "0.5"}, json.loads(rows[2][-1]))
+        self.assertEqual({"x": "1.0", "kernel": "rbf"},
+                         json.loads(rows[3][-1]))
+        # The last trial was never evaluated
+        self.assertEqual(["", ""], rows[5][9:11])
+
+    def test_export_ndjson(self):
+        filenames = export.export_dataset(self.pkl_files, self.output,
+                                          "ndjson",
+                                          searchspace=self.searchspace)
+        with open(filenames[0]) as fh:
+            rows = [json.loads(line) for line in fh]
+        self.assertEqual(4, len(rows))
+        self.assertEqual(1.0, rows[2]["param_x"])
+        self.assertEqual("rbf", rows[2]["param_kernel"])
+        self.assertEqual("", rows[1]["param_kernel"])
+        self.assertIsNone(rows[3]["result"])
+
+    def test_export_columnar(self):
+        filenames = export.export_dataset(self.pkl_files, self.output,
+                                          "columnar",
+                                          searchspace=self.searchspace,
+                                          chunk_size=3)
+        if export.pyarrow is not None:
+            self.assertTrue(filenames[2].endswith(".parquet"))
+            return
+        # Every chunk of at most three rows is written to its own file
+        smac = os.path.join(self.output, "optimizer=smac")
+        self.assertEqual([os.path.join(smac, "part-00002-00000.npz"),
+                          os.path.join(smac, "part-00002-00001.npz")],
+                         filenames[3:])
+        first, second = np.load(filenames[3]), np.load(filenames[4])
+        self.assertEqual([0, 1, 2], first["id"].tolist())
+        self.assertEqual([3, 4], second["id"].tolist())
+        self.assertEqual(np.int64, first["id"].dtype)
+        self.assertEqual([0, 0.5, 1, 1.5, 1], first["param_x"].tolist() +
+                         second["param_x"].tolist())
+        self.assertEqual(["rbf", "", "rbf", "", ""],
+                         first["param_kernel"].tolist() +
+                         second["param_kernel"].tolist())
+        self.assertTrue(np.isnan(second["fold_1_result"][1]))
+
+    def test_export_reads_pickles_once(self):
+        loaded = list()
+
+        def load(fh):
+            loaded.append(fh.name)
+            return load_(fh)
+
+        load_ = export.cPickle.load
+        export.cPickle.load = load
+        try:
+            export.export_dataset(self.pkl_files, self.output, "ndjson")
+        finally:
+            export.cPickle.load = load_
+        self.assertEqual(self.pkl_files, loaded)
+
+    def test_export_shared_columns(self):
+        # This run has other parameters and more folds, all partitions must
+        # nevertheless have the same columns
+        self.pkl_files.append(create_run(
+            os.path.join(self.tmp_dir, "spearmint_1_2014"), "spearmint", [],
+            params=[{"-x": "1", "-C": "10"}], folds=3))
+
+        filenames = export.export_dataset(self.pkl_files, self.output, "csv")
+        headers = list()
+        for filename in filenames:
+            with open(filename) as fh:
+                reader = csv.reader(fh)
+                headers.append(next(reader))
+                rows = list(reader)
+            self.assertEqual(len(headers[0]), len(rows[0]))
+        self.assertEqual(["fold_2_result", "params"], headers[0][-2:])
+        self.assertEqual([headers[0]] * 4, headers)
+        # The missing third fold of the other runs
+        with open(filenames[0]) as fh:
+            self.assertEqual("", list(csv.reader(fh))[1][-2])
@@ -0,0 +1,97 @@
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import csv
+import os
+import shutil
+import StringIO
+import tempfile
+import unittest
+
+import numpy as np
+
+import HPOlib.Experiment as Experiment
+import HPOlib.Plotting.getTopK as getTopK
+
+
+class GetTopKTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(1)
+        self.pkl_list = list()
+        self.trials = list()
+        for run in range(4):
+            experiment = Experiment.Experiment(self.tmp_dir, "run_%d" % run)
+            for i in range(30):
+                # Few different configurations and results
+                trial = experiment.add_job({"x": str(rng.randint(20))})
+                experiment.set_one_fold_running(trial, 0)
+                if i % 7 == 0:
+                    experiment.set_one_fold_crashed(trial, 0, 1000, 1)
+                else:
+                    experiment.set_one_fold_complete(
+                        trial, 0, np.round(rng.rand(), 2), 1)
+                self.trials.append((run, trial, experiment.trials[trial]))
+            experiment._save_jobs()
+            experiment.close()
+            self.pkl_list.append(os.path.join(self.tmp_dir,
+                                              "run_%d.pkl" % run))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _brute_force(self, k, key, invers=False):
+        finite = [(trial['result'], run, idx, key(trial)) for run, idx, trial
+                  in self.trials if np.isfinite(trial['result'])]
+        finite.sort(key=lambda t: (-t[0] if invers else t[0], t[1], t[2]))
+        top_k = list()
+        seen = set()
+        for result, run, idx, trial_key in finite:
+            if trial_key not in seen:
+                seen.add(trial_key)
+                top_k.append((result, run, idx))
+        return top_k[:k], len(seen)
+
+    def test_get_top_k(self):
+        for k in (1, 10, 200):
+            for invers in (False, True):
+                expected = self._brute_force(
+                    k, lambda trial: trial['result'], invers=invers)
+                self.assertEqual(expected, getTopK.get_top_k(
+                    self.pkl_list, k, invers=invers))
+                expected = self._brute_force(
+                    k, lambda trial: trial['params']['x'], invers=invers)
+                self.assertEqual(expected, getTopK.get_top_k(
+                    self.pkl_list, k, dedup="params", invers=invers))
+        self.assertRaises(ValueError, getTopK.get_top_k, self.pkl_list, 10,
+                          dedup="test_result")
+
+    def test_load_trials_and_write_csv(self):
+        top_k, num_different = getTopK.get_top_k(self.pkl_list, 3)
+        trials = getTopK.load_trials(self.pkl_list, top_k)
+        self.assertEqual([result for result, run, idx in top_k],
+                         [trial['result'] for trial in trials])
+
+        fh = StringIO.StringIO()
+        getTopK.write_csv(fh, trials, ["x"])
+        fh.seek(0)
+        rows = list(csv.reader(fh))
+        self.assertEqual(["Result", "Time", "x"], rows[0])
+        self.assertEqual(["%.5f" % trials[0]['result'], "1.00000",
+                          trials[0]['params']['x']], rows[1])
@@ -16,12 +16,18 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import argparse
 from collections import OrderedDict
+import ConfigParser
 import os
+import shutil
+import tempfile
+import time
 import unittest
 import sys
 
-from HPOlib import optimization_interceptor, Experiment
+from HPOlib import optimization_interceptor, Experiment, result_cache
+from HPOlib.wrapping_util import get_params_hash
 
 
 class OptimizationInterceptorTest(unittest.TestCase):
@@ -185,6 +191,222 @@ class OptimizationInterceptorTest(unittest.TestCase):
         self.assertEqual(5,
                          optimization_interceptor.get_trial_index(experiment, 0, params2))
 
+    def test_get_trial_index_canonical(self):
+        try:
+            os.remove("test_get_trial_index.pkl")
+        except OSError:
+            pass
+
+        experiment = Experiment.Experiment(".", "test_get_trial_index",
+                                           folds=2)
+        trial_index = optimization_interceptor.get_trial_index(
+            experiment, 0, {"x": "0.1", "y": "5"})
+        experiment.set_one_fold_running(trial_index, 0)
+        experiment.set_one_fold_complete(trial_index, 0, 1, 1)
+        # The same configuration in another representation
+        self.assertEqual(trial_index, optimization_interceptor.get_trial_index(
+            experiment, 1, {"-x": "'0.1'", "y": "5"}))
+        # Without a search space strings are compared as given, they may be
+        # categorical values
+        self.assertEqual(1, optimization_interceptor.get_trial_index(
+            experiment, 1, {"x": "0.1", "y": "5.0"}))
+        experiment.close()
+
+    def test_get_trial_index_legacy_hash(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            search_space = os.path.join(tmp_dir, "params.pcs")
+            with open(search_space, "w") as fh:
+                fh.write("a {1, 2} [1]\nc [0, 10] [5]i\n")
+            config = ConfigParser.SafeConfigParser()
+            config.add_section("HPOLIB")
+            config.set("HPOLIB", "search_space", search_space)
+            space = optimization_interceptor.load_search_space(config)[1]
+            params = {"a": "2", "c": "3"}
+            self.assertNotEqual(get_params_hash(params),
+                                get_params_hash(params, space))
+
+            # A trial of a pickle written before VERSION 3
+            experiment = Experiment.Experiment(tmp_dir, "legacy", folds=2)
+            trial_index = experiment.add_job(params)
+            experiment.set_one_fold_running(trial_index, 0)
+            experiment.set_one_fold_complete(trial_index, 0, 1, 1)
+            del experiment.get_trial_from_id(trial_index)['params_hash']
+            experiment._save_jobs()
+            experiment.close()
+
+            experiment = Experiment.Experiment(tmp_dir, "legacy")
+            self.assertEqual(trial_index,
+                             optimization_interceptor.get_trial_index(
+                                 experiment, 1, params, space))
+            self.assertEqual(1, len(experiment.trials))
+            experiment.close()
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_get_forbidden_clause(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            search_space = os.path.join(tmp_dir, "params.pcs")
+            with open(search_space, "w") as fh:
+                fh.write("a {x, y} [x]\nb {1, 2} [1]\nc [0, 10] [5]i\n"
+                         "{a=y, b=2}\n{c=1}\n")
+            config = ConfigParser.SafeConfigParser()
+            config.add_section("HPOLIB")
+            config.set("HPOLIB", "search_space", "")
+            self.assertIsNone(optimization_interceptor.get_forbidden_clause(
+                {"a": "y", "b": "2"}, config))
+
+            config.set("HPOLIB", "search_space", search_space)
+            self.assertIsNone(optimization_interceptor.get_forbidden_clause(
+                {"a": "x", "b": "2"}, config))
+            self.assertEqual("{a=y, b=2}", str(
+                optimization_interceptor.get_forbidden_clause(
+                    {"a": "y", "b": "2"}, config)))
+            # Numerical values are compared as numbers
+            self.assertEqual("{c=1}", str(
+                optimization_interceptor.get_forbidden_clause(
+                    {"a": "x", "b": "2", "c": "1.0"}, config)))
+            self.assertIsNone(optimization_interceptor.get_forbidden_clause(
+                {"a": "x", "b": "2", "c": "2"}, config))
+
+            config.set("HPOLIB", "search_space",
+                       os.path.join(tmp_dir, "missing.pcs"))
+            self.assertRaises(ValueError,
+                              optimization_interceptor.get_forbidden_clause,
+                              {"a": "y", "b": "2"}, config)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_parse_params_with_decoder(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            search_space = os.path.join(tmp_dir, "params.pcs")
+            with open(search_space, "w") as fh:
+                fh.write("LOG10_Q1_x [0, 3] [1]i\na {x, y} [x]\n")
+            config = ConfigParser.SafeConfigParser()
+            config.add_section("HPOLIB")
+            config.set("HPOLIB", "search_space", "")
+            self.assertIsNone(
+                optimization_interceptor.get_parameter_decoder(config))
+
+            config.set("HPOLIB", "search_space", search_space)
+            decoder = optimization_interceptor.get_parameter_decoder(config)
+            self.assertIn("LOG10_Q1_x", decoder.plans)
+            self.assertIs(decoder,
+                          optimization_interceptor.get_parameter_decoder(config))
+            params = optimization_interceptor.parse_params(
+                ["-LOG10_Q1_x", "'2'", "-a", "'y'"], decoder)
+            self.assertEqual({"x": 100.0, "a": "y"}, dict(params))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_run_one_instance_result_cache(self):
+        def get_result_cache(cfg):
+            # The Experiment must not be locked while the cache is used
+            locked.append(os.path.exists("tpe.pkl.lock"))
+            return get_result_cache_(cfg)
+
+        cwd = os.getcwd()
+        tmp_dir = tempfile.mkdtemp()
+        get_result_cache_ = result_cache.get_result_cache
+        locked = list()
+        try:
+            experiment_dir = os.path.join(tmp_dir, "branin", "tpe_1_2")
+            os.makedirs(experiment_dir)
+            os.chdir(experiment_dir)
+            config = ConfigParser.SafeConfigParser()
+            config.add_section("HPOLIB")
+            for option in result_cache.NAMESPACE_OPTIONS:
+                config.set("HPOLIB", option, "")
+            config.set("HPOLIB", "search_space", "")
+            config.set("HPOLIB", "result_cache", "cache.db")
+            config.set("HPOLIB", "result_cache_ttl", "0")
+            config.set("HPOLIB", "result_cache_size", "0")
+            config.set("HPOLIB", "profile_evaluations", "0.0")
+            config.set("HPOLIB", "result_on_terminate", "1000")
+
+            params = {"x": "0.1", "y": "5"}
+            cache = result_cache.get_result_cache(config)
+            cache.put(Experiment.get_params_hash(params), 0, 0.5, 2.0, "cached")
+            cache.close()
+            self.assertTrue(os.path.exists(os.path.join(tmp_dir, "branin",
+                                                        "cache.db")))
+
+            experiment = Experiment.Experiment(".", "tpe", folds=1)
+            result_cache.get_result_cache = get_result_cache
+            result, duration = optimization_interceptor.run_one_instance(
+                argparse.Namespace(instance=None), params, experiment,
+                cfg=config)
+            self.assertEqual(0.5, result)
+            self.assertEqual([False], locked)
+            # The duration of the cached evaluation is not charged again
+            self.assertLess(duration, 1.0)
+
+            experiment = Experiment.Experiment(".", "tpe")
+            self.assertEqual(1, experiment.result_cache_hits)
+            self.assertEqual(0, experiment.result_cache_misses)
+            self.assertEqual(0.5, experiment.trials[0]['result'])
+            self.assertLess(experiment.total_wallclock_time, 1.0)
+            self.assertEqual("Result cache hit, duration: 2.000000; cached",
+                             experiment.trials[0]['additional_data'][0])
+            experiment.close()
+        finally:
+            result_cache.get_result_cache = get_result_cache_
+            os.chdir(cwd)
+            shutil.rmtree(tmp_dir)
+
+    def test_do_cv_timestamps(self):
+        def dispatch(arguments, parameters, instance, timestamps=None,
+                     profile_base=None, cfg=None):
+            time.sleep(0.1)
+            return "SAT", 0.1, 1.0, ""
+
+        cwd = os.getcwd()
+        tmp_dir = tempfile.mkdtemp()
+        dispatcher_main = optimization_interceptor.dispatcher.main
+        try:
+            experiment_dir = os.path.join(tmp_dir, "branin", "tpe_1_2")
+            os.makedirs(experiment_dir)
+            os.chdir(experiment_dir)
+            optimization_interceptor.dispatcher.main = dispatch
+            config = ConfigParser.SafeConfigParser()
+            config.add_section("HPOLIB")
+            config.set("HPOLIB", "search_space", "")
+            config.set("HPOLIB", "result_cache", "")
+            config.set("HPOLIB", "profile_evaluations", "0.0")
+            config.set("HPOLIB", "result_on_terminate", "1000")
+            config.set("HPOLIB", "max_crash_per_cv", "3")
+
+            interceptor_start = time.time()
+            experiment = Experiment.Experiment(".", "tpe", folds=2)
+            lock_acquired = experiment.lock_acquired
+            time.sleep(0.05)
+            result, duration = optimization_interceptor.do_cv(
+                argparse.Namespace(instance=None), {"x": "1"}, experiment,
+                folds=2, interceptor_start=interceptor_start, cfg=config)
+            self.assertEqual(1.0, result)
+
+            experiment = Experiment.Experiment(".", "tpe")
+            timestamps = experiment.trials[0]['instance_timestamps']
+            experiment.close()
+            names = Experiment.TIMESTAMP_NAMES
+            fold_0_total = timestamps[0][names.index("saved")] - \
+                timestamps[0][names.index("interceptor_start")]
+            fold_1_startup = timestamps[1][names.index("lock_acquired")] - \
+                timestamps[1][names.index("interceptor_start")]
+            self.assertGreater(fold_0_total, 0.1)
+            # The first fold uses the experiment opened by the caller
+            self.assertEqual(lock_acquired,
+                             timestamps[0][names.index("lock_acquired")])
+            self.assertLessEqual(fold_1_startup, fold_0_total)
+            self.assertGreaterEqual(timestamps[1][names.index(
+                "interceptor_start")], timestamps[0][names.index("saved")])
+        finally:
+            optimization_interceptor.dispatcher.main = dispatcher_main
+            os.chdir(cwd)
+            shutil.rmtree(tmp_dir)
+
 
 if __name__ == "__main__":
     unittest.main()
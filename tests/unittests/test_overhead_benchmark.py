@@ -0,0 +1,94 @@
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import cPickle
+import json
+import os
+import shutil
+import unittest
+
+import HPOlib.optimization_interceptor as optimization_interceptor
+import HPOlib.overhead_benchmark as overhead_benchmark
+
+
+class OverheadBenchmarkTest(unittest.TestCase):
+    def setUp(self):
+        self.experiment_dir = None
+
+    def tearDown(self):
+        if self.experiment_dir is not None:
+            shutil.rmtree(os.path.dirname(self.experiment_dir))
+
+    def test_measure_phases(self):
+        self.experiment_dir = overhead_benchmark.create_experiment_directory(
+            target="branin")
+        samples = overhead_benchmark.measure_phases(self.experiment_dir, 2)
+        self.assertEqual(overhead_benchmark.PHASES, samples.keys())
+        for phase in samples:
+            self.assertEqual(2, len(samples[phase]))
+
+        with open(os.path.join(self.experiment_dir, "bench.pkl")) as fh:
+            experiment = cPickle.load(fh)
+        self.assertEqual(2, len(experiment["trials"]))
+        for trial in experiment["trials"]:
+            self.assertEqual(3, trial["status"])
+            self.assertGreater(trial["result"], 0.3)
+
+    def test_measure_bridges(self):
+        self.experiment_dir = overhead_benchmark.create_experiment_directory()
+        samples = overhead_benchmark.measure_bridges(
+            self.experiment_dir, 1, bridges=["module_fold", "file"])
+        self.assertEqual(["module_fold", "file"], samples.keys())
+        for bridge in samples:
+            self.assertEqual(1, len(samples[bridge]["wallclock"]))
+            self.assertLessEqual(samples[bridge]["overhead"][0],
+                                 samples[bridge]["wallclock"][0])
+
+        with open(os.path.join(self.experiment_dir, "bench.pkl")) as fh:
+            experiment = cPickle.load(fh)
+        self.assertEqual(2, len(experiment["trials"]))
+        self.assertEqual(0.0, experiment["trials"][0]["result"])
+
+        self.assertRaises(ValueError, overhead_benchmark.measure_bridges,
+                          self.experiment_dir, 1, ["irace"])
+
+    def test_parse_result(self):
+        self.assertEqual((0.5, 2.0), overhead_benchmark._parse_result(
+            "Loading\n" +
+            optimization_interceptor.format_result(0.5, 2.0)))
+        self.assertIsNone(overhead_benchmark._parse_result("Loading\n"))
+
+    def test_measure_imports(self):
+        self.experiment_dir = overhead_benchmark.create_experiment_directory()
+        samples = overhead_benchmark.measure_imports(self.experiment_dir, 2)
+        self.assertEqual(overhead_benchmark.IMPORTS, samples.keys())
+        for module in samples:
+            self.assertEqual(2, len(samples[module]))
+            self.assertGreaterEqual(min(samples[module]), 0)
+
+    def test_run_benchmark(self):
+        results = overhead_benchmark.run_benchmark(evaluations=1,
+                                                   bridges=["module"])
+        # Must be serializable
+        results = json.loads(json.dumps(results))
+        self.assertEqual(1, results["evaluations"])
+        self.assertEqual(["module"], results["bridges"].keys())
+        self.assertEqual(1, results["phases"]["dispatch"]["n"])
+        self.assertEqual(sorted(overhead_benchmark.IMPORTS),
+                         sorted(results["imports"].keys()))
+        self.assertNotIn("samples", results)
@@ -115,6 +115,48 @@ class TestPCSConverter(unittest.TestCase):
         cs = pcs_parser.read(complex_cs)
         self.assertEqual(cs, conditional_space)
 
+    def test_read_configuration_space_whitespace(self):
+        pcs = ["  a  [ 0 ,1.5e1 ]  [ 2 ]  il",
+               "b{x , y,z}[x]",
+               "c [0, 1] [0.5]",
+               "c|b in { x , y }",
+               "{a=1, b=y}"]
+        cs = pcs_parser.read(pcs)
+        self.assertEqual(["a", "b", "c"], cs.keys())
+        self.assertEqual(
+            configuration_space.UniformIntegerHyperparameter("a", 0, 15,
+                                                             base=10),
+            cs["a"])
+        self.assertEqual(["x", "y", "z"], cs["b"].choices)
+        self.assertEqual([["b in {x,y}"]], cs["c"].conditions)
+
+        self.assertRaises(NotImplementedError, pcs_parser.read,
+                          ["a [0, 1] {0}"])
+        self.assertRaises(NotImplementedError, pcs_parser.read,
+                          ["a {x, y} [x]", "a | b = x"])
+
+    def test_read_write_forbidden_clauses(self):
+        pcs = ["a {x, y} [x]",
+               "b {1, 2, 3} [1]",
+               "c [0, 1] [0.5]",
+               "{a=x, b=2}",
+               "{ b = 3 }"]
+        cs = pcs_parser.read(pcs)
+        self.assertEqual(["a", "b", "c"], cs.keys())
+        self.assertEqual(
+            [configuration_space.ForbiddenClause([("a", "x"), ("b", "2")]),
+             configuration_space.ForbiddenClause([("b", "3")])],
+            cs.forbidden_clauses)
+
+        written = pcs_parser.write(cs)
+        self.assertTrue(written.endswith("\n\n{a=x, b=2}\n{b=3}"))
+        self.assertEqual(cs.forbidden_clauses,
+                         pcs_parser.read(written.split("\n"))
+                         .forbidden_clauses)
+
+        self.assertRaises(ValueError, pcs_parser.read,
+                          ["a {x, y} [x]", "{d=x}"])
+
     def test_write_int(self):
         expected = "int_a [-1, 6] [2]i"
         sp = {"a": int_a}
@@ -0,0 +1,92 @@
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import HPOlib.Plotting.plotDataProfile as plotDataProfile
+import HPOlib.Plotting.plot_util as plot_util
+from tests.unittests.experiments.util import create_run
+
+
+class PlotDataProfileTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        # The plots are saved, no display is needed
+        plot_util.use_agg_backend()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _create_run(self, benchmark, optimizer, seed, values):
+        return create_run(os.path.join(self.tmp_dir, benchmark,
+                                       "%s_%d_2014" % (optimizer, seed)),
+                          optimizer, values, duration=2.0)
+
+    def test_get_hitting_times(self):
+        trajectory = [1000, 10, 10, 5, 1, 1]
+        hits = plotDataProfile.get_hitting_times(trajectory,
+                                                 [1000, 10, 7, 1, 0.5])
+        self.assertEqual([0, 1, 3, 4, np.inf], hits.tolist())
+
+    def test_get_ecdf(self):
+        ecdf = plotDataProfile.get_ecdf([[1, 3, np.inf], [2, np.inf, np.inf]],
+                                        [0, 1, 2.5, 100])
+        self.assertEqual([0, 1 / 6., 2 / 6., 3 / 6.], ecdf.tolist())
+
+    def test_get_expected_running_time(self):
+        hitting = [("a", np.array([2., np.inf]), 10),
+                   ("a", np.array([4., 6.]), 8),
+                   ("b", np.array([np.inf, np.inf]), 5)]
+        ert = plotDataProfile.get_expected_running_time(hitting)
+        self.assertEqual([3., 16.], ert["a"][0].tolist())
+        self.assertEqual([2, 1], ert["a"][1].tolist())
+        self.assertEqual([np.inf, np.inf], ert["b"][0].tolist())
+
+    def test_main(self):
+        pkl_list = [[self._create_run("branin", "good", 1, [5, 1, 0]),
+                     self._create_run("branin", "good", 2, [4, 2, 2]),
+                     self._create_run("hartmann", "good", 1, [9, 3, 3])],
+                    [self._create_run("branin", "bad", 1, [6, 5, 4]),
+                     self._create_run("hartmann", "bad", 1, [7, 7, 1])]]
+        name_list = [["good", 3], ["bad", 2]]
+
+        runs = plotDataProfile.load_runs(pkl_list, name_list)
+        self.assertEqual(["branin", "branin", "hartmann", "branin",
+                          "hartmann"], [run["benchmark"] for run in runs])
+        targets = plotDataProfile.get_targets(runs, [1, 0.5, 0])
+        # best + precision * (median of the first values - best)
+        self.assertEqual([5, 2.5, 0], targets["branin"].tolist())
+        self.assertEqual([8, 4.5, 1], targets["hartmann"].tolist())
+
+        hitting = plotDataProfile.get_hitting_matrices(runs, targets)
+        self.assertEqual([1, 2, 3], hitting["good"][0][1].tolist())
+        self.assertEqual([1, 2, np.inf], hitting["good"][1][1].tolist())
+        hitting = plotDataProfile.get_hitting_matrices(runs, targets,
+                                                       time=True)
+        self.assertEqual([2, 4, 6], hitting["good"][0][1].tolist())
+        self.assertEqual(6, hitting["good"][0][2])
+
+        save = os.path.join(self.tmp_dir, "ecdf.png")
+        plotDataProfile.main(pkl_list, name_list, save=save)
+        self.assertTrue(os.path.exists(save))
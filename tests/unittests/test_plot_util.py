@@ -1,6 +1,13 @@
+import cPickle
+import copy
 import itertools
+import os
+import shutil
+import tempfile
 import unittest
 
+import numpy as np
+
 import HPOlib.Plotting.plot_util as plot_util
 from tests.unittests.experiments.branin_experiment import experiment as \
     branin_experiment
@@ -44,6 +51,211 @@ class PlotUtilTest(unittest.TestCase):
         self.assertRaises(ValueError, plot_util.extract_trajectory,
                           branin_experiment, 0)
 
+    def test_extract_trajectories(self):
+        experiment = copy.deepcopy(branin_experiment)
+        # A crashed trial is ignored
+        experiment['trials'][16]['status'] = 4
+        expected = [plot_util.extract_trajectory(branin_experiment,
+                                                 maxvalue=1000),
+                    plot_util.extract_trajectory(experiment, maxvalue=1000),
+                    plot_util.extract_trajectory(branin_experiment, cut=10,
+                                                 maxvalue=1000)]
+        self.assertAlmostEqual(2.6962005134978178, expected[1][-1])
+
+        experiments = [branin_experiment, experiment,
+                       {'trials': branin_experiment['trials'][:10]}]
+        trajectories, lengths = plot_util.extract_trajectories(
+            experiments, maxvalue=1000)
+        self.assertEqual((3, 21), trajectories.shape)
+        self.assertEqual([21, 21, 11], list(lengths))
+        for trajectory, length, expected_trajectory in \
+                zip(trajectories, lengths, expected):
+            self.assertListAlmostEqual(expected_trajectory,
+                                       trajectory[:length])
+        self.assertTrue(np.all(np.isnan(trajectories[2, 11:])))
+
+        trajectories, lengths = plot_util.extract_trajectories(
+            experiments, cut=5, maxvalue=1000)
+        self.assertEqual((3, 6), trajectories.shape)
+        self.assertRaises(ValueError, plot_util.extract_trajectories,
+                          experiments, 0)
+
+    def test_get_Trace_cv(self):
+        trials = {'trials': [{'instance_results': [5., 1.]},
+                             {'instance_results': [2., np.NaN]},
+                             {'instance_results': [np.inf, 4.]}],
+                  'instance_order': [(0, 1), (1, 0), (0, 0), (1, 1),
+                                     (2, 0), (2, 1)]}
+        # The mean of the first configuration gets worse with its second fold
+        self.assertEqual([1., 1., 2., 2., 2., 2.],
+                         plot_util.get_Trace_cv(trials))
+        self.assertEqual([1., 1., 1.5, 1.5, 1.5, 1.5],
+                         plot_util.get_Trace_cv(trials, maxvalue=1.5))
+
+        trace = plot_util.get_Trace_cv(branin_experiment)
+        self.assertListAlmostEqual(
+            plot_util.extract_trajectory(branin_experiment)[1:], trace)
+
+    def test_fill_trajectories(self):
+        trace_list = [[5, 3], [5, 2, 1]]
+        times_list = [[1, 2], [1, 3, 5]]
+        trajectories, times = plot_util.fill_trajectories(trace_list,
+                                                          times_list)
+        self.assertEqual([[5, 3, 3, 3], [5, 5, 2, 1]], trajectories)
+        self.assertEqual([1, 2, 3, 5], times)
+        # The input is not modified
+        self.assertEqual([[5, 3], [5, 2, 1]], trace_list)
+        self.assertEqual([[1, 2], [1, 3, 5]], times_list)
+
+        # Duplicate times, points without a change and trajectories which
+        # start later than others
+        trajectories, times = plot_util.fill_trajectories(
+            [[5, 3, 3, 2], [6, 2, 1]], [[1, 2, 2, 4], [0.5, 3, 5]])
+        self.assertEqual([[6, 5, 3, 3, 2, 2], [6, 6, 6, 2, 2, 1]],
+                         trajectories)
+        self.assertEqual([0.5, 1, 2, 3, 4, 5], times)
+
+        trajectories, times = plot_util.fill_trajectories(
+            [[5, 5, 5], [4, 4, 4]], [[1, 2, 3], [1, 2, 3]])
+        self.assertEqual([[5, 5], [4, 4]], trajectories)
+        self.assertEqual([1, 3], times)
+
+    def test_resample_trajectories(self):
+        trace_list = [np.array([5, 3]), np.array([5, 2, 1])]
+        times_list = [np.array([1, 2]), np.array([1, 3, np.NaN])]
+        trajectories, grid = plot_util.resample_trajectories(
+            trace_list, times_list, grid=[0, 1.5, 2, 10])
+        self.assertEqual([0, 1.5, 2, 10], list(grid))
+        self.assertEqual([[5, 5, 3, 3], [5, 5, 5, 2]], trajectories.tolist())
+
+        grid = plot_util.get_log_spaced_grid([[0, 1, 10], [0, 100]], 3)
+        self.assertListAlmostEqual([1, 10, 100], grid)
+        self.assertEqual(100, grid[-1])
+        self.assertRaises(ValueError, plot_util.resample_trajectories,
+                          trace_list, times_list[:1])
+
+    def test_load_summaries(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            cache_dir = os.path.join(tmp_dir, "cache")
+            pkl_list = [[os.path.join(tmp_dir, "a_%d.pkl" % i)
+                         for i in range(2)],
+                        [os.path.join(tmp_dir, "b.pkl")]]
+            name_list = [["a", 2], ["b", 1]]
+            for pkl in itertools.chain(*pkl_list):
+                with open(pkl, "w") as fh:
+                    cPickle.dump(branin_experiment, fh)
+
+            plot_util.summary_cache.clear()
+            summaries = plot_util.load_summaries(name_list, pkl_list,
+                                                 cache_dir=cache_dir,
+                                                 n_jobs=2)
+            self.assertEqual(["a", "b"], sorted(summaries.keys()))
+            self.assertEqual(2, len(summaries["a"]))
+            summary = summaries["b"][0]
+            self.assertEqual(plot_util.get_best_value_and_index(
+                branin_experiment), (summary["best"], summary["best_index"]))
+            self.assertListAlmostEqual(
+                plot_util.extract_trajectory(branin_experiment, cut=10,
+                                             maxvalue=1000),
+                plot_util.extract_trajectory(summary, cut=10, maxvalue=1000))
+            self.assertListAlmostEqual(
+                plot_util.extract_runtime_timestamps(branin_experiment),
+                summary["runtime_timestamps"])
+            self.assertEqual(3, len(os.listdir(cache_dir)))
+
+            # The next process reads the summaries from the cache on disk
+            plot_util.summary_cache.clear()
+            cache_file = plot_util.get_summary_cache_filename(
+                pkl_list[1][0], cache_dir)
+            with open(cache_file, "w") as fh:
+                cPickle.dump(pkl_list[1][0], fh)
+                cPickle.dump("from cache", fh)
+            summaries = plot_util.load_summaries(name_list, pkl_list,
+                                                 cache_dir=cache_dir, n_jobs=1)
+            self.assertEqual("from cache", summaries["b"][0])
+
+            # A modified pickle is read again
+            plot_util.summary_cache.clear()
+            stat = os.stat(pkl_list[1][0])
+            os.utime(pkl_list[1][0], (stat.st_atime, stat.st_mtime + 10))
+            summaries = plot_util.load_summaries(name_list, pkl_list,
+                                                 cache_dir=cache_dir, n_jobs=1)
+            self.assertAlmostEqual(summary["best"], summaries["b"][0]["best"])
+            # ...and its old entry was pruned
+            self.assertFalse(os.path.exists(cache_file))
+            self.assertEqual(3, len(os.listdir(cache_dir)))
+        finally:
+            plot_util.summary_cache.clear()
+            shutil.rmtree(tmp_dir)
+
+    def test_load_summaries_small_pickles(self):
+        tmp_dir = tempfile.mkdtemp()
+        pool = plot_util.multiprocessing.Pool
+        try:
+            pkl_list = [[os.path.join(tmp_dir, "a_%d.pkl" % i)
+                         for i in range(2)]]
+            for pkl in pkl_list[0]:
+                with open(pkl, "w") as fh:
+                    cPickle.dump(branin_experiment, fh)
+
+            # Small pickles are read without starting processes
+            def fail(*args, **kwargs):
+                self.fail("load_summaries started a pool")
+            plot_util.multiprocessing.Pool = fail
+            plot_util.summary_cache.clear()
+            summaries = plot_util.load_summaries([["a", 2]], pkl_list,
+                                                 cache_dir=None)
+            self.assertEqual(2, len(summaries["a"]))
+        finally:
+            plot_util.multiprocessing.Pool = pool
+            plot_util.summary_cache.clear()
+            shutil.rmtree(tmp_dir)
+
+    def test_summary_cache_dir(self):
+        environ = dict(os.environ)
+        try:
+            # The cache on disk is opt-in
+            os.environ.pop(plot_util.SUMMARY_CACHE_DIR_VARIABLE, None)
+            self.assertIsNone(plot_util.get_summary_cache_dir())
+            os.environ[plot_util.SUMMARY_CACHE_DIR_VARIABLE] = "/tmp/cache"
+            self.assertEqual("/tmp/cache", plot_util.get_summary_cache_dir())
+            os.environ[plot_util.SUMMARY_CACHE_DIR_VARIABLE] = ""
+            self.assertIsNone(plot_util.get_summary_cache_dir())
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
+
+    def test_prune_summary_cache(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            cache_dir = os.path.join(tmp_dir, "cache")
+            pkl_list = [[os.path.join(tmp_dir, "a_%d.pkl" % i)
+                         for i in range(3)]]
+            for pkl in pkl_list[0]:
+                with open(pkl, "w") as fh:
+                    cPickle.dump(branin_experiment, fh)
+            plot_util.summary_cache.clear()
+            plot_util.load_summaries([["a", 3]], pkl_list,
+                                     cache_dir=cache_dir, n_jobs=1)
+            self.assertEqual(3, len(os.listdir(cache_dir)))
+            with open(os.path.join(cache_dir, "old.pkl"), "w") as fh:
+                cPickle.dump({"summary": "of an old version"}, fh)
+
+            # Entries of removed pickles and of old versions
+            os.remove(pkl_list[0][0])
+            self.assertEqual(2, plot_util.prune_summary_cache(cache_dir))
+            self.assertEqual(2, len(os.listdir(cache_dir)))
+            # The least recently used entries
+            filename = plot_util.get_summary_cache_filename(pkl_list[0][1],
+                                                            cache_dir)
+            os.utime(filename, (0, 0))
+            self.assertEqual(1, plot_util.prune_summary_cache(cache_dir, 1))
+            self.assertFalse(os.path.exists(filename))
+        finally:
+            plot_util.summary_cache.clear()
+            shutil.rmtree(tmp_dir)
+
     def test_extract_results(self):
         res = plot_util.extract_results(branin_experiment)
         self.assertEqual(res, branin_expected)
@@ -94,4 +306,22 @@ class PlotUtilTest(unittest.TestCase):
                           branin_experiment, 0.5)
 
         self.assertRaises(ValueError, plot_util.get_best_value_and_index,
-                          branin_experiment, 0)
\ No newline at end of file
+                          branin_experiment, 0)
+
+    def test_extract_phase_durations(self):
+        # The branin experiment was written before timestamps were recorded
+        res = plot_util.extract_phase_durations(branin_experiment)
+        self.assertEqual((20, 6), res.shape)
+        self.assertFalse(np.isfinite(res).any())
+
+        experiment = copy.deepcopy(branin_experiment)
+        trial = experiment['trials'][1]
+        trial['instance_timestamps'] = np.array([[1., 2., 4., 5., 9., 10.,
+                                                  12.]])
+        res = plot_util.extract_phase_durations(experiment, cut=5)
+        self.assertEqual((5, 6), res.shape)
+        self.assertEqual([1., 2., 1., 4., 1., 2.], list(res[1]))
+        self.assertFalse(np.isfinite(res[0]).any())
+
+        self.assertRaises(ValueError, plot_util.extract_phase_durations,
+                          branin_experiment, 0)
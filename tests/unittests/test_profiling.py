@@ -0,0 +1,112 @@
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import ConfigParser
+import os
+import shutil
+import tempfile
+import unittest
+
+import HPOlib.overhead_benchmark as overhead_benchmark
+import HPOlib.profiling as profiling
+
+
+def _inner():
+    return sum([i ** 2 for i in range(20000)])
+
+
+def _outer():
+    return [_inner() for i in range(3)]
+
+
+class ProfilingTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.experiment_dir = None
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        if self.experiment_dir is not None:
+            shutil.rmtree(os.path.dirname(self.experiment_dir))
+
+    def _get_config(self, fraction):
+        config = ConfigParser.SafeConfigParser()
+        config.add_section("HPOLIB")
+        config.set("HPOLIB", "profile_evaluations", str(fraction))
+        config.set("HPOLIB", "profile_directory", self.tmp_dir)
+        return config
+
+    def test_get_profile_base(self):
+        self.assertIsNone(profiling.get_profile_base(self._get_config(0.0),
+                                                     1, 2))
+        self.assertFalse(profiling.is_sampled(self._get_config(0.0)))
+        self.assertTrue(profiling.is_sampled(self._get_config(1.0)))
+        self.assertIsNotNone(profiling.get_profile_base(
+            self._get_config(0.0), 1, 2, sampled=True))
+        profile_base = profiling.get_profile_base(self._get_config(1.0), 1, 2)
+        self.assertEqual(os.path.join(self.tmp_dir, "trial_1_fold_2"),
+                         profile_base)
+
+    def test_collapse_stats(self):
+        profile_base = os.path.join(self.tmp_dir, "trial_0_fold_0")
+        profiler = profiling.start_profiler()
+        _outer()
+        filename = profiling.save_profiler(profiler, profile_base, "target")
+        self.assertEqual(profile_base + "_target.pstats", filename)
+
+        stacks = profiling.collapse_stats(profiling.load_stats([filename]))
+        inner_stacks = [frames for frames in stacks
+                        if frames[-1].startswith("_inner ")]
+        self.assertEqual(1, len(inner_stacks))
+        self.assertTrue(inner_stacks[0][-2].startswith("_outer "))
+        self.assertGreater(stacks[inner_stacks[0]], 0)
+
+    def test_profile_evaluations(self):
+        self.experiment_dir = overhead_benchmark.create_experiment_directory(
+            target="branin")
+        config_file = os.path.join(self.experiment_dir, "config.cfg")
+        config = ConfigParser.SafeConfigParser(allow_no_value=True)
+        config.read(config_file)
+        config.set("HPOLIB", "profile_evaluations", "1.0")
+        with open(config_file, "w") as fh:
+            config.write(fh)
+
+        overhead_benchmark.measure_bridges(self.experiment_dir, 2, ["module"])
+        profile_directory = os.path.join(self.experiment_dir, "profiles")
+        for trial in range(2):
+            for kind in profiling.KINDS:
+                self.assertTrue(os.path.exists(os.path.join(
+                    profile_directory, "trial_%d_fold_0_%s.pstats" %
+                    (trial, kind))))
+
+        # The output directory is created
+        output_directory = os.path.join(self.tmp_dir, "aggregated")
+        aggregated = profiling.aggregate(profile_directory, output_directory)
+        self.assertEqual(profiling.KINDS, sorted(aggregated.keys()))
+        self.assertEqual(2, aggregated["target"][0])
+        with open(os.path.join(output_directory, "target.collapsed")) as fh:
+            collapsed = fh.read()
+        self.assertIn("save_branin", collapsed)
+        with open(os.path.join(output_directory,
+                               "interceptor.collapsed")) as fh:
+            collapsed = fh.read()
+        self.assertIn("_save_jobs", collapsed)
+        # The interceptor is profiled from parsing the command line on
+        self.assertIn("parse_cli", collapsed)
+        self.assertIn("end_cv", collapsed)
+        self.assertNotIn("save_branin", collapsed)
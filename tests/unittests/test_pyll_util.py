@@ -1,3 +1,4 @@
+import cPickle
 import os
 import StringIO
 import sys
@@ -382,6 +383,56 @@ class TestPyllWriter(unittest.TestCase):
         cs = self.pyll_writer.write(config_space_2)
         self.assertEqual(expected.getvalue().replace("gamma", "gamma_2"), cs)
 
+    def test_write_read_forbidden_clauses(self):
+        a_or_b = configuration_space.CategoricalHyperparameter("a_or_b",
+                                                               ["a", "b"])
+        c = configuration_space.CategoricalHyperparameter("c", ["1", "2"])
+        space = configuration_space.SearchSpace([("a_or_b", a_or_b),
+                                                 ("c", c)])
+        space.forbidden_clauses.append(configuration_space.ForbiddenClause(
+            [("a_or_b", "a"), ("c", "2")]))
+        cs = self.pyll_writer.write(space)
+        self.assertTrue(cs.endswith('\nforbidden_clauses = [{"a_or_b": "a", '
+                                    '"c": "2"}]\n'))
+        read_space = pyll_parser.read(cs)
+        self.assertEqual(space.forbidden_clauses,
+                         read_space.forbidden_clauses)
+
+    def test_build(self):
+        a_or_b = configuration_space.CategoricalHyperparameter("a_or_b",
+                                                               ["a", "b"])
+        cond_a = configuration_space.UniformFloatHyperparameter(
+            'cond_a', 0.001, 1, base=10, conditions=[['a_or_b == a']])
+        cond_b = configuration_space.UniformIntegerHyperparameter(
+            'cond_b', 1, 100, base=np.e, conditions=[['a_or_b == b']])
+        c = configuration_space.NormalFloatHyperparameter("c", 0, 1, q=0.1)
+        space = {"a_or_b": a_or_b, "cond_a": cond_a, "cond_b": cond_b,
+                 "c": c}
+
+        namespace = dict()
+        exec self.pyll_writer.write(space) in namespace
+        built = pyll_parser.build(space)
+        self.assertEqual(["a_or_b", "c"], sorted(built))
+        # The space can be pickled
+        built = cPickle.loads(cPickle.dumps(built, -1))
+
+        for seed in range(20):
+            expected = hyperopt.pyll.stochastic.sample(
+                hyperopt.pyll.as_apply(namespace["space"]),
+                np.random.RandomState(seed))
+            sample = hyperopt.pyll.stochastic.sample(
+                hyperopt.pyll.as_apply(built), np.random.RandomState(seed))
+            self.assertEqual(sorted(expected["a_or_b"]),
+                             sorted(sample["a_or_b"]))
+            for key in expected["a_or_b"]:
+                if key == "a_or_b":
+                    self.assertEqual(expected["a_or_b"][key],
+                                     sample["a_or_b"][key])
+                else:
+                    self.assertAlmostEqual(expected["a_or_b"][key],
+                                           sample["a_or_b"][key])
+            self.assertAlmostEqual(expected["c"], sample["c"])
+
     def test_operator_in(self):
         a_or_b = configuration_space.CategoricalHyperparameter("a_or_b", ["a", "b"])
         cond_a = configuration_space.UniformFloatHyperparameter(
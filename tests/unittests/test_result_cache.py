@@ -0,0 +1,98 @@
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import ConfigParser
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from HPOlib.result_cache import get_namespace, NAMESPACE_OPTIONS, \
+    ResultCache
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, "cache.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_get_put(self):
+        cache = ResultCache(self.filename, "a")
+        self.assertIsNone(cache.get("abc", 0))
+        cache.put("abc", 0, 0.5, 2.0, "data")
+        self.assertEqual((0.5, 2.0, "data"), cache.get("abc", 0))
+        self.assertIsNone(cache.get("abc", 1))
+        cache.close()
+
+        # Persistent and separated by namespace
+        cache = ResultCache(self.filename, "a")
+        self.assertEqual((0.5, 2.0, "data"), cache.get("abc", 0))
+        cache.close()
+        cache = ResultCache(self.filename, "b")
+        self.assertIsNone(cache.get("abc", 0))
+        cache.close()
+
+    def test_ttl(self):
+        cache = ResultCache(self.filename, "a", ttl=0.1)
+        cache.put("abc", 0, 0.5, 2.0)
+        self.assertIsNotNone(cache.get("abc", 0))
+        time.sleep(0.2)
+        self.assertIsNone(cache.get("abc", 0))
+        cache.put("def", 0, 0.5, 2.0)
+        self.assertEqual(1, len(cache))
+        cache.close()
+
+    def test_size(self):
+        cache = ResultCache(self.filename, "a", size=2)
+        for fold in range(3):
+            cache.put("abc", fold, fold, 1.0)
+            time.sleep(0.01)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get("abc", 0))
+        self.assertEqual((2.0, 1.0, ""), cache.get("abc", 2))
+        cache.close()
+
+    def test_get_namespace(self):
+        config = ConfigParser.SafeConfigParser()
+        config.add_section("HPOLIB")
+        for option in NAMESPACE_OPTIONS:
+            config.set("HPOLIB", option, "")
+        config.add_section("TPE")
+        config.set("TPE", "space", "space.py")
+        config.add_section("DATA")
+        config.set("DATA", "dataset", "mnist")
+        namespace = get_namespace(config)
+
+        # Optimizer settings do not change the namespace
+        config.set("TPE", "space", "other.py")
+        config.set("HPOLIB", "number_of_jobs", "10")
+        self.assertEqual(namespace, get_namespace(config))
+        # Benchmark settings and the target algorithm do
+        config.set("DATA", "dataset", "cifar")
+        self.assertNotEqual(namespace, get_namespace(config))
+        config.set("DATA", "dataset", "mnist")
+        config.set("HPOLIB", "python_function", "f")
+        self.assertNotEqual(namespace, get_namespace(config))
+
+
+if __name__ == "__main__":
+    unittest.main()
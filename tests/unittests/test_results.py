@@ -0,0 +1,91 @@
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import HPOlib.Plotting.results as results
+from tests.unittests.experiments.util import create_run
+
+
+class ResultsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.index_file = os.path.join(self.tmp_dir,
+                                       results.DEFAULT_INDEX_FILENAME)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _create_run(self, optimizer, seed, values):
+        subdir = os.path.join(self.tmp_dir, "%s_%d_2014" % (optimizer, seed))
+        pkl = create_run(subdir, optimizer, values)
+        with open(os.path.join(subdir, "config.cfg"), "w") as fh:
+            fh.write("[HPOLIB]\nseed = %d\n" % seed)
+        return pkl
+
+    def _get_rows(self):
+        connection = results.open_index(self.index_file)
+        rows = connection.execute("SELECT optimizer, seed, configurations, "
+                                  "best, error FROM runs "
+                                  "ORDER BY optimizer, seed").fetchall()
+        connection.close()
+        return rows
+
+    def test_collect_results(self):
+        self._create_run("tpe", 2000, [3.0, 1.0])
+        self._create_run("smac", 1000, [2.0])
+        smac_pkl = self._create_run("smac", 3000, [4.0, 0.5, 5.0])
+        with open(os.path.join(self.tmp_dir, "spearmint_1000_2014.pkl"),
+                  "w") as fh:
+            fh.write("no experiment directory")
+
+        sio = results.collect_results(self.tmp_dir, n_jobs=2)
+        lines = sio.getvalue().split("\n")
+        self.assertEqual(["smac", "smac", "#NumRuns", "tpe", "#NumRuns"],
+                         [line.split()[0] for line in lines[2:7]])
+        self.assertIn("|   1000 |", lines[2])
+        self.assertIn("|   3000 |", lines[3])
+        self.assertIn("Best 0.500000", lines[4])
+        self.assertEqual([("smac", 1000, 1, 2.0, None),
+                          ("smac", 3000, 3, 0.5, None),
+                          ("tpe", 2000, 2, 1.0, None)], self._get_rows())
+
+        # Nothing changed, nothing is read again
+        connection = results.open_index(self.index_file)
+        self.assertEqual(0, results.update_index(connection, self.tmp_dir))
+
+        # A broken pickle is reported and read again once it changed
+        with open(smac_pkl, "w") as fh:
+            fh.write("broken")
+        os.utime(smac_pkl, (0, 0))
+        self.assertEqual(1, results.update_index(connection, self.tmp_dir))
+        connection.close()
+        sio = results.collect_results(self.tmp_dir)
+        self.assertIn("Couldn't read the following .pkl files\n" + smac_pkl,
+                      sio.getvalue())
+
+        shutil.rmtree(os.path.dirname(smac_pkl))
+        self._create_run("smac", 4000, [0.1])
+        results.collect_results(self.tmp_dir)
+        self.assertEqual([("smac", 1000, 1, 2.0, None),
+                          ("smac", 4000, 1, 0.1, None),
+                          ("tpe", 2000, 2, 1.0, None)], self._get_rows())
@@ -0,0 +1,138 @@
+##
+# wrapping: A program making it easy to use hyperparameter
+# optimization software.
+# Copyright (C) 2013 Katharina Eggensperger and Matthias Feurer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from scipy import stats
+
+import HPOlib.Experiment as Experiment
+import HPOlib.Plotting.plot_util as plot_util
+import HPOlib.Plotting.statistics as statistics
+
+
+class StatisticsTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.RandomState(1)
+        # The plots are saved, no display is needed
+        plot_util.use_agg_backend()
+
+    def test_bootstrap_confidence_intervals(self):
+        trajectories = self.rng.rand(20, 50)
+        mean, lower, upper = statistics.bootstrap_confidence_intervals(
+            trajectories, n_bootstrap=250, n_jobs=1)
+        self.assertTrue(np.allclose(np.mean(trajectories, axis=0), mean))
+        self.assertTrue((lower < mean).all())
+        self.assertTrue((mean < upper).all())
+        # The samples do not depend on the number of processes
+        parallel = statistics.bootstrap_confidence_intervals(
+            trajectories, n_bootstrap=250, n_jobs=2)
+        self.assertTrue(np.array_equal(lower, parallel[1]))
+        self.assertTrue(np.array_equal(upper, parallel[2]))
+
+    def test_mann_whitney_u(self):
+        x = np.round(self.rng.rand(12, 30) * 5)
+        y = np.round(self.rng.rand(9, 30) * 5 + 0.5)
+        y[:, 0] = x[0, 0]
+        x[:, 0] = x[0, 0]
+        u, p = statistics.mann_whitney_u(x, y)
+        self.assertEqual(1, p[0])
+        for column in range(1, 30):
+            expected_u, expected_p = stats.mannwhitneyu(
+                x[:, column], y[:, column], alternative="two-sided")
+            self.assertAlmostEqual(expected_p, p[column])
+            self.assertAlmostEqual(np.sum(x[:, column] > y[:, column][:, None])
+                                   + 0.5 * np.sum(x[:, column] ==
+                                                  y[:, column][:, None]),
+                                   12 * 9 - u[column])
+
+    def test_average_ranks(self):
+        trajectories = [self.rng.rand(10, 5), self.rng.rand(10, 5),
+                        np.round(self.rng.rand(10, 5))]
+        ranks = statistics.average_ranks(trajectories)
+        for column in range(5):
+            expected = np.mean([stats.rankdata([t[row, column] for t in
+                                                trajectories])
+                                for row in range(10)], axis=0)
+            self.assertTrue(np.allclose(expected, ranks[:, column]))
+        self.assertRaises(ValueError, statistics.average_ranks,
+                          [self.rng.rand(10, 5), self.rng.rand(9, 5)])
+
+    def test_critical_difference(self):
+        self.assertAlmostEqual(2.569 * np.sqrt(4 * 5 / 60.),
+                               statistics.critical_difference(4, 10))
+        self.assertRaises(ValueError, statistics.critical_difference, 11, 10)
+        self.assertRaises(ValueError, statistics.critical_difference, 4, 10,
+                          alpha=0.01)
+
+    def test_get_anytime_statistics_as_text(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            pkl_list = [[], []]
+            for optimizer, offset in enumerate([0, 10]):
+                for run in range(5):
+                    name = "run_%d_%d" % (optimizer, run)
+                    experiment = Experiment.Experiment(tmp_dir, name)
+                    for i in range(10 + run):
+                        trial = experiment.add_job({"x": str(i)})
+                        experiment.set_one_fold_running(trial, 0)
+                        experiment.set_one_fold_complete(
+                            trial, 0, offset + self.rng.rand(), 1)
+                    experiment._save_jobs()
+                    experiment.close()
+                    pkl_list[optimizer].append(
+                        os.path.join(tmp_dir, name + ".pkl"))
+            name_list = [["good", 5], ["bad", 5]]
+
+            trajectories, keys = statistics.get_trajectory_matrices(
+                pkl_list, name_list)
+            self.assertEqual(["good", "bad"], keys)
+            self.assertEqual((5, 10), trajectories["good"].shape)
+            self.assertTrue((np.diff(trajectories["bad"], axis=1) <= 0).all())
+
+            cd_plot = os.path.join(tmp_dir, "cd.png")
+            output = statistics.get_anytime_statistics_as_text(
+                pkl_list, name_list, n_bootstrap=100, cd_plot=cd_plot)
+            lines = output.getvalue().split("\n")
+            self.assertIn("over 10 evaluations", lines[0])
+            self.assertTrue(lines[2].strip().startswith("good: #1 "))
+            self.assertIn("#10 ", lines[2])
+            self.assertTrue(lines[5].strip().startswith("good vs        bad"))
+            self.assertIn("good: #1 1.000", output.getvalue())
+            self.assertIn("bad: #1 2.000", output.getvalue())
+            self.assertTrue(os.path.exists(cd_plot))
+            self.assertIn("Critical difference (alpha=0.05): %.3f" %
+                          statistics.critical_difference(2, 5),
+                          output.getvalue())
+
+            # The critical difference uses the same alpha as the bootstrap
+            output = statistics.get_anytime_statistics_as_text(
+                pkl_list, name_list, n_bootstrap=100, alpha=0.1)
+            self.assertIn("Critical difference (alpha=0.1): %.3f" %
+                          statistics.critical_difference(2, 5, alpha=0.1),
+                          output.getvalue())
+            output = statistics.get_anytime_statistics_as_text(
+                pkl_list, name_list, n_bootstrap=100, alpha=0.01)
+            self.assertIn("Cannot compute the critical difference",
+                          output.getvalue())
+        finally:
+            shutil.rmtree(tmp_dir)
@@ -18,8 +18,11 @@
 
 import ConfigParser
 import numpy as np
+import glob
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 import StringIO
 
@@ -28,6 +31,7 @@ import numpy as np
 import HPOlib.wrapping as wrapping
 import HPOlib.wrapping_util as wrapping_util
 import HPOlib.config_parser.parse as parse
+from HPOlib.format_converter import configuration_space, pcs_parser
 
 try:
     import hyperopt
@@ -90,6 +94,43 @@ class WrappingTestUtil(unittest.TestCase):
         self.assertEqual(asserted_file_content, file_content)
         string_stream.close()
 
+    def test_config_snapshot(self):
+        config = parse.parse_config("dummy_config.cfg", allow_no_value=True)
+        config.set("HPOLIB", "total_time_limit", None)
+        config.set("HPOLIB", "is_not_original_config_file", "True")
+
+        cwd = os.getcwd()
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            os.chdir(tmp_dir)
+            with open("config.cfg", "w") as fh:
+                wrapping_util.save_config_to_file(fh, config)
+            from_file = wrapping_util.load_experiment_config_file()
+            wrapping_util.save_config_snapshot(
+                wrapping_util.CONFIG_SNAPSHOT_FILENAME, config, "config.cfg")
+            from_snapshot = wrapping_util.load_experiment_config_file()
+            self.assertEqual(from_file.sections(), from_snapshot.sections())
+            for section in from_file.sections():
+                self.assertEqual(from_file.items(section),
+                                 from_snapshot.items(section))
+            self.assertEqual("None", from_snapshot.get("HPOLIB",
+                                                       "total_time_limit"))
+            # The plotting scripts must not take it for an experiment pickle
+            self.assertEqual([], glob.glob("*.pkl"))
+
+            # A changed config.cfg is used instead, even if its mtime is
+            # older than the one of the snapshot
+            config.set("HPOLIB", "number_of_jobs", "5")
+            with open("config.cfg", "w") as fh:
+                wrapping_util.save_config_to_file(fh, config)
+            mtime = os.path.getmtime(wrapping_util.CONFIG_SNAPSHOT_FILENAME)
+            os.utime("config.cfg", (mtime - 1, mtime - 1))
+            self.assertEqual(5, wrapping_util.load_experiment_config_file().
+                             getint("HPOLIB", "number_of_jobs"))
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(tmp_dir)
+
     def test_parse_config_values_from_unknown_arguments(self):
         """Test if we can convert a config with Sections and variables into an
         argparser."""
@@ -133,6 +174,75 @@ class WrappingTestUtil(unittest.TestCase):
         self.assertEqual(wrapping_util.nan_mean(np.array([-1, 1])), 0)
         self.assertTrue(np.isnan(wrapping_util.nan_mean(np.array([]))))
 
+    def test_canonicalize_params(self):
+        self.assertEqual([("a", "svm"), ("x", "0.1"), ("y", "5.0")],
+                         wrapping_util.canonicalize_params(
+                             {"-x": "'0.1'", "y": "5.0", "a": '"svm"'}))
+        self.assertEqual([("a", "svm"), ("x", 0.1), ("y", 5)],
+                         wrapping_util.canonicalize_params(
+                             {"-x": "'0.1'", "y": "5.0", "a": '"svm"'},
+                             coerce_numbers=True))
+        self.assertEqual([("x", 0.1)], wrapping_util.canonicalize_params(
+            {"LOG10_x": "-1"}))
+        self.assertEqual([("x", 16)], wrapping_util.canonicalize_params(
+            {"Q16_x": "17"}))
+
+    def test_get_params_hash(self):
+        params_hash = wrapping_util.get_params_hash({"x": 0.1, "y": 5,
+                                                    "a": "svm"})
+        self.assertEqual(32, len(params_hash))
+        self.assertEqual(params_hash, wrapping_util.get_params_hash(
+            {"a": "svm", "LOG10_x": "-1", "y": 5}))
+        # Strings are hashed as given unless numbers are coerced
+        self.assertNotEqual(params_hash, wrapping_util.get_params_hash(
+            {"a": "svm", "x": "0.1", "y": "5.0"}))
+        self.assertEqual(params_hash, wrapping_util.get_params_hash(
+            {"a": "svm", "x": "0.1", "y": "5.0"}, coerce_numbers=True))
+        self.assertNotEqual(wrapping_util.get_params_hash({"a": "1"}),
+                            wrapping_util.get_params_hash({"a": "1.0"}))
+        self.assertEqual(params_hash, wrapping_util.get_params_hash(
+            {"a": "svm", "x": 0.10000000000000002, "y": 5.0}))
+        self.assertNotEqual(params_hash, wrapping_util.get_params_hash(
+            {"a": "svm", "x": 0.2, "y": 5}))
+        self.assertEqual(params_hash[:16], wrapping_util.get_params_hash(
+            {"x": 0.1, "y": 5, "a": "svm"}, bits=64))
+        self.assertRaises(ValueError, wrapping_util.get_params_hash, {},
+                          bits=32)
+
+    def test_remove_param_metadata(self):
+        params = {"LOG10_x": "'-2'", "LOG2_Q1_y": "3.3", "LOG_z": 0.0,
+                  "Q0.5_w": '"1.3"', "a": "'svm'"}
+        wrapping_util.remove_param_metadata(params)
+        self.assertEqual({"x": 0.01, "y": 10.0, "z": 1.0, "w": 1.5,
+                          "a": "svm"}, params)
+
+    def test_parameter_decoder(self):
+        self.assertEqual(("x", None, 2.0),
+                         wrapping_util.compile_param_name("Q2_x"))
+        searchspace = pcs_parser.read(["LOG10_Q1_x [0, 3] [1]i",
+                                       "LOG2_y [0, 3] [1]",
+                                       "z [1, 100] [10]l",
+                                       "a {svm, knn} [svm]"])
+        for space in (searchspace,
+                      configuration_space.ConfigurationSpace(searchspace)):
+            decoder = wrapping_util.ParameterDecoder.from_space(space)
+            for name in ["LOG10_Q1_x", "LOG2_y", "z", "a"]:
+                self.assertIn(name, decoder.plans)
+            self.assertEqual(("x", decoder.plans["LOG10_Q1_x"][1], 1.0),
+                             decoder.plans["LOG10_Q1_x"])
+            self.assertEqual(("z", None, None), decoder.plans["z"])
+
+        num_plans = len(decoder.plans)
+        batch = [{"LOG10_Q1_x": "1", "LOG2_y": "1", "z": "50", "a": "svm"},
+                 {"LOG10_Q1_x": "0", "LOG2_y": "0", "z": "5", "a": "knn"}]
+        decoder.decode_batch(batch)
+        self.assertEqual([{"x": 10.0, "y": 2.0, "z": "50", "a": "svm"},
+                          {"x": 1.0, "y": 1.0, "z": "5", "a": "knn"}], batch)
+        self.assertEqual(num_plans, len(decoder.plans))
+        # Unknown names are compiled when they are seen
+        decoder.decode({"LOG_w": "0"})
+        self.assertIn("LOG_w", decoder.plans)
+
     def test_parameter_flattening(self):
         def naive_old_implementation(params):
             _params_to_check = list(params.keys())
@@ -203,6 +313,7 @@ class WrappingTestUtil(unittest.TestCase):
                       'INT_array_0': 1, 'ENUM_array_0': 'Yes',
                       'ENUM_array_1': 'No', 'ENUM_array_2': 'Maybe'}
         self.assertEqual(test_space, space_flat)
+        self.assertRaises(Exception, wrapping_util.flatten_parameter_dict, 1)
 
 if __name__ == "__main__":
     unittest.main()